@@ -24,6 +24,17 @@ t_update_operators_params = sp.TList(
     )
 )
 
+t_operator_for_all_permission = sp.TRecord(
+    owner=sp.TAddress, operator=sp.TAddress
+).layout(("owner", "operator"))
+
+t_update_operators_for_all_params = sp.TList(
+    sp.TVariant(
+        add_operator_for_all=t_operator_for_all_permission,
+        remove_operator_for_all=t_operator_for_all_permission
+    ).layout(("add_operator_for_all", "remove_operator_for_all"))
+)
+
 t_transfer_tx = sp.TRecord(
     to_=sp.TAddress,
     token_id=sp.TNat,
@@ -37,6 +48,14 @@ t_transfer_batch = sp.TRecord(
 
 t_transfer_params = sp.TList(t_transfer_batch)
 
+t_pagination_params = sp.TRecord(offset=sp.TNat, limit=sp.TNat).layout(
+    ("offset", "limit")
+)
+
+t_tokens_of_owner_params = sp.TRecord(
+    owner=sp.TAddress, offset=sp.TNat, limit=sp.TNat
+).layout(("owner", ("offset", "limit")))
+
 t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat).layout(
     ("owner", "token_id")
 )
@@ -57,6 +76,15 @@ t_mint_nft_batch = sp.TList(sp.TRecord(
     metadata=sp.TMap(sp.TString, sp.TBytes)
 ).layout(("to_", "metadata")))
 
+# Mints `count` tokens with the metadata { "": metadata_prefix + suffix }.
+# If there are no suffixes, all tokens get metadata_prefix.
+t_mint_nft_range = sp.TRecord(
+    to_=sp.TAddress,
+    count=sp.TNat,
+    metadata_prefix=sp.TBytes,
+    metadata_suffixes=sp.TList(sp.TBytes)
+).layout(("to_", ("count", ("metadata_prefix", "metadata_suffixes"))))
+
 t_mint_fungible_batch = sp.TList(sp.TRecord(
     to_=sp.TAddress,
     amount=sp.TNat,
@@ -82,6 +110,51 @@ t_distribute_batch = sp.TList(sp.TRecord(
     to_=sp.TAddress, amount=sp.TNat
 ).layout(("to_", "amount")))
 
+t_distribute_params = sp.TRecord(
+    token_id=sp.TNat,
+    source=sp.TVariant(
+        transfer=sp.TAddress,
+        mint=sp.TUnit
+    ).layout(("transfer", "mint")),
+    recipients=t_distribute_batch
+).layout(("token_id", ("source", "recipients")))
+
+# event types
+
+t_mint_burn_event = sp.TRecord(
+    owner=sp.TAddress, token_id=sp.TNat, amount=sp.TNat
+).layout(("owner", ("token_id", "amount")))
+
+t_operator_update_event = sp.TRecord(
+    owner=sp.TAddress, operator=sp.TAddress, token_id=sp.TNat, is_operator=sp.TBool
+).layout(("owner", ("operator", ("token_id", "is_operator"))))
+
+t_operator_for_all_update_event = sp.TRecord(
+    owner=sp.TAddress, operator=sp.TAddress, is_operator=sp.TBool
+).layout(("owner", ("operator", "is_operator")))
+
+# permit types
+
+t_permit_params = sp.TList(sp.TRecord(
+    key=sp.TKey,
+    signature=sp.TSignature,
+    param_hash=sp.TBytes
+).layout(("key", ("signature", "param_hash"))))
+
+t_permit_key = sp.TRecord(
+    owner=sp.TAddress, param_hash=sp.TBytes
+).layout(("owner", "param_hash"))
+
+# checkpoint types
+
+t_checkpoint = sp.TRecord(
+    level=sp.TNat, balance=sp.TNat
+).layout(("level", "balance"))
+
+t_balance_at_params = sp.TRecord(
+    owner=sp.TAddress, level=sp.TNat
+).layout(("owner", "level"))
+
 # adhoc operator types
 
 t_adhoc_operator_permission = sp.TRecord(
@@ -124,6 +197,14 @@ t_mint_nft_royalties_batch = sp.TList(sp.TRecord(
     royalties=t_royalties
 ).layout(("to_", ("metadata", "royalties"))))
 
+t_mint_nft_range_royalties = sp.TRecord(
+    to_=sp.TAddress,
+    count=sp.TNat,
+    metadata_prefix=sp.TBytes,
+    metadata_suffixes=sp.TList(sp.TBytes),
+    royalties=t_royalties
+).layout(("to_", ("count", ("metadata_prefix", ("metadata_suffixes", "royalties")))))
+
 t_mint_fungible_royalties_batch = sp.TList(sp.TRecord(
     to_=sp.TAddress,
     amount=sp.TNat,
@@ -165,10 +246,16 @@ class NoTransfer:
         self.supports_transfer = False
         self.supports_operator = False
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
+    def make_tx_permissions_cache(self, contract):
+        return None
+
+    def check_tx_batch_permissions(self, contract, transfer, cache=None):
         pass
 
-    def check_operator_update_permissions(self, contract, operator_permission):
+    def check_tx_transfer_permissions(self, contract, from_, to_, token_id, cache=None, fallback=None):
+        pass
+
+    def check_operator_update_permissions(self, contract, operator_permission, action=None):
         pass
 
     def is_operator(self, contract, operator_permission):
@@ -184,10 +271,20 @@ class OwnerTransfer:
         self.supports_transfer = True
         self.supports_operator = False
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(sp.sender == from_, "FA2_NOT_OWNER")
+    def make_tx_permissions_cache(self, contract):
+        return None
 
-    def check_operator_update_permissions(self, contract, operator_permission):
+    def check_tx_batch_permissions(self, contract, transfer, cache=None):
+        pass
+
+    def check_tx_transfer_permissions(self, contract, from_, to_, token_id, cache=None, fallback=None):
+        if fallback is None:
+            sp.verify(sp.sender == from_, "FA2_NOT_OWNER")
+        else:
+            with sp.if_(sp.sender != from_):
+                fallback("FA2_NOT_OWNER")
+
+    def check_operator_update_permissions(self, contract, operator_permission, action=None):
         pass
 
     def is_operator(self, contract, operator_permission):
@@ -198,6 +295,15 @@ class OwnerOrOperatorTransfer:
     """(Transfer Policy) Only owner and operators can transfer tokens.
 
     Operators allowed.
+
+    Adds a `update_operators_for_all` entrypoint. Operators for all
+    are keyed by (owner, operator) and may transfer any of the owner's
+    tokens, so a marketplace needs a single entry for a collection.
+
+    Adds a `revoke_all_operators` entrypoint. Operators are stored with
+    the owner's epoch at the time they were added and are only valid for
+    that epoch. Bumping the epoch revokes all of the owner's operators
+    in a single write.
     """
 
     def init_policy(self, contract):
@@ -205,67 +311,193 @@ class OwnerOrOperatorTransfer:
         self.supports_transfer = True
         self.supports_operator = True
         contract.update_initial_storage(
-            operators=sp.big_map(tkey=t_operator_permission, tvalue=sp.TUnit)
+            operators=sp.big_map(tkey=t_operator_permission, tvalue=sp.TNat),
+            operators_for_all=sp.big_map(tkey=t_operator_for_all_permission, tvalue=sp.TNat),
+            operator_epochs=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat)
         )
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(
-            (sp.sender == from_)
-            | contract.data.operators.contains(
-                sp.record(owner=from_, operator=sp.sender, token_id=token_id)
-            ),
-            message="FA2_NOT_OPERATOR",
-        )
+        # Add update_operators_for_all entrypoint to contract.
+        def update_operators_for_all(self, batch):
+            """Accept a list of variants to add or remove operators who can
+            perform transfers of any token on behalf of the owner."""
+            sp.set_type(batch, t_update_operators_for_all_params)
+            with sp.for_("action", batch) as action:
+                with action.match_cases() as arg:
+                    with arg.match("add_operator_for_all") as operator:
+                        self.policy.check_operator_update_permissions(self, operator, action)
+                        self.data.operators_for_all[operator] = self.data.operator_epochs.get(operator.owner, 0)
+                        self.emit_event("operator_for_all_update", sp.record(
+                            owner=operator.owner, operator=operator.operator, is_operator=True
+                        ), t_operator_for_all_update_event)
+                    with arg.match("remove_operator_for_all") as operator:
+                        self.policy.check_operator_update_permissions(self, operator, action)
+                        del self.data.operators_for_all[operator]
+                        self.emit_event("operator_for_all_update", sp.record(
+                            owner=operator.owner, operator=operator.operator, is_operator=False
+                        ), t_operator_for_all_update_event)
+
+        contract.update_operators_for_all = sp.entry_point(update_operators_for_all)
+
+        # Add revoke_all_operators entrypoint to contract.
+        def revoke_all_operators(self):
+            """Revoke all operators and operators for all of the sender."""
+            # NOTE: not checking pause, revoking never grants permissions.
+            self.data.operator_epochs[sp.sender] = self.data.operator_epochs.get(sp.sender, 0) + 1
+            self.emit_event("operators_revoked", sp.sender, sp.TAddress)
+
+        contract.revoke_all_operators = sp.entry_point(revoke_all_operators)
+
+    def make_tx_permissions_cache(self, contract):
+        """Set of (from_, token_id) the sender was already verified for
+        during the current call."""
+        return sp.local("tx_permissions_cache", sp.set(t=sp.TPair(sp.TAddress, sp.TNat)))
+
+    def check_tx_batch_permissions(self, contract, transfer, cache=None):
+        pass
 
-    def check_operator_update_permissions(self, contract, operator_permission):
+    def is_operator_in_epoch(self, contract, operator_permission, epoch):
+        # The default is never equal to epoch, missing operators aren't valid.
+        return contract.data.operators.get(operator_permission, epoch + 1) == epoch
+
+    def is_operator_for_all_in_epoch(self, contract, operator_permission, epoch):
+        return contract.data.operators_for_all.get(
+            sp.record(owner=operator_permission.owner, operator=operator_permission.operator),
+            epoch + 1) == epoch
+
+    def verify_operator(self, contract, from_, token_id):
+        epoch = sp.compute(contract.data.operator_epochs.get(from_, 0))
+        operator_permission = sp.record(owner=from_, operator=sp.sender, token_id=token_id)
+        # Token operators first, operators for all second.
+        with sp.if_(~self.is_operator_in_epoch(contract, operator_permission, epoch)):
+            sp.verify(
+                self.is_operator_for_all_in_epoch(contract, operator_permission, epoch),
+                message="FA2_NOT_OPERATOR",
+            )
+
+    def is_tx_operator(self, contract, from_, token_id):
+        """Inline function. Like `verify_operator`, but returns whether the
+        sender is an operator instead of failing."""
+        epoch = sp.compute(contract.data.operator_epochs.get(from_, 0))
+        operator_permission = sp.record(owner=from_, operator=sp.sender, token_id=token_id)
+        # sp.eif short-circuits, unlike `|`.
+        return sp.eif(self.is_operator_in_epoch(contract, operator_permission, epoch),
+            True,
+            self.is_operator_for_all_in_epoch(contract, operator_permission, epoch))
+
+    def check_tx_transfer_permissions(self, contract, from_, to_, token_id, cache=None, fallback=None):
+        """`fallback`, if given, is called with the error message instead
+        of failing if the sender is neither owner nor operator. Only
+        successful operator checks are cached."""
+        # NOTE: `|` doesn't short-circuit. Ordered branches make sure owner
+        # transfers skip the operator lookups entirely.
+        with sp.if_(sp.sender != from_):
+            if fallback is None:
+                if cache is None:
+                    self.verify_operator(contract, from_, token_id)
+                else:
+                    with sp.if_(~cache.value.contains((from_, token_id))):
+                        self.verify_operator(contract, from_, token_id)
+                        cache.value.add((from_, token_id))
+            else:
+                if cache is None:
+                    with sp.if_(~self.is_tx_operator(contract, from_, token_id)):
+                        fallback("FA2_NOT_OPERATOR")
+                else:
+                    with sp.if_(~cache.value.contains((from_, token_id))):
+                        with sp.if_(self.is_tx_operator(contract, from_, token_id)):
+                            cache.value.add((from_, token_id))
+                        with sp.else_():
+                            fallback("FA2_NOT_OPERATOR")
+
+    def check_operator_update_permissions(self, contract, operator_permission, action=None):
         sp.verify(operator_permission.owner == sp.sender, "FA2_NOT_OWNER")
 
     def is_operator(self, contract, operator_permission):
-        return contract.data.operators.contains(operator_permission)
+        epoch = sp.compute(contract.data.operator_epochs.get(operator_permission.owner, 0))
+        return self.is_operator_in_epoch(contract, operator_permission, epoch) | self.is_operator_for_all_in_epoch(contract, operator_permission, epoch)
 
 
-class OwnerOrOperatorAdhocTransfer:
+class OwnerOrOperatorAdhocTransfer(OwnerOrOperatorTransfer):
     """(Transfer Policy) Only owner and operators can transfer tokens.
 
-    Adds a `update_adhoc_operators` entrypoint. Checks both operators
-    and adhoc operators.
+    Adds a `update_adhoc_operators` entrypoint. Checks adhoc operators,
+    operators and operators for all.
 
     Provides adhoc, temporary operators. Cheap and storage efficient.
     They are supposed to apply only to the current operation group.
     They are only valid in the current block level.
 
+    Adhoc operators are stored in a single bucket for the level
+    `adhoc_operators_level`. The first update in a new level replaces
+    the bucket wholesale, which expires all older operators in O(1)
+    and lets the new ones reuse the already paid storage.
+
+    The level doesn't need to be part of the adhoc operator key, the
+    bucket level is checked instead. `key_scheme` selects how keys are
+    derived from (owner, operator, token_id):
+
+    - "pair": the record itself. No packing or hashing. (default)
+    - "packed": `sp.pack` of the record.
+    - "blake2b": `sp.blake2b` of the packed record.
+    - "sha3": `sp.sha3` of the packed record.
+
+    "pair" is the cheapest in gas for adding and checking, which is what
+    the World does on every Places/Items transfer. The hashed schemes
+    have smaller entries (32 bytes), which only pays off for buckets much
+    larger than a single operation group usually needs.
+
     For long-lasting operators, use standard operators.
 
     You've seen it here first :)
     """
 
+    KEY_SCHEMES = ["pair", "packed", "blake2b", "sha3"]
+
+    def __init__(self, key_scheme="pair"):
+        if key_scheme not in OwnerOrOperatorAdhocTransfer.KEY_SCHEMES:
+            raise Exception("Unknown adhoc operator key scheme: " + key_scheme)
+        self.key_scheme = key_scheme
+
     def init_policy(self, contract):
-        self.name = "owner-or-operator-transfer"
-        self.supports_transfer = True
-        self.supports_operator = True
+        OwnerOrOperatorTransfer.init_policy(self, contract)
+        if self.key_scheme == "pair":
+            t_adhoc_operator_key = t_operator_permission
+        else:
+            t_adhoc_operator_key = sp.TBytes
         contract.update_initial_storage(
-            operators=sp.big_map(tkey=t_operator_permission, tvalue=sp.TUnit),
-            adhoc_operators = sp.set(t = sp.TBytes)
+            adhoc_operators = sp.set(t = t_adhoc_operator_key),
+            adhoc_operators_level = sp.nat(0)
         )
 
         # Add make_adhoc_operator_key to contract.
+        key_scheme = self.key_scheme
         def make_adhoc_operator_key(self, owner, operator, token_id):
-            t_adhoc_operator_record = sp.TRecord(
-                owner=sp.TAddress,
-                operator=sp.TAddress,
-                token_id=sp.TNat,
-                level=sp.TNat
-            ).layout(("owner", ("operator", ("token_id", "level"))))
-
-            return sp.sha3(sp.pack(sp.set_type_expr(sp.record(
+            key = sp.set_type_expr(sp.record(
                 owner=owner,
                 operator=operator,
-                token_id=token_id,
-                level=sp.level
-            ), t_adhoc_operator_record)))
+                token_id=token_id
+            ), t_operator_permission)
+
+            if key_scheme == "pair":
+                return key
+            elif key_scheme == "packed":
+                return sp.pack(key)
+            elif key_scheme == "blake2b":
+                return sp.blake2b(sp.pack(key))
+            else:
+                return sp.sha3(sp.pack(key))
 
         contract.make_adhoc_operator_key = types.MethodType(make_adhoc_operator_key, contract)
 
+        # Add is_adhoc_operator to contract.
+        def is_adhoc_operator(self, owner, operator, token_id):
+            # Only derive the key if the bucket is for the current level.
+            return sp.eif(self.data.adhoc_operators_level == sp.level,
+                self.data.adhoc_operators.contains(self.make_adhoc_operator_key(owner, operator, token_id)),
+                False)
+
+        contract.is_adhoc_operator = types.MethodType(is_adhoc_operator, contract)
+
         # Add update_adhoc_operators entrypoint to contract.
         def update_adhoc_operators(self, params):
             # Supports add_adhoc_operators, and clear_adhoc_operators.
@@ -276,28 +508,23 @@ class OwnerOrOperatorAdhocTransfer:
                     # Check adhoc operator limit. To prevent potential gaslock.
                     sp.verify(sp.len(updates) <= 100, "ADHOC_OPERATOR_LIMIT")
 
-                    # Add new adhoc operators to temp set.
-                    additions = sp.local("additions", sp.set(t=sp.TBytes))
+                    # Operators from previous levels are expired.
+                    # Replace the bucket instead of evicting them one by one.
+                    with sp.if_(self.data.adhoc_operators_level != sp.level):
+                        self.data.adhoc_operators = sp.set(t = t_adhoc_operator_key)
+                        self.data.adhoc_operators_level = sp.level
+
+                    # Add new adhoc operators to the current bucket.
                     with sp.for_("upd", updates) as upd:
-                        additions.value.add(self.make_adhoc_operator_key(
+                        self.data.adhoc_operators.add(self.make_adhoc_operator_key(
                             sp.sender, # Sender must be the owner
                             upd.operator,
                             upd.token_id))
 
-                    # Remove as many adhoc operators as we added.
-                    # We do this to make sure the storage diffs aren't lost
-                    # on minting tokens. And to make sure the set doesn't grow larger
-                    # than the adhoc operator limit.
-                    num_additions = sp.compute(sp.len(additions.value))
-                    counter = sp.local("counter", sp.nat(0))
-                    with sp.for_("op", self.data.adhoc_operators.elements()) as op:
-                        with sp.if_(counter.value < num_additions):
-                            self.data.adhoc_operators.remove(op)
-                            counter.value += 1
-
-                    # Add adhoc ops from temp set.
-                    with sp.for_("add", additions.value.elements()) as add:
-                        self.data.adhoc_operators.add(add)
+                    # Cap the bucket too. Otherwise repeated updates in the
+                    # same level could grow it without bound and gaslock
+                    # every call that loads it.
+                    sp.verify(sp.len(self.data.adhoc_operators) <= 100, "ADHOC_OPERATOR_LIMIT")
 
                 with arg.match("clear_adhoc_operators"):
                     # Only admin is allowed to do this.
@@ -305,28 +532,25 @@ class OwnerOrOperatorAdhocTransfer:
                     # the cost of everyone else.
                     sp.verify(self.isAdministrator(sp.sender), "FA2_NOT_ADMIN")
                     # Clear adhoc operators.
-                    self.data.adhoc_operators = sp.set(t = sp.TBytes)
+                    self.data.adhoc_operators = sp.set(t = t_adhoc_operator_key)
+                    self.data.adhoc_operators_level = sp.level
 
         contract.update_adhoc_operators = sp.entry_point(update_adhoc_operators)
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(
-            (sp.sender == from_)
-            | contract.data.adhoc_operators.contains(
-                contract.make_adhoc_operator_key(from_, sp.sender, token_id)
-            )
-            | contract.data.operators.contains(
-                sp.record(owner=from_, operator=sp.sender, token_id=token_id)
-            ),
-            message="FA2_NOT_OPERATOR",
-        )
+    def verify_operator(self, contract, from_, token_id):
+        # Adhoc operators first, they are the common case for the World.
+        # Only fall back to the operators big_maps if that fails.
+        with sp.if_(~contract.is_adhoc_operator(from_, sp.sender, token_id)):
+            OwnerOrOperatorTransfer.verify_operator(self, contract, from_, token_id)
 
-    def check_operator_update_permissions(self, contract, operator_permission):
-        sp.verify(operator_permission.owner == sp.sender, "FA2_NOT_OWNER")
+    def is_tx_operator(self, contract, from_, token_id):
+        # Adhoc operators first, see verify_operator.
+        return sp.eif(contract.is_adhoc_operator(from_, sp.sender, token_id),
+            True,
+            OwnerOrOperatorTransfer.is_tx_operator(self, contract, from_, token_id))
 
     def is_operator(self, contract, operator_permission):
-        adhoc_key = contract.make_adhoc_operator_key(operator_permission.owner, operator_permission.operator, operator_permission.token_id)
-        return contract.data.adhoc_operators.contains(adhoc_key) | contract.data.operators.contains(operator_permission)
+        return contract.is_adhoc_operator(operator_permission.owner, operator_permission.operator, operator_permission.token_id) | OwnerOrOperatorTransfer.is_operator(self, contract, operator_permission)
 
 
 class PauseTransfer:
@@ -349,6 +573,7 @@ class PauseTransfer:
         self.name = "pauseable-" + self.policy.name
         self.supports_transfer = self.policy.supports_transfer
         self.supports_operator = self.policy.supports_operator
+        self.supports_permit = getattr(self.policy, "supports_permit", False)
         contract.update_initial_storage(paused=False)
 
         # Add a set_pause entrypoint
@@ -359,16 +584,164 @@ class PauseTransfer:
 
         contract.set_pause = sp.entry_point(set_pause)
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
+    def make_tx_permissions_cache(self, contract):
+        return self.policy.make_tx_permissions_cache(contract)
+
+    def check_tx_batch_permissions(self, contract, transfer, cache=None):
+        self.policy.check_tx_batch_permissions(contract, transfer, cache)
+
+    def check_tx_transfer_permissions(self, contract, from_, to_, token_id, cache=None, fallback=None):
         sp.verify(~contract.data.paused, message=sp.pair("FA2_TX_DENIED", "FA2_PAUSED"))
-        self.policy.check_tx_transfer_permissions(contract, from_, to_, token_id)
+        self.policy.check_tx_transfer_permissions(contract, from_, to_, token_id, cache, fallback)
 
-    def check_operator_update_permissions(self, contract, operator_param):
+    def check_operator_update_permissions(self, contract, operator_param, action=None):
         sp.verify(
             ~contract.data.paused,
             message=sp.pair("FA2_OPERATORS_UNSUPPORTED", "FA2_PAUSED"),
         )
-        self.policy.check_operator_update_permissions(contract, operator_param)
+        self.policy.check_operator_update_permissions(contract, operator_param, action)
+
+    def is_operator(self, contract, operator_param):
+        return self.policy.is_operator(contract, operator_param)
+
+
+class PermitTransfer:
+    """(Transfer Policy) Decorate any policy to add TZIP-17 permits.
+
+    Adds a `permit` entrypoint. Owners pre-sign the blake2b hash of a
+    packed parameter, a relayer submits the signatures and later the
+    parameter itself. Permits are stored by (owner, param_hash) with an
+    expiry and are consumed when used.
+
+    - `transfer`: a permit for a packed `t_transfer_batch` item allows
+      any sender to do that batch item. Permits are only checked if the
+      decorated policy denies a transfer, owner and operator transfers
+      don't pay for hashing the batch item and don't consume permits.
+    - `update_operators`, `update_operators_for_all`: a permit for a
+      packed action (the variant) allows any sender to do that action.
+
+    Adhoc operators are not supported. They are keyed by the sender and
+    only valid in the current level, a permit for the transfer itself
+    does the same job.
+
+    The signed bytes are the packed
+    `((chain_id, self_address), (counter, param_hash))`. Counters are per
+    owner.
+
+    Adds a `clear_expired_permits` entrypoint. Anyone can remove expired
+    permits, to keep storage bounded.
+
+    Wrap it in `PauseTransfer` and not the other way around, otherwise
+    permitted transfers skip the pause check.
+    """
+
+    def __init__(self, policy=None, default_expiry=3600):
+        if policy is None:
+            self.policy = OwnerOrOperatorTransfer()
+        else:
+            self.policy = policy
+        self.default_expiry = default_expiry
+
+    def init_policy(self, contract):
+        self.policy.init_policy(contract)
+        self.name = "permit-" + self.policy.name
+        self.supports_transfer = self.policy.supports_transfer
+        self.supports_operator = self.policy.supports_operator
+        self.supports_permit = True
+        contract.update_initial_storage(
+            permits=sp.big_map(tkey=t_permit_key, tvalue=sp.TTimestamp),
+            permit_counters=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat)
+        )
+
+        # Add a permit entrypoint
+        default_expiry = self.default_expiry
+        def permit(self, params):
+            """Store a batch of pre-signed parameter hashes."""
+            sp.set_type(params, t_permit_params)
+            with sp.for_("permit", params) as permit:
+                owner = sp.compute(sp.to_address(sp.implicit_account(sp.hash_key(permit.key))))
+                counter = sp.compute(self.data.permit_counters.get(owner, 0))
+                signed_bytes = sp.compute(sp.pack(sp.pair(
+                    sp.pair(sp.chain_id, sp.self_address),
+                    sp.pair(counter, permit.param_hash))))
+                sp.verify(sp.check_signature(permit.key, permit.signature, signed_bytes),
+                    message=sp.pair("MISSIGNED", signed_bytes))
+
+                # Expired permits can be replaced, valid ones can't.
+                permit_key = sp.compute(sp.record(owner=owner, param_hash=permit.param_hash))
+                sp.verify(self.data.permits.get(permit_key, sp.timestamp(0)) < sp.now, "DUP_PERMIT")
+                self.data.permits[permit_key] = sp.now.add_seconds(default_expiry)
+                self.data.permit_counters[owner] = counter + 1
+
+        contract.permit = sp.entry_point(permit)
+
+        # Add a clear_expired_permits entrypoint
+        def clear_expired_permits(self, params):
+            """Remove expired permits. Others are skipped."""
+            sp.set_type(params, sp.TList(t_permit_key))
+            with sp.for_("permit_key", params) as permit_key:
+                with sp.if_(self.data.permits.get(permit_key, sp.now) < sp.now):
+                    del self.data.permits[permit_key]
+
+        contract.clear_expired_permits = sp.entry_point(clear_expired_permits)
+
+    def use_permit(self, contract, owner, param_hash):
+        """Inline function. Consumes the permit if it's valid and returns
+        whether it was."""
+        permit_key = sp.compute(sp.record(owner=owner, param_hash=param_hash))
+        valid = sp.compute(contract.data.permits.get(permit_key, sp.timestamp(0)) >= sp.now)
+        with sp.if_(valid):
+            del contract.data.permits[permit_key]
+        return valid
+
+    def make_tx_permissions_cache(self, contract):
+        """Whether the current batch item is permitted, the current batch
+        item and the decorated policy's cache.
+
+        The batch item is set by `check_tx_batch_permissions`. It's only
+        an expression, it's packed and hashed only if a permit is needed."""
+        return {
+            "permitted": sp.local("tx_permitted", False),
+            "transfer": None,
+            "policy": self.policy.make_tx_permissions_cache(contract)
+        }
+
+    def check_tx_batch_permissions(self, contract, transfer, cache=None):
+        self.policy.check_tx_batch_permissions(contract, transfer, cache["policy"])
+        cache["permitted"].value = False
+        cache["transfer"] = transfer
+
+    def check_tx_transfer_permissions(self, contract, from_, to_, token_id, cache=None, fallback=None):
+        # No cache means no batch, burn and distribute can't be permitted.
+        if cache is None:
+            self.policy.check_tx_transfer_permissions(contract, from_, to_, token_id, None, fallback)
+        else:
+            permitted = cache["permitted"]
+            transfer = cache["transfer"]
+
+            # Only called if the decorated policy denies the transfer,
+            # owners and operators never pay for hashing the batch item
+            # and don't consume permits.
+            def use_transfer_permit(message):
+                permitted.value = self.use_permit(contract, from_,
+                    sp.blake2b(sp.pack(sp.set_type_expr(transfer, t_transfer_batch))))
+                if fallback is None:
+                    sp.verify(permitted.value, message)
+                else:
+                    with sp.if_(~permitted.value):
+                        fallback(message)
+
+            with sp.if_(~permitted.value):
+                self.policy.check_tx_transfer_permissions(contract, from_, to_, token_id,
+                    cache["policy"], use_transfer_permit)
+
+    def check_operator_update_permissions(self, contract, operator_param, action=None):
+        if action is None:
+            self.policy.check_operator_update_permissions(contract, operator_param)
+        else:
+            with sp.if_(sp.sender != operator_param.owner):
+                with sp.if_(~self.use_permit(contract, operator_param.owner, sp.blake2b(sp.pack(action)))):
+                    self.policy.check_operator_update_permissions(contract, operator_param, action)
 
     def is_operator(self, contract, operator_param):
         return self.policy.is_operator(contract, operator_param)
@@ -388,6 +761,13 @@ class OnchainViewsNft:
         """Return the list of all the token IDs known to the contract."""
         sp.result(sp.range(0, self.data.last_token_id))
 
+    @sp.onchain_view(pure=True)
+    def all_tokens_paginated(self, params):
+        """Return the token IDs in the range [`offset`, `offset` + `limit`)
+        that exist. Burned tokens are skipped."""
+        sp.set_type(params, t_pagination_params)
+        sp.result(self.token_ids_in_range(params.offset, params.limit))
+
     @sp.onchain_view(pure=True)
     def get_balance(self, params):
         """Return the balance of an address for the specified `token_id`."""
@@ -428,6 +808,13 @@ class OnchainViewsFungible:
         """Return the list of all the token IDs known to the contract."""
         sp.result(sp.range(0, self.data.last_token_id))
 
+    @sp.onchain_view(pure=True)
+    def all_tokens_paginated(self, params):
+        """Return the token IDs in the range [`offset`, `offset` + `limit`)
+        that exist. Burned tokens are skipped."""
+        sp.set_type(params, t_pagination_params)
+        sp.result(self.token_ids_in_range(params.offset, params.limit))
+
     @sp.onchain_view(pure=True)
     def get_balance(self, params):
         """Return the balance of an address for the specified `token_id`."""
@@ -467,6 +854,13 @@ class OnchainViewsSingleAsset:
         """Return the list of all the token IDs known to the contract."""
         sp.result([sp.nat(0)])
 
+    @sp.onchain_view(pure=True)
+    def all_tokens_paginated(self, params):
+        """Return the token IDs in the range [`offset`, `offset` + `limit`)
+        that exist."""
+        sp.set_type(params, t_pagination_params)
+        sp.result(sp.eif((params.offset == 0) & (params.limit > 0), [sp.nat(0)], []))
+
     @sp.onchain_view(pure=True)
     def get_balance(self, params):
         """Return the balance of an address for the specified `token_id`."""
@@ -525,6 +919,78 @@ class Common(sp.Contract):
     def is_defined(self, token_id):
         return self.data.token_metadata.contains(token_id)
 
+    def token_ids_in_range(self, offset, limit):
+        """Returns the defined token ids in [offset, offset + limit).
+
+        The range is capped at `last_token_id`.
+        """
+        offset = sp.set_type_expr(offset, sp.TNat)
+        limit = sp.set_type_expr(limit, sp.TNat)
+        token_ids = sp.local("token_ids", sp.list(t=sp.TNat))
+        with sp.for_("token_id", sp.range(offset, sp.min(offset + limit, self.data.last_token_id))) as token_id:
+            with sp.if_(self.is_defined(token_id)):
+                token_ids.value.push(token_id)
+        return token_ids.value.rev()
+
+    def emit_event(self, tag, value, t):
+        """Inline function. Emit `value` of type `t` as a `tag` event.
+
+        Does nothing if the base was created without `emit_events`.
+        """
+        if self.emit_events:
+            sp.emit(sp.set_type_expr(value, t), tag=tag, with_type=True)
+
+    def emit_distribute_events(self, params):
+        """Inline function. Emit the events of a `distribute` call: one
+        transfer event or one mint event per recipient."""
+        if self.emit_events:
+            with params.source.match_cases() as arg:
+                with arg.match("transfer") as from_:
+                    txs = sp.local("distribute_txs", sp.list(t=t_transfer_tx))
+                    with sp.for_("recipient", params.recipients.rev()) as recipient:
+                        txs.value.push(sp.record(to_=recipient.to_, token_id=params.token_id, amount=recipient.amount))
+                    self.emit_event("transfer", sp.record(from_=from_, txs=txs.value), t_transfer_batch)
+                with arg.match("mint"):
+                    with sp.for_("recipient", params.recipients) as recipient:
+                        self.emit_event("mint", sp.record(
+                            owner=recipient.to_, token_id=params.token_id, amount=recipient.amount
+                        ), t_mint_burn_event)
+
+    def owner_tokens_local(self, owner):
+        """Inline function. A local copy of the tokens of `owner` in the
+        owner index. The set is read once, modified in the local and
+        written back once.
+
+        Every call gets a uniquely named local, the helpers are inlined
+        more than once in some entrypoints.
+        """
+        self.owner_tokens_locals = getattr(self, "owner_tokens_locals", 0) + 1
+        return sp.local("owner_tokens_%d" % self.owner_tokens_locals,
+            self.data.owner_tokens.get(owner, sp.set(t=sp.TNat)))
+
+    def add_owner_token(self, owner, token_id):
+        """Add `token_id` to the tokens of `owner` in the owner index.
+
+        Does nothing if the base was created without `has_owner_index`.
+        """
+        if self.has_owner_index:
+            owner_tokens = self.owner_tokens_local(owner)
+            owner_tokens.value.add(token_id)
+            self.data.owner_tokens[owner] = owner_tokens.value
+
+    def remove_owner_token(self, owner, token_id):
+        """Remove `token_id` from the tokens of `owner` in the owner index.
+
+        Does nothing if the base was created without `has_owner_index`.
+        """
+        if self.has_owner_index:
+            owner_tokens = self.owner_tokens_local(owner)
+            owner_tokens.value.remove(token_id)
+            with sp.if_(sp.len(owner_tokens.value) == 0):
+                del self.data.owner_tokens[owner]
+            with sp.else_():
+                self.data.owner_tokens[owner] = owner_tokens.value
+
     def generate_contract_metadata(self, name, description, filename, metadata_base=None):
         """Generate a metadata json file with all the contract's offchain views
         and standard TZIP-126 and TZIP-016 key/values."""
@@ -556,6 +1022,8 @@ class Common(sp.Contract):
                 offchain_views.append(attr)
         metadata_base["views"] = offchain_views
         metadata_base["permissions"]["operator"] = self.policy.name
+        if getattr(self.policy, "supports_permit", False):
+            metadata_base["interfaces"].append("TZIP-017")
         self.init_metadata(filename, metadata_base)
 
     @sp.entry_point
@@ -564,14 +1032,39 @@ class Common(sp.Contract):
         transfers on behalf of the owner."""
         sp.set_type(batch, t_update_operators_params)
         if self.policy.supports_operator:
+            # Compact the batch to the final state of every operator.
+            # True for add, False for remove. The last action wins.
+            updates = sp.local("operator_updates", sp.map(tkey=t_operator_permission, tvalue=sp.TBool))
+            # Only the sender can update operators as the owner. Others,
+            # e.g. with permits, are checked for every action.
+            sender_checked = sp.local("sender_checked", False)
+            def check_permissions(operator, action):
+                with sp.if_(operator.owner == sp.sender):
+                    with sp.if_(~sender_checked.value):
+                        self.policy.check_operator_update_permissions(self, operator, action)
+                        sender_checked.value = True
+                with sp.else_():
+                    self.policy.check_operator_update_permissions(self, operator, action)
+
             with sp.for_("action", batch) as action:
                 with action.match_cases() as arg:
                     with arg.match("add_operator") as operator:
-                        self.policy.check_operator_update_permissions(self, operator)
-                        self.data.operators[operator] = sp.unit
+                        check_permissions(operator, action)
+                        updates.value[operator] = True
                     with arg.match("remove_operator") as operator:
-                        self.policy.check_operator_update_permissions(self, operator)
-                        del self.data.operators[operator]
+                        check_permissions(operator, action)
+                        updates.value[operator] = False
+
+            # One write per operator.
+            with sp.for_("update", updates.value.items()) as update:
+                with sp.if_(update.value):
+                    self.data.operators[update.key] = self.data.operator_epochs.get(update.key.owner, 0)
+                with sp.else_():
+                    del self.data.operators[update.key]
+                self.emit_event("operator_update", sp.record(
+                    owner=update.key.owner, operator=update.key.operator,
+                    token_id=update.key.token_id, is_operator=update.value
+                ), t_operator_update_event)
         else:
             sp.failwith("FA2_OPERATORS_UNSUPPORTED")
 
@@ -589,11 +1082,14 @@ class Fa2Nft(OnchainViewsNft, Common):
 
     def __init__(
         self, metadata, name="FA2", description="A NFT FA2 implementation.",
-        token_metadata=[], ledger={}, policy=None, metadata_base=None, has_royalties=False
+        token_metadata=[], ledger={}, policy=None, metadata_base=None, has_royalties=False,
+        has_owner_index=False, emit_events=False
     ):
         metadata = sp.set_type_expr(metadata, sp.TBigMap(sp.TString, sp.TBytes))
         self.ledger_type = "NFT"
         self.has_royalties = has_royalties
+        self.has_owner_index = has_owner_index
+        self.emit_events = emit_events
         ledger, token_extra, token_metadata = self.initial_mint(token_metadata, ledger, has_royalties)
         self.init(
             ledger=sp.big_map(ledger, tkey=sp.TNat, tvalue=sp.TAddress),
@@ -604,6 +1100,12 @@ class Fa2Nft(OnchainViewsNft, Common):
             self.update_initial_storage(
                 token_extra=sp.big_map(token_extra, tkey=sp.TNat, tvalue=t_token_extra_royalties)
             )
+        if has_owner_index:
+            self.update_initial_storage(
+                owner_tokens=sp.big_map(
+                    self.initial_owner_tokens(ledger), tkey=sp.TAddress, tvalue=sp.TSet(sp.TNat)
+                )
+            )
         Common.__init__(
             self,
             name,
@@ -636,16 +1138,25 @@ class Fa2Nft(OnchainViewsNft, Common):
                 )
         return (ledger, token_extra_dict, token_metadata_dict)
 
+    def initial_owner_tokens(self, ledger={}):
+        """Build the owner index for the ledger of the initial mint."""
+        owner_tokens = {}
+        for token_id, address in ledger.items():
+            owner_tokens.setdefault(address, []).append(token_id)
+        return {address: sp.set(token_ids) for address, token_ids in owner_tokens.items()}
+
     def balance_of_(self, requests):
         """Logic of the balance_of entrypoint."""
         sp.set_type(requests, sp.TList(t_balance_of_request))
 
         def f_process_request(req):
-            sp.verify(self.is_defined(req.token_id), "FA2_TOKEN_UNDEFINED")
+            # Every defined token is in the ledger, reading it is enough
+            # to prove the token exists.
+            owner = self.data.ledger.get(req.token_id, message="FA2_TOKEN_UNDEFINED")
             sp.result(
                 sp.record(
                     request=sp.record(owner=req.owner, token_id=req.token_id),
-                    balance=sp.eif(self.data.ledger[req.token_id] == req.owner, 1, 0),
+                    balance=sp.eif(owner == req.owner, 1, 0),
                 )
             )
 
@@ -664,12 +1175,14 @@ class Fa2Nft(OnchainViewsNft, Common):
         destinations."""
         sp.set_type(batch, t_transfer_params)
         if self.policy.supports_transfer:
+            cache = self.policy.make_tx_permissions_cache(self)
             with sp.for_("transfer", batch) as transfer:
+                self.policy.check_tx_batch_permissions(self, transfer, cache)
                 with sp.for_("tx", transfer.txs) as tx:
                     # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
                     sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
                     self.policy.check_tx_transfer_permissions(
-                        self, transfer.from_, tx.to_, tx.token_id
+                        self, transfer.from_, tx.to_, tx.token_id, cache
                     )
                     with sp.if_(tx.amount > 0):
                         sp.verify(
@@ -679,6 +1192,9 @@ class Fa2Nft(OnchainViewsNft, Common):
                         )
                         # Do the transfer
                         self.data.ledger[tx.token_id] = tx.to_
+                        self.remove_owner_token(transfer.from_, tx.token_id)
+                        self.add_owner_token(tx.to_, tx.token_id)
+                self.emit_event("transfer", transfer, t_transfer_batch)
         else:
             sp.failwith("FA2_TX_DENIED")
 
@@ -692,12 +1208,15 @@ class Fa2Fungible(OnchainViewsFungible, Common):
 
     def __init__(
         self, metadata, name="FA2", description="A Fungible FA2 implementation.",
-        token_metadata=[], ledger={}, policy=None, metadata_base=None, has_royalties=False, allow_mint_existing=True
+        token_metadata=[], ledger={}, policy=None, metadata_base=None, has_royalties=False, allow_mint_existing=True,
+        has_owner_index=False, emit_events=False
     ):
         metadata = sp.set_type_expr(metadata, sp.TBigMap(sp.TString, sp.TBytes))
         self.ledger_type = "Fungible"
         self.has_royalties = has_royalties
         self.allow_mint_existing = allow_mint_existing
+        self.has_owner_index = has_owner_index
+        self.emit_events = emit_events
         ledger, token_extra, token_metadata = self.initial_mint(token_metadata, ledger, has_royalties)
         self.init(
             ledger=sp.big_map(
@@ -714,6 +1233,12 @@ class Fa2Fungible(OnchainViewsFungible, Common):
             self.update_initial_storage(
                 token_extra=sp.big_map(token_extra, tkey=sp.TNat, tvalue=t_token_extra_supply)
             )
+        if has_owner_index:
+            self.update_initial_storage(
+                owner_tokens=sp.big_map(
+                    self.initial_owner_tokens(ledger), tkey=sp.TAddress, tvalue=sp.TSet(sp.TNat)
+                )
+            )
         Common.__init__(
             self,
             name,
@@ -749,20 +1274,37 @@ class Fa2Fungible(OnchainViewsFungible, Common):
             token_extra_dict[token_id].supply += amount
         return (ledger, token_extra_dict, token_metadata_dict)
 
+    def initial_owner_tokens(self, ledger={}):
+        """Build the owner index for the ledger of the initial mint.
+
+        Only tokens with a nonzero balance are indexed.
+        """
+        owner_tokens = {}
+        for (address, token_id), amount in ledger.items():
+            if amount > 0:
+                owner_tokens.setdefault(address, []).append(token_id)
+        return {address: sp.set(token_ids) for address, token_ids in owner_tokens.items()}
+
     def balance_of_(self, requests):
         """Logic of the balance_of entrypoint."""
         sp.set_type(requests, sp.TList(t_balance_of_request))
 
-        def f_process_request(req):
-            sp.verify(self.is_defined(req.token_id), "FA2_TOKEN_UNDEFINED")
-            sp.result(
+        # Requests often repeat the same token for many owners.
+        # Only check if a token is defined once per call.
+        defined_token_ids = sp.local("defined_token_ids", sp.set(t=sp.TNat))
+        responses = sp.local("responses", sp.list(t=t_balance_of_response))
+        with sp.for_("req", requests) as req:
+            with sp.if_(~defined_token_ids.value.contains(req.token_id)):
+                sp.verify(self.is_defined(req.token_id), "FA2_TOKEN_UNDEFINED")
+                defined_token_ids.value.add(req.token_id)
+            responses.value.push(
                 sp.record(
                     request=sp.record(owner=req.owner, token_id=req.token_id),
                     balance=self.data.ledger.get((req.owner, req.token_id), 0),
                 )
             )
 
-        return requests.map(f_process_request)
+        return responses.value.rev()
 
     @sp.entry_point
     def balance_of(self, params):
@@ -777,12 +1319,14 @@ class Fa2Fungible(OnchainViewsFungible, Common):
         destinations."""
         sp.set_type(batch, t_transfer_params)
         if self.policy.supports_transfer:
+            cache = self.policy.make_tx_permissions_cache(self)
             with sp.for_("transfer", batch) as transfer:
+                self.policy.check_tx_batch_permissions(self, transfer, cache)
                 with sp.for_("tx", transfer.txs) as tx:
                     # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
                     sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
                     self.policy.check_tx_transfer_permissions(
-                        self, transfer.from_, tx.to_, tx.token_id
+                        self, transfer.from_, tx.to_, tx.token_id, cache
                     )
                     from_ = (transfer.from_, tx.token_id)
                     # Transfer from.
@@ -792,12 +1336,17 @@ class Fa2Fungible(OnchainViewsFungible, Common):
                     ))
                     with sp.if_(from_balance == 0):
                         del self.data.ledger[from_]
+                        self.remove_owner_token(transfer.from_, tx.token_id)
                     with sp.else_():
                         self.data.ledger[from_] = from_balance
 
                     # Do the transfer
                     to_ = (tx.to_, tx.token_id)
+                    if self.has_owner_index:
+                        with sp.if_((tx.amount > 0) & (self.data.ledger.get(to_, 0) == 0)):
+                            self.add_owner_token(tx.to_, tx.token_id)
                     self.data.ledger[to_] = self.data.ledger.get(to_, 0) + tx.amount
+                self.emit_event("transfer", transfer, t_transfer_batch)
         else:
             sp.failwith("FA2_TX_DENIED")
 
@@ -809,10 +1358,14 @@ class Fa2SingleAsset(OnchainViewsSingleAsset, Common):
 
     def __init__(
         self, metadata, name="FA2", description="A Single Asset FA2 implementation.",
-        token_metadata=[], ledger={}, policy=None, metadata_base=None
+        token_metadata=[], ledger={}, policy=None, metadata_base=None, has_checkpoints=False,
+        emit_events=False
     ):
         metadata = sp.set_type_expr(metadata, sp.TBigMap(sp.TString, sp.TBytes))
         self.ledger_type = "SingleAsset"
+        self.has_owner_index = False
+        self.has_checkpoints = has_checkpoints
+        self.emit_events = emit_events
         ledger, supply, token_metadata = self.initial_mint(token_metadata, ledger)
         self.init(
             ledger=sp.big_map(
@@ -822,6 +1375,23 @@ class Fa2SingleAsset(OnchainViewsSingleAsset, Common):
             last_token_id=sp.nat(len(token_metadata)),
             supply=supply,
         )
+        if has_checkpoints:
+            # The initial mint is checkpointed at level 0.
+            self.update_initial_storage(
+                checkpoints=sp.big_map(
+                    {(address, 0): sp.record(level=0, balance=amount) for address, amount in ledger.items()},
+                    tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=t_checkpoint
+                ),
+                num_checkpoints=sp.big_map(
+                    {address: 1 for address in ledger.keys()},
+                    tkey=sp.TAddress, tvalue=sp.TNat
+                ),
+                supply_checkpoints=sp.big_map(
+                    {0: sp.record(level=0, balance=supply)} if len(ledger) > 0 else {},
+                    tkey=sp.TNat, tvalue=t_checkpoint
+                ),
+                num_supply_checkpoints=sp.nat(1 if len(ledger) > 0 else 0)
+            )
         Common.__init__(
             self,
             name,
@@ -875,18 +1445,61 @@ class Fa2SingleAsset(OnchainViewsSingleAsset, Common):
     def is_defined(self, token_id):
         return token_id == 0
 
+    def checkpoint_balance(self, owner):
+        """Checkpoint the current balance of `owner`.
+
+        A checkpoint written in the same level replaces the last one.
+        Does nothing if the base was created without `has_checkpoints`.
+        """
+        if self.has_checkpoints:
+            balance = sp.compute(self.data.ledger.get(owner, 0))
+            count = sp.compute(self.data.num_checkpoints.get(owner, 0))
+            def append():
+                self.data.checkpoints[(owner, count)] = sp.record(level=sp.level, balance=balance)
+                self.data.num_checkpoints[owner] = count + 1
+            with sp.if_(count > 0):
+                last = sp.compute((owner, sp.as_nat(count - 1)))
+                with sp.if_(self.data.checkpoints[last].level == sp.level):
+                    self.data.checkpoints[last].balance = balance
+                with sp.else_():
+                    append()
+            with sp.else_():
+                append()
+
+    def checkpoint_supply(self):
+        """Checkpoint the current supply.
+
+        A checkpoint written in the same level replaces the last one.
+        Does nothing if the base was created without `has_checkpoints`.
+        """
+        if self.has_checkpoints:
+            count = sp.compute(self.data.num_supply_checkpoints)
+            def append():
+                self.data.supply_checkpoints[count] = sp.record(level=sp.level, balance=self.data.supply)
+                self.data.num_supply_checkpoints = count + 1
+            with sp.if_(count > 0):
+                last = sp.compute(sp.as_nat(count - 1))
+                with sp.if_(self.data.supply_checkpoints[last].level == sp.level):
+                    self.data.supply_checkpoints[last].balance = self.data.supply
+                with sp.else_():
+                    append()
+            with sp.else_():
+                append()
+
     @sp.entry_point
     def transfer(self, batch):
         """Accept a list of transfer operations between a source and multiple
         destinations."""
         sp.set_type(batch, t_transfer_params)
         if self.policy.supports_transfer:
+            cache = self.policy.make_tx_permissions_cache(self)
             with sp.for_("transfer", batch) as transfer:
+                self.policy.check_tx_batch_permissions(self, transfer, cache)
                 with sp.for_("tx", transfer.txs) as tx:
                     # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
                     sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
                     self.policy.check_tx_transfer_permissions(
-                        self, transfer.from_, tx.to_, tx.token_id
+                        self, transfer.from_, tx.to_, tx.token_id, cache
                     )
                     from_ = transfer.from_
                     # Transfer from.
@@ -902,6 +1515,12 @@ class Fa2SingleAsset(OnchainViewsSingleAsset, Common):
                     # Do the transfer
                     to_ = tx.to_
                     self.data.ledger[to_] = self.data.ledger.get(to_, 0) + tx.amount
+
+                    if self.has_checkpoints:
+                        with sp.if_(tx.amount > 0):
+                            self.checkpoint_balance(from_)
+                            self.checkpoint_balance(to_)
+                self.emit_event("transfer", transfer, t_transfer_batch)
         else:
             sp.failwith("FA2_TX_DENIED")
 
@@ -980,11 +1599,23 @@ class OnchainviewBalanceOf:
 
 
 class MintNft:
-    """(Mixin) Non-standard `mint` entrypoint for FA2Nft with incrementing id.
+    """(Mixin) Non-standard `mint` and `mint_range` entrypoints for FA2Nft
+    with incrementing id.
 
     Requires the `Administrable` mixin.
     """
 
+    def mint_token(self, to_, metadata, royalties=None):
+        """Inline function to mint the next token id to `to_`."""
+        token_id = sp.compute(self.data.last_token_id)
+        self.data.token_metadata[token_id] = sp.record(token_id=token_id, token_info=metadata)
+        self.data.ledger[token_id] = to_
+        self.add_owner_token(to_, token_id)
+        if self.has_royalties:
+            self.data.token_extra[token_id] = sp.record(royalty_info=royalties)
+        self.data.last_token_id += 1
+        self.emit_event("mint", sp.record(owner=to_, token_id=token_id, amount=1), t_mint_burn_event)
+
     @sp.entry_point
     def mint(self, batch):
         """Admin can mint new or existing tokens."""
@@ -996,13 +1627,37 @@ class MintNft:
         with sp.for_("action", batch) as action:
             if self.has_royalties:
                 self.validateRoyalties(action.royalties)
-            token_id = sp.compute(self.data.last_token_id)
-            metadata = sp.record(token_id=token_id, token_info=action.metadata)
-            self.data.token_metadata[token_id] = metadata
-            self.data.ledger[token_id] = action.to_
-            if self.has_royalties:
-                self.data.token_extra[token_id] = sp.record(royalty_info=action.royalties)
-            self.data.last_token_id += 1
+                self.mint_token(action.to_, action.metadata, action.royalties)
+            else:
+                self.mint_token(action.to_, action.metadata)
+
+    @sp.entry_point
+    def mint_range(self, params):
+        """Admin can mint `count` tokens with sequential ids to `to_`.
+
+        The metadata of each token is { "": metadata_prefix + suffix }. If
+        there are no suffixes, all tokens get metadata_prefix.
+        """
+        if self.has_royalties:
+            sp.set_type(params, t_mint_nft_range_royalties)
+        else:
+            sp.set_type(params, t_mint_nft_range)
+        sp.verify(self.isAdministrator(sp.sender), "FA2_NOT_ADMIN")
+        num_suffixes = sp.compute(sp.len(params.metadata_suffixes))
+        sp.verify((num_suffixes == 0) | (num_suffixes == params.count), "FA2_MINT_RANGE_INVALID")
+        if self.has_royalties:
+            self.validateRoyalties(params.royalties)
+            royalties = params.royalties
+        else:
+            royalties = None
+
+        with sp.if_(num_suffixes == 0):
+            metadata = sp.compute(sp.map({"": params.metadata_prefix}))
+            with sp.for_("i", sp.range(0, params.count)):
+                self.mint_token(params.to_, metadata, royalties)
+        with sp.else_():
+            with sp.for_("suffix", params.metadata_suffixes) as suffix:
+                self.mint_token(params.to_, sp.map({"": params.metadata_prefix + suffix}), royalties)
 
 
 class MintFungible:
@@ -1039,15 +1694,23 @@ class MintFungible:
                             supply=action.amount
                         )
                     self.data.ledger[(action.to_, token_id)] = action.amount
+                    if self.has_owner_index:
+                        with sp.if_(action.amount > 0):
+                            self.add_owner_token(action.to_, token_id)
                     self.data.last_token_id += 1
+                    self.emit_event("mint", sp.record(owner=action.to_, token_id=token_id, amount=action.amount), t_mint_burn_event)
                 with arg.match("existing") as token_id:
                     if self.allow_mint_existing:
                         sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
                         self.data.token_extra[token_id].supply += action.amount
                         from_ = (action.to_, token_id)
+                        if self.has_owner_index:
+                            with sp.if_((action.amount > 0) & (self.data.ledger.get(from_, 0) == 0)):
+                                self.add_owner_token(action.to_, token_id)
                         self.data.ledger[from_] = (
                             self.data.ledger.get(from_, 0) + action.amount
                         )
+                        self.emit_event("mint", sp.record(owner=action.to_, token_id=token_id, amount=action.amount), t_mint_burn_event)
                     else:
                         sp.failwith("FA2_TX_DENIED")
 
@@ -1075,6 +1738,7 @@ class MintSingleAsset:
                     self.data.supply = action.amount
                     self.data.ledger[action.to_] = action.amount
                     self.data.last_token_id += 1
+                    self.emit_event("mint", sp.record(owner=action.to_, token_id=token_id, amount=action.amount), t_mint_burn_event)
                 with arg.match("existing") as token_id:
                     sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
                     self.data.supply += action.amount
@@ -1082,6 +1746,9 @@ class MintSingleAsset:
                     self.data.ledger[from_] = (
                         self.data.ledger.get(from_, 0) + action.amount
                     )
+                    self.emit_event("mint", sp.record(owner=action.to_, token_id=token_id, amount=action.amount), t_mint_burn_event)
+            self.checkpoint_balance(action.to_)
+            self.checkpoint_supply()
 
 
 #################
@@ -1115,8 +1782,10 @@ class BurnNft:
                 # Burn the token
                 del self.data.ledger[action.token_id]
                 del self.data.token_metadata[action.token_id]
+                self.remove_owner_token(action.from_, action.token_id)
                 if self.has_royalties:
                     del self.data.token_extra[action.token_id]
+                self.emit_event("burn", sp.record(owner=action.from_, token_id=action.token_id, amount=1), t_mint_burn_event)
 
 
 # TODO: test ledger, metadata, extra removal.
@@ -1143,8 +1812,10 @@ class BurnFungible:
             ))
             with sp.if_(from_balance == 0):
                 del self.data.ledger[from_]
+                self.remove_owner_token(action.from_, action.token_id)
             with sp.else_():
                 self.data.ledger[from_] = from_balance
+            self.emit_event("burn", sp.record(owner=action.from_, token_id=action.token_id, amount=action.amount), t_mint_burn_event)
 
             # Decrease supply or delete of it becomes 0.
             supply = sp.compute(
@@ -1192,6 +1863,7 @@ class BurnSingleAsset:
                 del self.data.ledger[from_]
             with sp.else_():
                 self.data.ledger[from_] = from_balance
+            self.emit_event("burn", sp.record(owner=action.from_, token_id=action.token_id, amount=action.amount), t_mint_burn_event)
 
             # Decrease supply.
             supply = sp.compute(
@@ -1205,6 +1877,127 @@ class BurnSingleAsset:
                     # of allowing a catstrophic failiure.
                     self.data.supply = 0
 
+            self.checkpoint_balance(from_)
+            self.checkpoint_supply()
+
+
+#######################
+# Mixins - Distribute #
+#######################
+
+
+class DistributeFungible:
+    """(Mixin) Non-standard `distribute` entrypoint for FA2Fungible to send
+    a single token to many recipients.
+
+    Requires the `Administrable` mixin.
+    """
+
+    @sp.entry_point
+    def distribute(self, params):
+        """Credit `recipients` with `token_id` tokens in one pass.
+
+        The `transfer` source debits the given address once, for the total,
+        and uses the transfer policy permission. The `mint` source is admin
+        only and increases the supply.
+        """
+        sp.set_type(params, t_distribute_params)
+        sp.verify(self.is_defined(params.token_id), "FA2_TOKEN_UNDEFINED")
+        with params.source.match_cases() as arg:
+            with arg.match("transfer") as from_:
+                sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
+                self.policy.check_tx_transfer_permissions(
+                    self, from_, from_, params.token_id
+                )
+            with arg.match("mint"):
+                sp.verify(self.isAdministrator(sp.sender), "FA2_NOT_ADMIN")
+                if not self.allow_mint_existing:
+                    sp.failwith("FA2_TX_DENIED")
+
+        # Credit the recipients.
+        total = sp.local("total", sp.nat(0))
+        with sp.for_("recipient", params.recipients) as recipient:
+            to_ = (recipient.to_, params.token_id)
+            if self.has_owner_index:
+                with sp.if_((recipient.amount > 0) & (self.data.ledger.get(to_, 0) == 0)):
+                    self.add_owner_token(recipient.to_, params.token_id)
+            self.data.ledger[to_] = self.data.ledger.get(to_, 0) + recipient.amount
+            total.value += recipient.amount
+
+        with params.source.match_cases() as arg:
+            with arg.match("transfer") as from_address:
+                from_ = (from_address, params.token_id)
+                # Debit the source once.
+                from_balance = sp.compute(sp.as_nat(
+                    self.data.ledger.get(from_, 0) - total.value,
+                    message="FA2_INSUFFICIENT_BALANCE",
+                ))
+                with sp.if_(from_balance == 0):
+                    del self.data.ledger[from_]
+                    self.remove_owner_token(from_address, params.token_id)
+                with sp.else_():
+                    self.data.ledger[from_] = from_balance
+            with arg.match("mint"):
+                self.data.token_extra[params.token_id].supply += total.value
+
+        self.emit_distribute_events(params)
+
+
+class DistributeSingleAsset:
+    """(Mixin) Non-standard `distribute` entrypoint for FA2SingleAsset to
+    send the token to many recipients.
+
+    Requires the `Administrable` mixin.
+    """
+
+    @sp.entry_point
+    def distribute(self, params):
+        """Credit `recipients` with tokens in one pass.
+
+        The `transfer` source debits the given address once, for the total,
+        and uses the transfer policy permission. The `mint` source is admin
+        only and increases the supply.
+        """
+        sp.set_type(params, t_distribute_params)
+        sp.verify(self.is_defined(params.token_id), "FA2_TOKEN_UNDEFINED")
+        with params.source.match_cases() as arg:
+            with arg.match("transfer") as from_:
+                sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
+                self.policy.check_tx_transfer_permissions(
+                    self, from_, from_, params.token_id
+                )
+            with arg.match("mint"):
+                sp.verify(self.isAdministrator(sp.sender), "FA2_NOT_ADMIN")
+
+        # Credit the recipients.
+        total = sp.local("total", sp.nat(0))
+        with sp.for_("recipient", params.recipients) as recipient:
+            to_ = recipient.to_
+            self.data.ledger[to_] = self.data.ledger.get(to_, 0) + recipient.amount
+            total.value += recipient.amount
+
+        with params.source.match_cases() as arg:
+            with arg.match("transfer") as from_:
+                # Debit the source once.
+                from_balance = sp.compute(sp.as_nat(
+                    self.data.ledger.get(from_, 0) - total.value,
+                    message="FA2_INSUFFICIENT_BALANCE",
+                ))
+                with sp.if_(from_balance == 0):
+                    del self.data.ledger[from_]
+                with sp.else_():
+                    self.data.ledger[from_] = from_balance
+                self.checkpoint_balance(from_)
+            with arg.match("mint"):
+                self.data.supply += total.value
+                self.checkpoint_supply()
+
+        if self.has_checkpoints:
+            with sp.for_("recipient", params.recipients) as recipient:
+                self.checkpoint_balance(recipient.to_)
+
+        self.emit_distribute_events(params)
+
 
 # TODO: implement versum views?
 class Royalties:
@@ -1258,4 +2051,84 @@ class OnchainviewCountTokens:
     @sp.onchain_view(pure=True)
     def count_tokens(self):
         """Returns the number of tokens in the FA2 contract."""
-        sp.result(self.data.last_token_id)
\ No newline at end of file
+        sp.result(self.data.last_token_id)
+
+
+class OnchainviewTokensOfOwner:
+    """(Mixin) Adds the tokens_of_owner onchain view.
+    Requires has_owner_index=True on base."""
+
+    def __init__(self):
+        if self.ledger_type == "SingleAsset":
+            raise Exception("Owner index not supported on SingleAsset")
+        if self.has_owner_index != True:
+            raise Exception("Owner index not enabled on base")
+
+    @sp.onchain_view(pure=True)
+    def tokens_of_owner(self, params):
+        """Returns the token ids owned by `owner`, paginated by `offset` and
+        `limit`. For fungible tokens, only nonzero balances are included.
+
+        Only the result is paginated. The owner's whole set is loaded and
+        iterated, the cost grows with the number of tokens owned."""
+        sp.set_type(params, t_tokens_of_owner_params)
+        token_ids = sp.local("token_ids", sp.list(t=sp.TNat))
+        index = sp.local("index", sp.nat(0))
+        end = sp.compute(params.offset + params.limit)
+        with sp.for_("token_id", self.data.owner_tokens.get(params.owner, sp.set(t=sp.TNat)).elements()) as token_id:
+            with sp.if_((index.value >= params.offset) & (index.value < end)):
+                token_ids.value.push(token_id)
+            index.value += 1
+        sp.result(token_ids.value.rev())
+
+
+class OnchainviewCheckpoints:
+    """(Mixin) Adds the get_balance_at and total_supply_at onchain views.
+    Requires has_checkpoints=True on a SingleAsset base."""
+
+    def __init__(self):
+        if self.ledger_type != "SingleAsset":
+            raise Exception("Checkpoints only supported on SingleAsset")
+        if self.has_checkpoints != True:
+            raise Exception("Checkpoints not enabled on base")
+
+    def find_checkpoint(self, count, get_checkpoint, level):
+        """Inline function to binary search the balance at `level` in
+        `count` checkpoints. `get_checkpoint` maps an index to a checkpoint."""
+        count = sp.compute(count)
+        balance = sp.local("balance", sp.nat(0))
+        with sp.if_(count > 0):
+            lower = sp.local("lower", sp.nat(0))
+            upper = sp.local("upper", sp.as_nat(count - 1))
+            with sp.if_(get_checkpoint(upper.value).level <= level):
+                balance.value = get_checkpoint(upper.value).balance
+            with sp.else_():
+                with sp.if_(get_checkpoint(lower.value).level <= level):
+                    # The checkpoint at lower is at or before level,
+                    # the one at upper after it.
+                    with sp.while_(upper.value > lower.value + 1):
+                        center = sp.compute((lower.value + upper.value) // 2)
+                        with sp.if_(get_checkpoint(center).level <= level):
+                            lower.value = center
+                        with sp.else_():
+                            upper.value = center
+                    balance.value = get_checkpoint(lower.value).balance
+        return balance.value
+
+    @sp.onchain_view(pure=True)
+    def get_balance_at(self, params):
+        """Returns the balance of `owner` at the end of `level`."""
+        sp.set_type(params, t_balance_at_params)
+        sp.result(self.find_checkpoint(
+            self.data.num_checkpoints.get(params.owner, 0),
+            lambda index: self.data.checkpoints[(params.owner, index)],
+            params.level))
+
+    @sp.onchain_view(pure=True)
+    def total_supply_at(self, level):
+        """Returns the total supply at the end of `level`."""
+        sp.set_type(level, sp.TNat)
+        sp.result(self.find_checkpoint(
+            self.data.num_supply_checkpoints,
+            lambda index: self.data.supply_checkpoints[index],
+            level))
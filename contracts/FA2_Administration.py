@@ -7,6 +7,34 @@ class FA2_Administration(admin_mixin.Administrable):
     def __init__(self, administrator):
         admin_mixin.Administrable.__init__(self, administrator = administrator)
 
+    def transferFA2Administrator(self, fa2, proposed_fa2_administrator):
+        """Inline function to propose an FA2 administrator transfer."""
+        # Get a handle on the FA2 contract transfer_administator entry point
+        fa2_transfer_administrator_handle = sp.contract(
+            t=sp.TAddress,
+            address=fa2,
+            entry_point="transfer_administrator").open_some()
+
+        # Propose to transfer the FA2 token contract administrator
+        sp.transfer(
+            arg=proposed_fa2_administrator,
+            amount=sp.mutez(0),
+            destination=fa2_transfer_administrator_handle)
+
+    def acceptFA2Administrator(self, fa2):
+        """Inline function to accept an FA2 administrator transfer."""
+        # Get a handle on the FA2 contract accept_administrator entry point
+        fa2_accept_administrator_handle = sp.contract(
+            t=sp.TUnit,
+            address=fa2,
+            entry_point="accept_administrator").open_some()
+
+        # Accept the FA2 token contract administrator responsabilities
+        sp.transfer(
+            arg=sp.unit,
+            amount=sp.mutez(0),
+            destination=fa2_accept_administrator_handle)
+
     @sp.entry_point
     def transfer_fa2_administrator(self, transfer_list):
         """Proposes to transfer the FA2 token contracts administator to another
@@ -19,17 +47,7 @@ class FA2_Administration(admin_mixin.Administrable):
         self.onlyAdministrator()
 
         with sp.for_("transfer", transfer_list) as transfer:
-            # Get a handle on the FA2 contract transfer_administator entry point
-            fa2_transfer_administrator_handle = sp.contract(
-                t=sp.TAddress,
-                address=transfer.fa2,
-                entry_point="transfer_administrator").open_some()
-
-            # Propose to transfer the FA2 token contract administrator
-            sp.transfer(
-                arg=transfer.proposed_fa2_administrator,
-                amount=sp.mutez(0),
-                destination=fa2_transfer_administrator_handle)
+            self.transferFA2Administrator(transfer.fa2, transfer.proposed_fa2_administrator)
 
     @sp.entry_point
     def accept_fa2_administrator(self, accept_list):
@@ -39,14 +57,4 @@ class FA2_Administration(admin_mixin.Administrable):
         self.onlyAdministrator()
 
         with sp.for_("fa2", accept_list) as fa2:
-            # Get a handle on the FA2 contract accept_administrator entry point
-            fa2_accept_administrator_handle = sp.contract(
-                t=sp.TUnit,
-                address=fa2,
-                entry_point="accept_administrator").open_some()
-
-            # Accept the FA2 token contract administrator responsabilities
-            sp.transfer(
-                arg=sp.unit,
-                amount=sp.mutez(0),
-                destination=fa2_accept_administrator_handle)
+            self.acceptFA2Administrator(fa2)
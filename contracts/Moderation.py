@@ -2,21 +2,39 @@ import smartpy as sp
 
 admin_mixin = sp.io.import_script_from_url("file:contracts/Administrable.py")
 
+# Batched get_flagged view of the moderation contract.
+# Takes a list of (fa2, token_id), returns the set of flagged ones.
+t_token_list = sp.TList(sp.TPair(sp.TAddress, sp.TNat))
+t_flagged_set = sp.TSet(sp.TPair(sp.TAddress, sp.TNat))
+
 
 class Moderation(admin_mixin.Administrable):
-    """Mixin to add moderation_contract address to a contract's storage.
+    """Mixin to add an optional moderation_contract address to a contract's storage.
     
-    Can then later be used through add moderation functions through upgrades."""
+    If it's set, onlyUnflagged checks tokens against it. Unset by default."""
     def __init__(self, administrator):
         self.update_initial_storage(
-            moderation_contract = administrator # points to administrator by default
+            moderation_contract = sp.set_type_expr(sp.none, sp.TOption(sp.TAddress)) # no moderation by default
         )
         admin_mixin.Administrable.__init__(self, administrator = administrator)
 
     @sp.entry_point
     def set_moderation_contract(self, moderation_contract):
-        """Set moderation contract.
+        """Set or unset moderation contract.
         """
-        sp.set_type(moderation_contract, sp.TAddress)
+        sp.set_type(moderation_contract, sp.TOption(sp.TAddress))
         self.onlyAdministrator()
         self.data.moderation_contract = moderation_contract
+
+    def onlyUnflagged(self, fa2, token_id):
+        """Fails if the token is flagged by the moderation contract.
+
+        Skipped if no moderation contract is set. Fails closed if the
+        moderation contract doesn't have the get_flagged view."""
+        fa2 = sp.set_type_expr(fa2, sp.TAddress)
+        token_id = sp.set_type_expr(token_id, sp.TNat)
+        with sp.if_(self.data.moderation_contract.is_some()):
+            flagged = sp.view("get_flagged", self.data.moderation_contract.open_some(),
+                sp.set_type_expr(sp.list([sp.pair(fa2, token_id)]), t_token_list),
+                t = t_flagged_set).open_some(message = "MODERATION_VIEW")
+            sp.verify(sp.len(flagged) == 0, message = "TOKEN_FLAGGED")
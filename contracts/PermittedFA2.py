@@ -20,6 +20,10 @@ royaltiesKindVariantType = sp.TVariant(
     other6 = sp.TUnit  # reserved
 )
 
+# Max number of versum style royalty splits. Each split is paid
+# in its own operation, this bounds the gas of a sale.
+MAX_ROYALTY_SPLITS = sp.nat(10)
+
 permittedFA2MapValueType = sp.TRecord(
     swap_allowed = sp.TBool, # If the token is allowed to be swapped. This is a little extra.
     royalties_kind = royaltiesKindVariantType, # If the token has royalties and what kind they are.
@@ -55,6 +59,91 @@ class Permitted_fa2_param:
         return sp.set_type_expr(fa2, self.get_remove_type())
 
 
+def get_royalties_for_kind(token_id, fa2, royalties_kind):
+    """Returns royalties info for a token, normalised to FA2.t_royalties.
+
+    Makes as few view calls as possible for each kind:
+    - tz1and: 1 view.
+    - combined: 1 view.
+    - versum: 1 view if there are no royalties, 2 if there are splits, 3 otherwise.
+    """
+    token_id = sp.set_type_expr(token_id, sp.TNat)
+    fa2 = sp.set_type_expr(fa2, sp.TAddress)
+    royalties_kind = sp.set_type_expr(royalties_kind, royaltiesKindVariantType)
+
+    token_royalty_info = sp.local("token_royalty_info",
+        sp.record(royalties=0, contributors=[]),
+        t=FA2.t_royalties)
+
+    # versum style royalties to normalise.
+    royalty_shares = sp.local("royalty_shares", sp.none,
+        t=sp.TOption(sp.TPair(sp.TNat, utils.t_royalty_shares)))
+
+    with royalties_kind.match_cases() as arg:
+        #with arg.match("none"): # none is implied to return default royalty info
+        with arg.match("tz1and"):
+            token_royalty_info.value = utils.tz1and_items_get_royalties(fa2, token_id)
+        with arg.match("combined"):
+            combined = sp.compute(utils.combined_get_royalties(fa2, token_id))
+            with sp.if_(sp.len(combined.splits) == 0):
+                royalty_shares.value = sp.some(sp.pair(combined.royalty,
+                    sp.list([sp.record(address=combined.creator, pct=sp.nat(1))])))
+            with sp.else_():
+                royalty_shares.value = sp.some(sp.pair(combined.royalty, combined.splits))
+        with arg.match("versum"):
+            royalty = sp.compute(utils.versum_get_royalty(fa2, token_id))
+            # Only get splits and creator if there are royalties to pay.
+            with sp.if_(royalty > 0):
+                splits = sp.compute(utils.versum_get_splits(fa2, token_id))
+                with sp.if_(sp.len(splits) == 0):
+                    royalty_shares.value = sp.some(sp.pair(royalty,
+                        sp.list([sp.record(address=utils.versum_get_creator(fa2, token_id), pct=sp.nat(1))])))
+                with sp.else_():
+                    royalty_shares.value = sp.some(sp.pair(royalty, splits))
+        with arg.match("other1"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+        with arg.match("other2"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+        with arg.match("other3"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+        with arg.match("other4"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+        with arg.match("other5"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+        with arg.match("other6"):
+            sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
+
+    # Normalise shares to relative royalties in permille
+    # and cap absolute royalties.
+    with sp.if_(royalty_shares.value.is_some()):
+        shares = sp.compute(royalty_shares.value.open_some())
+        sp.verify(sp.len(sp.snd(shares)) <= MAX_ROYALTY_SPLITS, message="TOO_MANY_ROYALTY_SPLITS")
+        total_shares = sp.local("total_shares", sp.nat(0))
+        with sp.for_("share", sp.snd(shares)) as share:
+            total_shares.value += share.pct
+        with sp.if_(total_shares.value > 0):
+            contributors = sp.local("contributors", [], t=FA2.t_contributor_list)
+            # The last share gets the rounding remainder,
+            # so relative royalties always add up to 1000.
+            remaining_permille = sp.local("remaining_permille", sp.nat(1000))
+            shares_left = sp.local("shares_left", sp.len(sp.snd(shares)))
+            with sp.for_("contributor_share", sp.snd(shares)) as share:
+                shares_left.value = sp.as_nat(shares_left.value - 1)
+                relative_royalties = sp.compute(sp.eif(shares_left.value == 0,
+                    remaining_permille.value,
+                    share.pct * 1000 / total_shares.value))
+                remaining_permille.value = sp.as_nat(remaining_permille.value - relative_royalties)
+                contributors.value.push(sp.record(
+                    address=share.address,
+                    relative_royalties=relative_royalties,
+                    role=sp.variant("creator", sp.unit)))
+            token_royalty_info.value = sp.record(
+                royalties=sp.min(sp.fst(shares), FA2.Royalties.MAX_ROYALTIES),
+                contributors=contributors.value)
+
+    return token_royalty_info.value
+
+
 # NOTE:
 # When a permitted FA2 is removed, that will break swaps, auctions, etc.
 # I think this is desired. But make sure to give a good error message.
@@ -95,32 +184,12 @@ class PermittedFA2(admin_mixin.Administrable):
         # In the dutch auction contract, this should never happen.
         sp.verify(fa2_props.swap_allowed == True, message="SWAP_NOT_ALLOWED")
 
-        token_royalty_info = sp.local("token_royalty_info",
-            sp.record(royalties=0, contributors=[]),
-            t=FA2.t_royalties)
-
-        with fa2_props.royalties_kind.match_cases() as arg:
-            #with arg.match("none"): # none is implied to return default royalty info
-            with arg.match("tz1and"):
-                token_royalty_info.value = utils.tz1and_items_get_royalties(auction_fa2, token_id)
-            with arg.match("combined"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("versum"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other1"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other2"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other3"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other4"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other5"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-            with arg.match("other6"):
-                sp.failwith("ROYALTIES_NOT_IMPLEMENTED")
-        
-        return token_royalty_info.value
+        return self.getRoyaltiesForKind(token_id, auction_fa2, fa2_props.royalties_kind)
+
+
+    def getRoyaltiesForKind(self, token_id, fa2, royalties_kind):
+        """Returns royalties info for a token, normalised to FA2.t_royalties."""
+        return get_royalties_for_kind(token_id, fa2, royalties_kind)
 
 
     @sp.entry_point
@@ -7,6 +7,7 @@ mod_mixin = sp.io.import_script_from_url("file:contracts/Moderation.py")
 permitted_fa2 = sp.io.import_script_from_url("file:contracts/PermittedFA2.py")
 upgradeable_mixin = sp.io.import_script_from_url("file:contracts/Upgradeable.py")
 utils = sp.io.import_script_from_url("file:contracts/Utils.py")
+FA2 = sp.io.import_script_from_url("file:contracts/FA2.py")
 
 # TODO: test royalties for item token
 
@@ -15,6 +16,104 @@ utils = sp.io.import_script_from_url("file:contracts/Utils.py")
 # unpacked with sp.unpack.
 extensionArgType = sp.TOption(sp.TMap(sp.TString, sp.TBytes))
 
+#
+# Library functions. Either inlined or called as
+# lambdas from storage, see TL_Dutch use_lib.
+t_fa2_transfer_params = sp.TRecord(
+    fa2 = sp.TAddress,
+    from_ = sp.TAddress,
+    to_ = sp.TAddress,
+    token_id = sp.TNat,
+    amount = sp.TNat
+).layout(("fa2", ("from_", ("to_", ("token_id", "amount")))))
+
+def fa2_transfer(params):
+    """Transfer amount of token_id from from_ to to_."""
+    sp.set_type(params, t_fa2_transfer_params)
+    utils.fa2_transfer(params.fa2, params.from_, params.to_, params.token_id, params.amount)
+
+t_payout_params = sp.TRecord(
+    ask_price = sp.TMutez,
+    overpay = sp.TMutez,
+    buyer = sp.TAddress,
+    seller = sp.TAddress,
+    fees = sp.TNat,
+    fees_to = sp.TAddress,
+    royalties = FA2.t_royalties
+).layout(("ask_price", ("overpay", ("buyer", ("seller", ("fees", ("fees_to", "royalties")))))))
+
+def payout(params):
+    """Pay overpay to buyer, royalties to contributors, fees to fees_to
+    and the rest of ask_price to seller."""
+    sp.set_type(params, t_payout_params)
+
+    # Collect amounts to send in a map.
+    send_map = sp.local("send_map", sp.map(tkey=sp.TAddress, tvalue=sp.TMutez))
+    def addToSendMap(address, amount):
+        send_map.value[address] = send_map.value.get(address, sp.mutez(0)) + amount
+
+    # Send back overpay, if there was any.
+    addToSendMap(params.buyer, params.overpay)
+
+    with sp.if_(params.ask_price != sp.tez(0)):
+        token_royalty_info = params.royalties
+
+        # Calculate fees.
+        fee = sp.compute(sp.utils.mutez_to_nat(params.ask_price) * (token_royalty_info.royalties + params.fees) / sp.nat(1000))
+        royalties = sp.compute(token_royalty_info.royalties * fee / (token_royalty_info.royalties + params.fees))
+
+        # If there are any royalties to be paid.
+        with sp.if_(royalties > sp.nat(0)):
+            # Pay each contributor his relative share.
+            with sp.for_("contributor", token_royalty_info.contributors) as contributor:
+                # Calculate amount to be paid from relative share.
+                absolute_amount = sp.compute(sp.utils.nat_to_mutez(royalties * contributor.relative_royalties / 1000))
+                addToSendMap(contributor.address, absolute_amount)
+
+        # TODO: don't localise nat_to_mutez, is probably a cast and free.
+        # Send management fees.
+        send_mgr_fees = sp.compute(sp.utils.nat_to_mutez(abs(fee - royalties)))
+        addToSendMap(params.fees_to, send_mgr_fees)
+
+        # Send rest of the value to seller.
+        send_seller = sp.compute(params.ask_price - sp.utils.nat_to_mutez(fee))
+        addToSendMap(params.seller, send_seller)
+
+    # Transfer.
+    with sp.for_("send", send_map.value.items()) as send:
+        utils.send_if_value(send.key, send.value)
+
+t_get_royalties_params = sp.TRecord(
+    token_id = sp.TNat,
+    fa2 = sp.TAddress,
+    royalties_kind = permitted_fa2.royaltiesKindVariantType
+).layout(("token_id", ("fa2", "royalties_kind")))
+
+def get_royalties(params):
+    """Returns royalties for a token, see PermittedFA2."""
+    sp.set_type(params, t_get_royalties_params)
+    sp.result(permitted_fa2.get_royalties_for_kind(params.token_id, params.fa2, params.royalties_kind))
+
+# name: (function, argument type, result type, with_operations)
+LIBS = {
+    "fa2_transfer": (fa2_transfer, t_fa2_transfer_params, sp.TUnit, True),
+    "payout": (payout, t_payout_params, sp.TUnit, True),
+    "get_royalties": (get_royalties, t_get_royalties_params, FA2.t_royalties, False),
+}
+
+#
+# Market stats, see TL_Dutch market_stats.
+t_market_stats = sp.TRecord(
+    listings = sp.TNat, # Number of open auctions.
+    sales = sp.TNat, # Number of successful bids.
+    volume = sp.TMutez, # Sum of all sale prices.
+    last_price = sp.TMutez, # Price of the last sale.
+    ema_price = sp.TMutez # Exponential moving average of sale prices.
+).layout(("listings", ("sales", ("volume", ("last_price", "ema_price")))))
+
+# The number of sales the moving average is smoothed over.
+MARKET_STATS_EMA_PERIOD = 10
+
 #
 # Dutch auction contract.
 # NOTE: should be pausable for code updates.
@@ -41,7 +140,17 @@ class TL_Dutch(
     ).layout(("owner", ("token_id", ("start_price",
         ("end_price", ("start_time", ("end_time", "fa2")))))))
 
-    def __init__(self, administrator, items_contract, places_contract, metadata, exception_optimization_level="default-line"):
+    def __init__(self, administrator, items_contract, places_contract, metadata, use_lib=True, market_stats=False, exception_optimization_level="default-line"):
+        """use_lib: if true, transfers, payouts and royalties are lambdas
+        shared between entrypoints, instead of inlined into each one.
+        Makes lazy entrypoints smaller, but the lambdas need to be
+        unpacked when called.
+
+        market_stats: if true, keeps per-fa2 market stats, updated in
+        create, cancel and bid, and adds the get_market_stats view.
+        Costs some gas on every one of those calls."""
+        self.use_lib = use_lib
+        self.market_stats = market_stats
         self.add_flag("exceptions", exception_optimization_level)
         self.add_flag("erase-comments")
         
@@ -51,14 +160,31 @@ class TL_Dutch(
             secondary_enabled = sp.bool(False), # If the secondary market is enabled.
             auction_id = sp.nat(0), # the auction id counter.
             granularity = sp.nat(60), # Globally controls the granularity of price drops. in seconds.
-            auctions = sp.big_map(tkey=sp.TNat, tvalue=TL_Dutch.AUCTION_TYPE)
+            minter_contract = sp.set_type_expr(sp.none, sp.TOption(sp.TAddress)), # The minter allowed to call create_minted.
+            auctions = sp.big_map(tkey=sp.TNat, tvalue=TL_Dutch.AUCTION_TYPE),
+            royalties_cache_fa2 = sp.big_map(tkey=sp.TAddress, tvalue=sp.TUnit), # FA2s with immutable royalties.
+            royalties_cache = sp.big_map(tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=FA2.t_royalties)
         )
+        if market_stats:
+            self.update_initial_storage(
+                market_stats = sp.big_map(tkey=sp.TAddress, tvalue=t_market_stats)
+            )
+
+            def get_market_stats(self, fa2):
+                """Returns the market stats for an FA2."""
+                sp.set_type(fa2, sp.TAddress)
+                sp.result(self.data.market_stats.get(fa2, default_value=self.emptyMarketStats()))
+
+            self.get_market_stats = sp.onchain_view(pure=True)(get_market_stats)
         pause_mixin.Pausable.__init__(self, administrator = administrator)
         whitelist_mixin.Whitelist.__init__(self, administrator = administrator)
         fees_mixin.Fees.__init__(self, administrator = administrator)
         mod_mixin.Moderation.__init__(self, administrator = administrator)
         upgradeable_mixin.Upgradeable.__init__(self, administrator = administrator,
-            entrypoints = ['create', 'cancel', 'bid'])
+            entrypoints = ['create', 'create_minted', 'cancel', 'bid'],
+            libs = {name: (sp.build_lambda(f, with_operations = with_operations),
+                    sp.TLambda(t_arg, t_result, with_operations = with_operations))
+                for name, (f, t_arg, t_result, with_operations) in LIBS.items()} if use_lib else {})
 
         default_permitted = { places_contract : sp.record(
             swap_allowed = True,
@@ -101,6 +227,82 @@ class TL_Dutch(
         with sp.if_(~ self.data.secondary_enabled):
             self.onlyAdministrator()
 
+    def validateAuctionParams(self, params):
+        """Fails if auction times or prices are invalid."""
+        sp.verify((params.start_time >= sp.now) &
+            (params.start_time < params.end_time) &
+            (abs(params.end_time - params.start_time) > self.data.granularity) &
+            (params.start_price >= params.end_price), message = "INVALID_PARAM")
+
+    def fa2Transfer(self, fa2, from_, to_, token_id, amount):
+        """Transfer amount of token_id from from_ to_."""
+        params = sp.record(fa2 = fa2, from_ = from_, to_ = to_, token_id = token_id, amount = amount)
+        if self.use_lib:
+            self.execLib("fa2_transfer", params)
+        else:
+            fa2_transfer(params)
+
+    def payout(self, params):
+        """Pay out a bid, see payout."""
+        if self.use_lib:
+            self.execLib("payout", params)
+        else:
+            payout(params)
+
+    def getRoyalties(self, token_id, fa2, royalties_kind):
+        """Returns royalties for a token, see PermittedFA2."""
+        if self.use_lib:
+            return self.callLib("get_royalties", sp.record(token_id = token_id, fa2 = fa2, royalties_kind = royalties_kind))
+        else:
+            return self.getRoyaltiesForKind(token_id, fa2, royalties_kind)
+
+    def getRoyaltiesCached(self, token_id, fa2):
+        """Returns royalties for a token of a permitted FA2.
+
+        For FA2s with immutable royalties, they are cached on first use."""
+        token_id = sp.set_type_expr(token_id, sp.TNat)
+        fa2 = sp.set_type_expr(fa2, sp.TAddress)
+
+        fa2_props = self.getPermittedFA2Props(fa2)
+        sp.verify(fa2_props.swap_allowed == True, message="SWAP_NOT_ALLOWED")
+
+        cache_key = sp.compute(sp.pair(fa2, token_id))
+        royalties = sp.local("cached_royalties", sp.record(royalties=0, contributors=[]), t=FA2.t_royalties)
+        with sp.if_(self.data.royalties_cache.contains(cache_key)):
+            royalties.value = self.data.royalties_cache[cache_key]
+        with sp.else_():
+            royalties.value = self.getRoyalties(token_id, fa2, fa2_props.royalties_kind)
+            with sp.if_(self.data.royalties_cache_fa2.contains(fa2)):
+                self.data.royalties_cache[cache_key] = royalties.value
+        return royalties.value
+
+    def emptyMarketStats(self):
+        """Market stats for an FA2 without any auctions."""
+        return sp.record(listings = sp.nat(0), sales = sp.nat(0), volume = sp.tez(0),
+            last_price = sp.tez(0), ema_price = sp.tez(0))
+
+    def updateMarketStats(self, fa2, listed, sale_price = None):
+        """Count an auction as listed or unlisted and, optionally,
+        as a sale. Does nothing if market_stats is disabled."""
+        if self.market_stats:
+            stats = sp.local("market_stats", self.data.market_stats.get(fa2, default_value=self.emptyMarketStats()))
+            if listed:
+                stats.value.listings += 1
+            else:
+                stats.value.listings = sp.as_nat(stats.value.listings - 1)
+
+            if sale_price is not None:
+                with sp.if_(stats.value.sales == 0):
+                    stats.value.ema_price = sale_price
+                with sp.else_():
+                    stats.value.ema_price = (sp.split_tokens(stats.value.ema_price, MARKET_STATS_EMA_PERIOD - 1, MARKET_STATS_EMA_PERIOD) +
+                        sp.split_tokens(sale_price, 1, MARKET_STATS_EMA_PERIOD))
+                stats.value.sales += 1
+                stats.value.volume += sale_price
+                stats.value.last_price = sale_price
+
+            self.data.market_stats[fa2] = stats.value
+
     #
     # Manager-only entry points
     #
@@ -119,6 +321,34 @@ class TL_Dutch(
         self.onlyAdministrator()
         self.data.secondary_enabled = enabled
 
+
+    @sp.entry_point
+    def set_minter_contract(self, minter_contract):
+        """Set the minter contract allowed to call create_minted."""
+        sp.set_type(minter_contract, sp.TOption(sp.TAddress))
+        self.onlyAdministrator()
+        self.data.minter_contract = minter_contract
+
+    @sp.entry_point
+    def manage_royalties_cache(self, updates):
+        """Enable/disable the royalties cache for FA2s with immutable
+        royalties or remove cached royalties."""
+        sp.set_type(updates, sp.TList(sp.TVariant(
+            cache_enable=sp.TAddress,
+            cache_disable=sp.TAddress,
+            cache_remove=sp.TList(sp.TPair(sp.TAddress, sp.TNat))
+        ).layout(("cache_enable", ("cache_disable", "cache_remove")))))
+        self.onlyAdministrator()
+        with sp.for_("update", updates) as update:
+            with update.match_cases() as arg:
+                with arg.match("cache_enable") as upd:
+                    self.data.royalties_cache_fa2[upd] = sp.unit
+                with arg.match("cache_disable") as upd:
+                    del self.data.royalties_cache_fa2[upd]
+                with arg.match("cache_remove") as upd:
+                    with sp.for_("key", upd) as key:
+                        del self.data.royalties_cache[key]
+
     #
     # Public entry points
     #
@@ -147,10 +377,8 @@ class TL_Dutch(
 
         # verify inputs
         self.onlyPermittedFA2(params.fa2)
-        sp.verify((params.start_time >= sp.now) &
-            (params.start_time < params.end_time) &
-            (abs(params.end_time - params.start_time) > self.data.granularity) &
-            (params.start_price >= params.end_price), message = "INVALID_PARAM")
+        self.validateAuctionParams(params)
+        self.onlyUnflagged(params.fa2, params.token_id)
 
         # call fa2_balance or is_operator to avoid burning gas on bigmap insert.
         sp.verify(utils.fa2_get_balance(params.fa2, params.token_id, sp.sender) > 0, message = "NOT_OWNER")
@@ -168,8 +396,55 @@ class TL_Dutch(
 
         self.data.auction_id += 1
 
+        self.updateMarketStats(params.fa2, True)
+
         # Transfer token (place)
-        utils.fa2_transfer(params.fa2, sp.sender, sp.self_address, params.token_id, 1)
+        self.fa2Transfer(params.fa2, sp.sender, sp.self_address, params.token_id, 1)
+
+
+    @sp.entry_point(lazify = True)
+    def create_minted(self, params):
+        """Create a dutch auction for a freshly minted token.
+
+        Only callable by the minter contract, after it minted amount
+        tokens to the auction contract. The token is already in escrow,
+        so no operator or balance check is needed. One token is kept for
+        the auction, the rest is transferred to the owner.
+        """
+        sp.set_type(params, utils.t_create_minted_params)
+
+        self.onlyUnpaused()
+        sp.verify(self.data.minter_contract == sp.some(sp.sender), message = "ONLY_MINTER")
+
+        # If secondary is disabled, only admin can create auctions.
+        with sp.if_(~ self.data.secondary_enabled):
+            sp.verify(params.owner == self.data.administrator, message = "ONLY_ADMIN")
+
+        # verify inputs
+        self.onlyPermittedFA2(params.fa2)
+        self.validateAuctionParams(params)
+        sp.verify(params.amount > 0, message = "INVALID_PARAM")
+        # Flags can be set before a token is minted.
+        self.onlyUnflagged(params.fa2, params.token_id)
+
+        # Create auction
+        self.data.auctions[self.data.auction_id] = sp.record(
+            owner=params.owner,
+            token_id=params.token_id,
+            start_price=params.start_price,
+            end_price=params.end_price,
+            start_time=params.start_time,
+            end_time=params.end_time,
+            fa2=params.fa2
+        )
+
+        self.data.auction_id += 1
+
+        self.updateMarketStats(params.fa2, True)
+
+        # Transfer the rest of the tokens to the owner.
+        with sp.if_(params.amount > 1):
+            self.fa2Transfer(params.fa2, sp.self_address, params.owner, params.token_id, sp.as_nat(params.amount - 1))
 
 
     @sp.entry_point(lazify = True)
@@ -192,7 +467,9 @@ class TL_Dutch(
         sp.verify(the_auction.owner == sp.sender, message = "NOT_OWNER")
 
         # transfer token back to auction owner.
-        utils.fa2_transfer(the_auction.fa2, sp.self_address, the_auction.owner, the_auction.token_id, 1)
+        self.fa2Transfer(the_auction.fa2, sp.self_address, the_auction.owner, the_auction.token_id, 1)
+
+        self.updateMarketStats(the_auction.fa2, False)
 
         del self.data.auctions[params.auction_id]
 
@@ -215,11 +492,14 @@ class TL_Dutch(
 
         # If auction owner is admin, sender needs to be whitelisted, if whitelist is enabled.
         with sp.if_(the_auction.value.owner == self.data.administrator):
-            self.onlyWhitelisted()
+            self.onlyWhitelisted(params.extension)
 
         # check auction has started
         sp.verify(sp.now >= the_auction.value.start_time, message = "NOT_STARTED")
 
+        # Check token isn't flagged.
+        self.onlyUnflagged(the_auction.value.fa2, the_auction.value.token_id)
+
         # calculate current price and verify amount sent
         ask_price = self.getAuctionPriceInline(the_auction.value)
         #sp.trace(sp.now)
@@ -228,49 +508,29 @@ class TL_Dutch(
         # check if correct value was sent. probably best to send back overpay instead of cancel.
         sp.verify(sp.amount >= ask_price, message = "WRONG_AMOUNT")
 
-        # Collect amounts to send in a map.
-        send_map = sp.local("send_map", sp.map(tkey=sp.TAddress, tvalue=sp.TMutez))
-        def addToSendMap(address, amount):
-            send_map.value[address] = send_map.value.get(address, sp.mutez(0)) + amount
-
-        # Send back overpay, if there was any.
-        overpay = sp.amount - ask_price
-        addToSendMap(sp.sender, overpay)
-
+        # Get royalties, only if there's something to pay.
+        bid_royalties = sp.local("bid_royalties", sp.record(royalties=0, contributors=[]), t=FA2.t_royalties)
         with sp.if_(ask_price != sp.tez(0)):
-            token_royalty_info = sp.compute(self.getRoyaltiesForPermittedFA2(the_auction.value.token_id, the_auction.value.fa2))
-
-            # Calculate fees.
-            fee = sp.compute(sp.utils.mutez_to_nat(ask_price) * (token_royalty_info.royalties + self.data.fees) / sp.nat(1000))
-            royalties = sp.compute(token_royalty_info.royalties * fee / (token_royalty_info.royalties + self.data.fees))
-
-            # If there are any royalties to be paid.
-            with sp.if_(royalties > sp.nat(0)):
-                # Pay each contributor his relative share.
-                with sp.for_("contributor", token_royalty_info.contributors) as contributor:
-                    # Calculate amount to be paid from relative share.
-                    absolute_amount = sp.compute(sp.utils.nat_to_mutez(royalties * contributor.relative_royalties / 1000))
-                    addToSendMap(contributor.address, absolute_amount)
-
-            # TODO: don't localise nat_to_mutez, is probably a cast and free.
-            # Send management fees.
-            send_mgr_fees = sp.compute(sp.utils.nat_to_mutez(abs(fee - royalties)))
-            addToSendMap(self.data.fees_to, send_mgr_fees)
-
-            # Send rest of the value to seller.
-            send_seller = sp.compute(ask_price - sp.utils.nat_to_mutez(fee))
-            addToSendMap(the_auction.value.owner, send_seller)
-
-        # Transfer.
-        with sp.for_("send", send_map.value.items()) as send:
-            utils.send_if_value(send.key, send.value)
+            bid_royalties.value = self.getRoyaltiesCached(the_auction.value.token_id, the_auction.value.fa2)
+
+        # Pay overpay, royalties, fees and seller.
+        self.payout(sp.record(
+            ask_price = ask_price,
+            overpay = sp.amount - ask_price,
+            buyer = sp.sender,
+            seller = the_auction.value.owner,
+            fees = self.data.fees,
+            fees_to = self.data.fees_to,
+            royalties = bid_royalties.value))
 
         # Transfer item to buyer.
-        utils.fa2_transfer(the_auction.value.fa2, sp.self_address, sp.sender, the_auction.value.token_id, 1)
+        self.fa2Transfer(the_auction.value.fa2, sp.self_address, sp.sender, the_auction.value.token_id, 1)
 
         # If it was a whitelist required auction, remove from whitelist.
         with sp.if_(the_auction.value.owner == self.data.administrator):
-            self.removeFromWhitelist(sp.sender)
+            self.removeFromWhitelist(sp.sender, params.extension)
+
+        self.updateMarketStats(the_auction.value.fa2, False, ask_price)
 
         del self.data.auctions[params.auction_id]
 
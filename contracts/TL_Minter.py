@@ -8,6 +8,42 @@ utils = sp.io.import_script_from_url("file:contracts/Utils.py")
 FA2 = sp.io.import_script_from_url("file:contracts/FA2.py")
 
 
+t_mint_item_params = sp.TRecord(
+    to_ = sp.TAddress,
+    amount = sp.TNat,
+    royalties = sp.TNat,
+    contributors = FA2.t_contributor_list,
+    metadata = sp.TBytes
+).layout(("to_", ("amount", ("royalties", ("contributors", "metadata")))))
+
+t_mint_item_and_list_params = sp.TRecord(
+    amount = sp.TNat,
+    royalties = sp.TNat,
+    contributors = FA2.t_contributor_list,
+    metadata = sp.TBytes,
+    start_price = sp.TMutez,
+    end_price = sp.TMutez,
+    start_time = sp.TTimestamp,
+    end_time = sp.TTimestamp
+).layout(("amount", ("royalties", ("contributors", ("metadata",
+    ("start_price", ("end_price", ("start_time", "end_time"))))))))
+
+# Admin actions for multicall.
+t_multicall_action = sp.TVariant(
+    set_paused = sp.TRecord(fa2 = sp.TAddress, paused = sp.TBool).layout(("fa2", "paused")),
+    clear_adhoc_operators = sp.TAddress,
+    set_metadata = sp.TRecord(fa2 = sp.TAddress, metadata = sp.TBigMap(sp.TString, sp.TBytes)).layout(("fa2", "metadata")),
+    transfer_administrator = sp.TRecord(fa2 = sp.TAddress, proposed_fa2_administrator = sp.TAddress).layout(("fa2", "proposed_fa2_administrator")),
+    accept_administrator = sp.TAddress,
+    mint_Place = FA2.t_mint_nft_batch,
+    mint_Item = FA2.t_mint_fungible_royalties_batch
+).layout(("set_paused", ("clear_adhoc_operators", ("set_metadata", ("transfer_administrator",
+    ("accept_administrator", ("mint_Place", "mint_Item")))))))
+
+# Max number of items that can be minted with mint_Items.
+MAX_MINT_ITEMS_BATCH = 25
+
+
 #
 # Minter contract.
 # NOTE: should be pausable for code updates.
@@ -24,13 +60,14 @@ class TL_Minter(
         self.init_storage(
             items_contract = items_contract,
             places_contract = places_contract,
+            auction_contract = sp.set_type_expr(sp.none, sp.TOption(sp.TAddress)), # The auction contract for mint_Item_and_list.
             metadata = metadata,
             )
         pause_mixin.Pausable.__init__(self, administrator = administrator)
         mod_mixin.Moderation.__init__(self, administrator = administrator)
         fa2_admin.FA2_Administration.__init__(self, administrator = administrator)
         upgradeable_mixin.Upgradeable.__init__(self, administrator = administrator,
-            entrypoints = ['mint_Item', 'mint_Place'])
+            entrypoints = ['mint_Item', 'mint_Items', 'mint_Item_and_list', 'mint_Place', 'mint_Place_range'])
         self.generate_contract_metadata()
 
     def generate_contract_metadata(self):
@@ -60,9 +97,34 @@ class TL_Minter(
         metadata_base["views"] = offchain_views
         self.init_metadata("metadata_base", metadata_base)
 
+    #
+    # Inlineable helpers
+    #
+    def setFA2Paused(self, fa2, paused):
+        """Inline function to pause/unpause an FA2 contract."""
+        set_paused_handle = sp.contract(sp.TBool, fa2,
+            entry_point = "set_pause").open_some()
+
+        sp.transfer(paused, sp.mutez(0), set_paused_handle)
+
+    def clearFA2AdhocOperators(self, fa2):
+        """Inline function to clear adhoc operators of an FA2 contract."""
+        clear_adhoc_operators_handle = sp.contract(FA2.t_adhoc_operator_params, fa2,
+            entry_point = "update_adhoc_operators").open_some()
+
+        sp.transfer(sp.variant("clear_adhoc_operators", sp.unit),
+            sp.mutez(0), clear_adhoc_operators_handle)
+
     #
     # Manager-only entry points
     #
+    @sp.entry_point
+    def set_auction_contract(self, auction_contract):
+        """Set the auction contract mint_Item_and_list lists on."""
+        sp.set_type(auction_contract, sp.TOption(sp.TAddress))
+        self.onlyAdministrator()
+        self.data.auction_contract = auction_contract
+
     @sp.entry_point
     def pause_all_fa2(self, new_paused):
         """The admin can pause/unpause items and places contracts."""
@@ -71,10 +133,7 @@ class TL_Minter(
 
         with sp.for_("fa2", [self.data.items_contract, self.data.places_contract]) as fa2:
             # call items contract
-            set_paused_handle = sp.contract(sp.TBool, fa2, 
-                entry_point = "set_pause").open_some()
-                
-            sp.transfer(new_paused, sp.mutez(0), set_paused_handle)
+            self.setFA2Paused(fa2, new_paused)
 
     @sp.entry_point
     def clear_adhoc_operators_all_fa2(self):
@@ -83,11 +142,33 @@ class TL_Minter(
     
         with sp.for_("fa2", [self.data.items_contract, self.data.places_contract]) as fa2:
             # call items contract
-            set_paused_handle = sp.contract(FA2.t_adhoc_operator_params, fa2, 
-                entry_point = "update_adhoc_operators").open_some()
-                
-            sp.transfer(sp.variant("clear_adhoc_operators", sp.unit),
-                sp.mutez(0), set_paused_handle)
+            self.clearFA2AdhocOperators(fa2)
+
+    @sp.entry_point
+    def multicall(self, actions):
+        """The admin can execute a list of admin actions on FA2 contracts
+        in one operation. Actions are executed in order."""
+        sp.set_type(actions, sp.TList(t_multicall_action))
+        self.onlyAdministrator()
+
+        with sp.for_("action", actions) as action:
+            with action.match_cases() as arg:
+                with arg.match("set_paused") as params:
+                    self.setFA2Paused(params.fa2, params.paused)
+                with arg.match("clear_adhoc_operators") as fa2:
+                    self.clearFA2AdhocOperators(fa2)
+                with arg.match("set_metadata") as params:
+                    set_metadata_handle = sp.contract(sp.TBigMap(sp.TString, sp.TBytes), params.fa2,
+                        entry_point = "set_metadata").open_some()
+                    sp.transfer(params.metadata, sp.mutez(0), set_metadata_handle)
+                with arg.match("transfer_administrator") as params:
+                    self.transferFA2Administrator(params.fa2, params.proposed_fa2_administrator)
+                with arg.match("accept_administrator") as fa2:
+                    self.acceptFA2Administrator(fa2)
+                with arg.match("mint_Place") as batch:
+                    utils.fa2_nft_mint(batch, self.data.places_contract)
+                with arg.match("mint_Item") as batch:
+                    utils.fa2_fungible_royalties_mint(batch, self.data.items_contract)
 
     @sp.entry_point(lazify = True)
     def mint_Place(self, params):
@@ -101,35 +182,104 @@ class TL_Minter(
             self.data.places_contract
         )
 
+    @sp.entry_point(lazify = True)
+    def mint_Place_range(self, params):
+        sp.set_type(params, FA2.t_mint_nft_range)
+
+        self.onlyAdministrator()
+        self.onlyUnpaused()
+
+        utils.fa2_nft_mint_range(
+            params,
+            self.data.places_contract
+        )
+
     #
     # Public entry points
     #
+    def mint_item_batch_entry(self, params):
+        """Inline function to validate a mint_Item(s) param and convert it to
+        an Items mint batch entry."""
+        sp.set_type(params, t_mint_item_params)
+
+        sp.verify((params.amount > 0) & (params.amount <= 10000) & ((params.royalties >= 0) & (params.royalties <= 250)),
+            message = "PARAM_ERROR")
+
+        return sp.record(
+            to_=params.to_,
+            amount=params.amount,
+            token=sp.variant("new", sp.record(
+                metadata={ '' : params.metadata },
+                royalties=sp.record(
+                    royalties=params.royalties,
+                    contributors=params.contributors)
+                )
+            )
+        )
+
     @sp.entry_point(lazify = True)
     def mint_Item(self, params):
-        sp.set_type(params, sp.TRecord(
-            to_ = sp.TAddress,
-            amount = sp.TNat,
-            royalties = sp.TNat,
-            contributors = FA2.t_contributor_list,
-            metadata = sp.TBytes
-        ).layout(("to_", ("amount", ("royalties", ("contributors", "metadata"))))))
+        sp.set_type(params, t_mint_item_params)
 
         self.onlyUnpaused()
-        
-        sp.verify((params.amount > 0) & (params.amount <= 10000) & ((params.royalties >= 0) & (params.royalties <= 250)),
-            message = "PARAM_ERROR")
 
         utils.fa2_fungible_royalties_mint(
-            [sp.record(
-                to_=params.to_,
+            [self.mint_item_batch_entry(params)],
+            self.data.items_contract
+        )
+
+    @sp.entry_point(lazify = True)
+    def mint_Items(self, batch):
+        """Mint a batch of items with a single call to the items contract."""
+        sp.set_type(batch, sp.TList(t_mint_item_params))
+
+        self.onlyUnpaused()
+
+        sp.verify(sp.len(batch) <= MAX_MINT_ITEMS_BATCH, message = "PARAM_ERROR")
+
+        mint_batch = sp.local("mint_batch", [], FA2.t_mint_fungible_royalties_batch)
+        with sp.for_("params", batch.rev()) as params:
+            mint_batch.value.push(self.mint_item_batch_entry(params))
+
+        utils.fa2_fungible_royalties_mint(
+            mint_batch.value,
+            self.data.items_contract
+        )
+
+    @sp.entry_point(lazify = True)
+    def mint_Item_and_list(self, params):
+        """Mint an item directly to the auction contract and create
+        an auction for it, owned by the sender.
+
+        The auction contract keeps one token in escrow and sends the rest
+        of the amount back to the sender.
+        """
+        sp.set_type(params, t_mint_item_and_list_params)
+
+        self.onlyUnpaused()
+
+        auction_contract = sp.compute(self.data.auction_contract.open_some(message = "NO_AUCTION_CONTRACT"))
+
+        # The id of the token that will be minted.
+        token_id = sp.compute(utils.fa2_get_count_tokens(self.data.items_contract))
+
+        utils.fa2_fungible_royalties_mint(
+            [self.mint_item_batch_entry(sp.record(
+                to_=auction_contract,
                 amount=params.amount,
-                token=sp.variant("new", sp.record(
-                    metadata={ '' : params.metadata },
-                    royalties=sp.record(
-                        royalties=params.royalties,
-                        contributors=params.contributors)
-                    )
-                )
-            )],
+                royalties=params.royalties,
+                contributors=params.contributors,
+                metadata=params.metadata))],
             self.data.items_contract
         )
+
+        utils.dutch_create_minted(sp.record(
+                owner=sp.sender,
+                token_id=token_id,
+                amount=params.amount,
+                start_price=params.start_price,
+                end_price=params.end_price,
+                start_time=params.start_time,
+                end_time=params.end_time,
+                fa2=self.data.items_contract
+            ), auction_contract)
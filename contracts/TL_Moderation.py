@@ -0,0 +1,121 @@
+import smartpy as sp
+
+admin_mixin = sp.io.import_script_from_url("file:contracts/Administrable.py")
+mod_mixin = sp.io.import_script_from_url("file:contracts/Moderation.py")
+utils = sp.io.import_script_from_url("file:contracts/Utils.py")
+
+
+#
+# Moderation contract.
+# Flags are stored in a bitmap, 256 token ids per word,
+# keyed by (fa2, token_id // 256).
+class TL_Moderation(
+    admin_mixin.Administrable,
+    sp.Contract):
+    def __init__(self, administrator, metadata, exception_optimization_level="default-line"):
+        self.add_flag("exceptions", exception_optimization_level)
+        self.add_flag("erase-comments")
+
+        self.address_set = utils.Address_set()
+        self.flags_bitmap = utils.Bitmap(sp.TAddress)
+        self.init_storage(
+            metadata = metadata,
+            moderators = self.address_set.make(), # administrator is always a moderator
+            flags = self.flags_bitmap.make()
+        )
+        admin_mixin.Administrable.__init__(self, administrator = administrator)
+        self.generate_contract_metadata()
+
+    def generate_contract_metadata(self):
+        """Generate a metadata json file with all the contract's offchain views
+        and standard TZIP-12 and TZIP-016 key/values."""
+        metadata_base = {
+            "name": 'tz1and Moderation',
+            "description": 'tz1and token moderation flags',
+            "version": "1.0.0",
+            "interfaces": ["TZIP-016"],
+            "authors": [
+                "852Kerfunkle <https://github.com/852Kerfunkle>"
+            ],
+            "homepage": "https://www.tz1and.com",
+            "source": {
+                "tools": ["SmartPy"],
+                "location": "https://github.com/tz1and",
+            },
+            "license": { "name": "MIT" }
+        }
+        offchain_views = []
+        for f in dir(self):
+            attr = getattr(self, f)
+            if isinstance(attr, sp.OnOffchainView):
+                # Include onchain views as tip 16 offchain views
+                offchain_views.append(attr)
+        metadata_base["views"] = offchain_views
+        self.init_metadata("metadata_base", metadata_base)
+
+    #
+    # Inlineable helpers
+    #
+    def onlyModerator(self):
+        """Fails if sender is not a moderator or the administrator."""
+        sp.verify(self.isAdministrator(sp.sender) | self.address_set.contains(self.data.moderators, sp.sender),
+            message = "ONLY_MODERATOR")
+
+    #
+    # Manager-only entry points
+    #
+    @sp.entry_point
+    def manage_moderators(self, updates):
+        """Add or remove moderators."""
+        sp.set_type(updates, sp.TList(sp.TVariant(
+            add_moderators = sp.TList(sp.TAddress),
+            remove_moderators = sp.TList(sp.TAddress)
+        ).layout(("add_moderators", "remove_moderators"))))
+        self.onlyAdministrator()
+        with sp.for_("update", updates) as update:
+            with update.match_cases() as arg:
+                with arg.match("add_moderators") as upd:
+                    with sp.for_("moderator", upd) as moderator:
+                        self.address_set.add(self.data.moderators, moderator)
+                with arg.match("remove_moderators") as upd:
+                    with sp.for_("moderator", upd) as moderator:
+                        self.address_set.remove(self.data.moderators, moderator)
+
+    #
+    # Moderator entry points
+    #
+    @sp.entry_point
+    def update_flags(self, updates):
+        """Flag or unflag token ids in bulk."""
+        sp.set_type(updates, sp.TList(sp.TVariant(
+            flag = sp.TRecord(fa2 = sp.TAddress, token_ids = sp.TList(sp.TNat)).layout(("fa2", "token_ids")),
+            unflag = sp.TRecord(fa2 = sp.TAddress, token_ids = sp.TList(sp.TNat)).layout(("fa2", "token_ids"))
+        ).layout(("flag", "unflag"))))
+        self.onlyModerator()
+        with sp.for_("update", updates) as update:
+            with update.match_cases() as arg:
+                with arg.match("flag") as upd:
+                    with sp.for_("token_id", upd.token_ids) as token_id:
+                        self.flags_bitmap.set(self.data.flags, upd.fa2, token_id)
+                with arg.match("unflag") as upd:
+                    with sp.for_("token_id", upd.token_ids) as token_id:
+                        self.flags_bitmap.clear(self.data.flags, upd.fa2, token_id)
+
+    #
+    # Views
+    #
+    @sp.onchain_view(pure=True)
+    def get_flagged(self, tokens):
+        """Returns the set of flagged tokens, from a list of (fa2, token_id)."""
+        sp.set_type(tokens, mod_mixin.t_token_list)
+        flagged = sp.local("flagged", sp.set([]), t = mod_mixin.t_flagged_set)
+        with sp.for_("token", tokens) as token:
+            with sp.if_(self.flags_bitmap.is_set(self.data.flags, sp.fst(token), sp.snd(token))):
+                flagged.value.add(token)
+        sp.result(flagged.value)
+
+    @sp.onchain_view(pure=True)
+    def is_moderator(self, address):
+        """Returns true if an address is a moderator."""
+        sp.set_type(address, sp.TAddress)
+        sp.result(self.isAdministrator(address) | self.address_set.contains(self.data.moderators, address))
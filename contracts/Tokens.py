@@ -7,16 +7,18 @@ class tz1andPlaces(
     admin_mixin.Administrable,
     FA2.ChangeMetadata,
     FA2.MintNft,
+    FA2.OnchainviewBalanceOf,
     FA2.OnchainviewCountTokens,
     FA2.Fa2Nft,
 ):
     """tz1and Places"""
 
-    def __init__(self, metadata, admin):
+    def __init__(self, metadata, admin, emit_events=False):
         FA2.Fa2Nft.__init__(
             self, metadata=metadata,
             name="tz1and Places", description="tz1and Place FA2 Tokens.",
-            policy=FA2.PauseTransfer(FA2.OwnerOrOperatorAdhocTransfer())
+            policy=FA2.PauseTransfer(FA2.PermitTransfer(FA2.OwnerOrOperatorAdhocTransfer())),
+            emit_events=emit_events
         )
         admin_mixin.Administrable.__init__(self, admin)
 
@@ -25,17 +27,19 @@ class tz1andItems(
     FA2.ChangeMetadata,
     FA2.MintFungible,
     FA2.BurnFungible,
+    FA2.OnchainviewBalanceOf,
+    FA2.OnchainviewCountTokens,
     FA2.Royalties,
     FA2.Fa2Fungible,
 ):
     """tz1and Items"""
 
-    def __init__(self, metadata, admin):
+    def __init__(self, metadata, admin, emit_events=False):
         FA2.Fa2Fungible.__init__(
             self, metadata=metadata,
             name="tz1and Items", description="tz1and Item FA2 Tokens.",
-            policy=FA2.PauseTransfer(FA2.OwnerOrOperatorAdhocTransfer()), has_royalties=True,
-            allow_mint_existing=False
+            policy=FA2.PauseTransfer(FA2.PermitTransfer(FA2.OwnerOrOperatorAdhocTransfer())), has_royalties=True,
+            allow_mint_existing=False, emit_events=emit_events
         )
         FA2.Royalties.__init__(self)
         admin_mixin.Administrable.__init__(self, admin)
@@ -44,13 +48,16 @@ class tz1andDAO(
     admin_mixin.Administrable,
     FA2.ChangeMetadata,
     FA2.MintSingleAsset,
+    FA2.OnchainviewCheckpoints,
     FA2.Fa2SingleAsset,
 ):
     """tz1and DAO"""
 
-    def __init__(self, metadata, admin):
+    def __init__(self, metadata, admin, emit_events=False):
         FA2.Fa2SingleAsset.__init__(
             self, metadata=metadata,
-            name="tz1and DAO", description="tz1and DAO FA2 Tokens."
+            name="tz1and DAO", description="tz1and DAO FA2 Tokens.",
+            has_checkpoints=True, emit_events=emit_events
         )
+        FA2.OnchainviewCheckpoints.__init__(self)
         admin_mixin.Administrable.__init__(self, admin)
@@ -5,20 +5,74 @@ admin_mixin = sp.io.import_script_from_url("file:contracts/Administrable.py")
 # TODO: update_ep variant layout?
 
 class Upgradeable(admin_mixin.Administrable):
-    def __init__(self, administrator, entrypoints: list[str]):
+    """Upgradeable lazy entrypoints and, optionally, a library of lambdas.
+
+    libs maps a name to a (lambda, lambda type) tuple. Each lambda is
+    stored in its own big_map, so it's only unpacked when it's called
+    with callLib, and can be replaced with the update_lib entrypoint.
+    """
+    def __init__(self, administrator, entrypoints: list[str], libs: dict = None):
+        libs = libs or {}
         self.upgradeable_entrypoints = entrypoints
+        self.upgradeable_libs = libs
+        if libs:
+            self.update_initial_storage(**{
+                "lib_" + name: sp.big_map({sp.unit: code}, tkey = sp.TUnit, tvalue = t)
+                for name, (code, t) in libs.items()})
+
+            # Never lazify this entrypoint.
+            def update_lib(self, params):
+                sp.set_type(params, sp.TVariant(
+                    **{name: t for name, (code, t) in self.upgradeable_libs.items()}))
+                self.onlyAdministrator()
+
+                with params.match_cases() as arg:
+                    for name in self.upgradeable_libs:
+                        with arg.match(name) as new_code:
+                            getattr(self.data, "lib_" + name)[sp.unit] = new_code
+                            sp.emit(sp.record(lib_name = name, code_size = sp.len(sp.pack(new_code))),
+                                tag = "update_lib", with_type = True)
+
+            self.update_lib = sp.entry_point(update_lib, lazify = False)
         admin_mixin.Administrable.__init__(self, administrator = administrator)
 
-    # Never lazify this entrypoint.
-    @sp.entry_point(lazify=False)
-    def update_ep(self, params):
+    def callLib(self, name, arg):
+        """Inline function to call a library lambda."""
+        return getattr(self.data, "lib_" + name)[sp.unit](arg)
+
+    def execLib(self, name, arg):
+        """Inline function to call a library lambda that returns unit,
+        only for its operations."""
+        # A bare call expression isn't added to the block, so the
+        # result has to be bound for the operations to be emitted.
+        sp.compute(self.callLib(name, arg))
+
+    def updateEntrypoint(self, params):
+        """Inline function to set the code of an upgradeable entrypoint.
+        Emits an event with the packed size of the new code."""
         # Build a variant from upgradeable_entrypoints.
         sp.set_type(params.ep_name, sp.TVariant(
             **{entrypoint: sp.TUnit for entrypoint in self.upgradeable_entrypoints}))
-        self.onlyAdministrator()
 
         # Build a matcher for upgradeable_entrypoints
         with params.ep_name.match_cases() as arg:
             for entrypoint in self.upgradeable_entrypoints:
                 with arg.match(entrypoint):
                     sp.set_entry_point(entrypoint, params.new_code)
+
+        sp.emit(sp.record(ep_name = params.ep_name, code_size = sp.len(sp.pack(params.new_code))),
+            tag = "update_ep", with_type = True)
+
+    # Never lazify this entrypoint.
+    @sp.entry_point(lazify=False)
+    def update_ep(self, params):
+        self.onlyAdministrator()
+        self.updateEntrypoint(params)
+
+    # Never lazify this entrypoint.
+    @sp.entry_point(lazify=False)
+    def update_eps(self, params):
+        """Update several entrypoints at once."""
+        self.onlyAdministrator()
+        with sp.for_("update", params) as update:
+            self.updateEntrypoint(update)
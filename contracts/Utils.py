@@ -14,6 +14,49 @@ class Address_set:
     def contains(self, set, fa2):
         return set.contains(fa2)
 
+#
+# Lazy set of addresses per epoch. Bumping the epoch
+# invalidates all entries of earlier epochs.
+class Epoch_address_set:
+    def make(self):
+        return sp.big_map(tkey=sp.TPair(sp.TNat, sp.TAddress), tvalue=sp.TUnit)
+    def add(self, set, epoch, address):
+        set[sp.pair(epoch, address)] = sp.unit
+    def remove(self, set, epoch, address):
+        del set[sp.pair(epoch, address)]
+    def contains(self, set, epoch, address):
+        return set.contains(sp.pair(epoch, address))
+
+#
+# Lazy bitmap of nat words, 256 bits per word.
+# Words are keyed by (prefix, index // 256), so independent
+# bitmaps can share a big_map.
+class Bitmap:
+    def __init__(self, prefix_type):
+        self.prefix_type = prefix_type
+    def make(self):
+        return sp.big_map(tkey = sp.TPair(self.prefix_type, sp.TNat), tvalue = sp.TNat)
+    def word_key(self, prefix, index):
+        return sp.pair(prefix, index >> 8)
+    def bit(self, index):
+        return sp.nat(1) << (index & 255)
+    def is_set(self, bitmap, prefix, index):
+        return (bitmap.get(self.word_key(prefix, index), sp.nat(0)) & self.bit(index)) != sp.nat(0)
+    def set(self, bitmap, prefix, index):
+        key = sp.compute(self.word_key(prefix, index))
+        bitmap[key] = bitmap.get(key, sp.nat(0)) | self.bit(index)
+    def clear(self, bitmap, prefix, index):
+        key = sp.compute(self.word_key(prefix, index))
+        word = sp.compute(bitmap.get(key, sp.nat(0)))
+        new_word = sp.compute(sp.as_nat(word - (word & self.bit(index))))
+        with sp.if_(new_word == sp.nat(0)):
+            del bitmap[key]
+        with sp.else_():
+            bitmap[key] = new_word
+    def set_word(self, bitmap, prefix, word_index, bits):
+        key = sp.compute(sp.pair(prefix, word_index))
+        bitmap[key] = bitmap.get(key, sp.nat(0)) | bits
+
 def isPowerOfTwoMinusOne(x):
     """Returns true if x is power of 2 - 1"""
     return ((x + 1) & x) == sp.nat(0)
@@ -30,6 +73,42 @@ def tz1and_items_get_royalties(fa2, token_id):
         sp.set_type_expr(token_id, sp.TNat),
         t = FA2.t_royalties).open_some()
 
+#
+# versum style royalties. Shares are relative to each other,
+# if there are none, the creator gets all royalties.
+t_royalty_shares = sp.TList(sp.TRecord(
+    address = sp.TAddress,
+    pct = sp.TNat
+).layout(("address", "pct")))
+
+def versum_get_royalty(fa2, token_id):
+    return sp.view("get_token_royalty", fa2,
+        sp.set_type_expr(token_id, sp.TNat),
+        t = sp.TNat).open_some()
+
+def versum_get_splits(fa2, token_id):
+    return sp.view("get_token_splits", fa2,
+        sp.set_type_expr(token_id, sp.TNat),
+        t = t_royalty_shares).open_some()
+
+def versum_get_creator(fa2, token_id):
+    return sp.view("get_token_creator", fa2,
+        sp.set_type_expr(token_id, sp.TNat),
+        t = sp.TAddress).open_some()
+
+#
+# versum style royalties, combined into one view.
+t_combined_royalties = sp.TRecord(
+    creator = sp.TAddress,
+    royalty = sp.TNat,
+    splits = t_royalty_shares
+).layout(("creator", ("royalty", "splits")))
+
+def combined_get_royalties(fa2, token_id):
+    return sp.view("get_token_royalties_combined", fa2,
+        sp.set_type_expr(token_id, sp.TNat),
+        t = t_combined_royalties).open_some()
+
 #
 # FA2 views
 def fa2_get_balance(fa2, token_id, owner):
@@ -42,6 +121,9 @@ def fa2_get_balance(fa2, token_id, owner):
             ).layout(("owner", "token_id"))),
         t = sp.TNat).open_some()
 
+def fa2_get_count_tokens(fa2):
+    return sp.view("count_tokens", fa2, sp.unit, t = sp.TNat).open_some()
+
 # Not used, World now has it's own operators set.
 #def fa2_is_operator(self, fa2, token_id, owner, operator):
 #    return sp.view("is_operator", fa2,
@@ -87,6 +169,24 @@ def fa2_nft_royalties_mint(batch, contract):
         entry_point='mint').open_some()
     sp.transfer(batch, sp.mutez(0), c)
 
+def fa2_nft_mint_range(params, contract):
+    params = sp.set_type_expr(params, FA2.t_mint_nft_range)
+    contract = sp.set_type_expr(contract, sp.TAddress)
+    c = sp.contract(
+        FA2.t_mint_nft_range,
+        contract,
+        entry_point='mint_range').open_some()
+    sp.transfer(params, sp.mutez(0), c)
+
+def fa2_nft_royalties_mint_range(params, contract):
+    params = sp.set_type_expr(params, FA2.t_mint_nft_range_royalties)
+    contract = sp.set_type_expr(contract, sp.TAddress)
+    c = sp.contract(
+        FA2.t_mint_nft_range_royalties,
+        contract,
+        entry_point='mint_range').open_some()
+    sp.transfer(params, sp.mutez(0), c)
+
 def fa2_fungible_mint(batch, contract):
     batch = sp.set_type_expr(batch, FA2.t_mint_fungible_batch)
     contract = sp.set_type_expr(contract, sp.TAddress)
@@ -107,3 +207,27 @@ def fa2_fungible_royalties_mint(batch, contract):
 
 def fa2_single_asset_mint(batch, contract):
     fa2_fungible_mint(batch, contract)
+
+#
+# Dutch auction create_minted. Called by the minter
+# after minting amount tokens to the auction contract.
+t_create_minted_params = sp.TRecord(
+    owner = sp.TAddress,
+    token_id = sp.TNat,
+    amount = sp.TNat,
+    start_price = sp.TMutez,
+    end_price = sp.TMutez,
+    start_time = sp.TTimestamp,
+    end_time = sp.TTimestamp,
+    fa2 = sp.TAddress
+).layout(("owner", ("token_id", ("amount", ("start_price",
+    ("end_price", ("start_time", ("end_time", "fa2"))))))))
+
+def dutch_create_minted(params, contract):
+    params = sp.set_type_expr(params, t_create_minted_params)
+    contract = sp.set_type_expr(contract, sp.TAddress)
+    c = sp.contract(
+        t_create_minted_params,
+        contract,
+        entry_point='create_minted').open_some()
+    sp.transfer(params, sp.mutez(0), c)
@@ -3,37 +3,138 @@ import smartpy as sp
 admin_mixin = sp.io.import_script_from_url("file:contracts/Administrable.py")
 utils = sp.io.import_script_from_url("file:contracts/Utils.py")
 
+# A merkle whitelist claim, passed packed in the "merkle_proof"
+# extension. The leaf is blake2b(pack(pair(index, address))),
+# nodes are blake2b of the concatenated, sorted child hashes.
+t_merkle_claim = sp.TRecord(
+    index = sp.TNat,
+    proof = sp.TList(sp.TBytes)
+).layout(("index", "proof"))
+
+# A whitelist id voucher, passed packed in the "whitelist_voucher"
+# extension. The signature is by the whitelist_ids_signer key over
+# pack(pair(contract, pair(id, address))). Binds an address to an
+# id assigned off-chain.
+t_whitelist_voucher = sp.TRecord(
+    id = sp.TNat,
+    signature = sp.TSignature
+).layout(("id", "signature"))
+
 
 class Whitelist(admin_mixin.Administrable):
     def __init__(self, administrator):
-        self.address_set = utils.Address_set()
+        self.address_set = utils.Epoch_address_set()
+        self.claimed_bitmap = utils.Bitmap(sp.TBytes)
+        self.ids_bitmap = utils.Bitmap(sp.TNat)
         self.update_initial_storage(
             whitelist_enabled = True, # enabled by default
             whitelist = self.address_set.make(), # administrator doesn't need to be whitelisted
+            whitelist_epoch = sp.nat(0), # only entries of the current epoch are valid
+            whitelist_merkle_root = sp.set_type_expr(sp.none, sp.TOption(sp.TBytes)), # optional merkle whitelist
+            whitelist_claimed = self.claimed_bitmap.make(), # spent merkle claims, by (root, index)
+            whitelist_ids = self.ids_bitmap.make(), # whitelisted participant ids, by (epoch, id)
+            whitelist_ids_signer = sp.set_type_expr(sp.none, sp.TOption(sp.TKey)), # signs id vouchers
         )
         admin_mixin.Administrable.__init__(self, administrator = administrator)
 
     def isWhitelisted(self, address):
         """If an address is whitelisted."""
         address = sp.set_type_expr(address, sp.TAddress)
-        return self.address_set.contains(self.data.whitelist, address)
+        return self.address_set.contains(self.data.whitelist, self.data.whitelist_epoch, address)
+
+    def getMerkleClaim(self, extension):
+        """Returns the merkle claim from the extension, if there is one
+        and the merkle whitelist is set."""
+        extension = sp.set_type_expr(extension, sp.TOption(sp.TMap(sp.TString, sp.TBytes)))
+        no_claim = sp.set_type_expr(sp.none, sp.TOption(t_merkle_claim))
+        return sp.eif(self.data.whitelist_merkle_root.is_some() & extension.is_some(),
+            sp.eif(extension.open_some().contains("merkle_proof"),
+                sp.unpack(extension.open_some()["merkle_proof"], t_merkle_claim),
+                no_claim),
+            no_claim)
+
+    def isMerkleWhitelisted(self, address, claim):
+        """If claim is a valid, unspent merkle proof for address."""
+        address = sp.set_type_expr(address, sp.TAddress)
+        claim = sp.set_type_expr(claim, t_merkle_claim)
+        root = sp.compute(self.data.whitelist_merkle_root.open_some())
+        node = sp.local("merkle_node", sp.blake2b(sp.pack(sp.pair(claim.index, address))))
+        with sp.for_("sibling", claim.proof) as sibling:
+            with sp.if_(node.value < sibling):
+                node.value = sp.blake2b(node.value + sibling)
+            with sp.else_():
+                node.value = sp.blake2b(sibling + node.value)
+        return (node.value == root) & ~self.claimed_bitmap.is_set(self.data.whitelist_claimed, root, claim.index)
+
+    def getWhitelistVoucher(self, extension):
+        """Returns the id voucher from the extension, if there is one
+        and the voucher signer is set."""
+        extension = sp.set_type_expr(extension, sp.TOption(sp.TMap(sp.TString, sp.TBytes)))
+        no_voucher = sp.set_type_expr(sp.none, sp.TOption(t_whitelist_voucher))
+        return sp.eif(self.data.whitelist_ids_signer.is_some() & extension.is_some(),
+            sp.eif(extension.open_some().contains("whitelist_voucher"),
+                sp.unpack(extension.open_some()["whitelist_voucher"], t_whitelist_voucher),
+                no_voucher),
+            no_voucher)
+
+    def isIdWhitelisted(self, address, voucher):
+        """If voucher is a valid voucher for address and its id is whitelisted."""
+        address = sp.set_type_expr(address, sp.TAddress)
+        voucher = sp.set_type_expr(voucher, t_whitelist_voucher)
+        return (sp.check_signature(self.data.whitelist_ids_signer.open_some(), voucher.signature,
+                sp.pack(sp.pair(sp.self_address, sp.pair(voucher.id, address))))
+            & self.ids_bitmap.is_set(self.data.whitelist_ids, self.data.whitelist_epoch, voucher.id))
+
+    def onlyWhitelisted(self, extension = None):
+        """Fails if whitelist enabled address is not whitelisted.
 
-    def onlyWhitelisted(self):
-        """Fails if whitelist enabled address is not whitelisted."""
+        If extension is given, a merkle claim or id voucher in it is
+        accepted too."""
         with sp.if_(self.data.whitelist_enabled):
-            sp.verify(self.address_set.contains(self.data.whitelist, sp.sender), message="ONLY_WHITELISTED")
+            if extension is None:
+                sp.verify(self.address_set.contains(self.data.whitelist, self.data.whitelist_epoch, sp.sender), message="ONLY_WHITELISTED")
+            else:
+                with sp.if_(~ self.address_set.contains(self.data.whitelist, self.data.whitelist_epoch, sp.sender)):
+                    claim = sp.compute(self.getMerkleClaim(extension))
+                    with sp.if_(claim.is_some()):
+                        sp.verify(self.isMerkleWhitelisted(sp.sender, claim.open_some()), message="ONLY_WHITELISTED")
+                    with sp.else_():
+                        voucher = sp.compute(self.getWhitelistVoucher(extension))
+                        sp.verify(voucher.is_some(), message="ONLY_WHITELISTED")
+                        sp.verify(self.isIdWhitelisted(sp.sender, voucher.open_some()), message="ONLY_WHITELISTED")
 
     def onlyAdminIfWhitelistEnabled(self):
         """Fails if whitelist is enabled and sender is not admin."""
         with sp.if_(self.data.whitelist_enabled):
             self.onlyAdministrator()
 
-    def removeFromWhitelist(self, address):
-        """Removes an address from the whitelist."""
+    def removeFromWhitelist(self, address, extension = None):
+        """Removes an address from the whitelist.
+
+        If extension is given and the address isn't in the whitelist,
+        the merkle claim in it is marked as spent, or the id of the
+        voucher in it is removed, instead. Expects the claim or voucher
+        to have been checked with onlyWhitelisted."""
         address = sp.set_type_expr(address, sp.TAddress)
         # NOTE: probably ok to skip the check and always remove from whitelist.
         #with sp.if_(self.data.whitelist_enabled):
-        self.address_set.remove(self.data.whitelist, address)
+        if extension is None:
+            self.address_set.remove(self.data.whitelist, self.data.whitelist_epoch, address)
+        else:
+            with sp.if_(self.address_set.contains(self.data.whitelist, self.data.whitelist_epoch, address)):
+                self.address_set.remove(self.data.whitelist, self.data.whitelist_epoch, address)
+            with sp.else_():
+                claim = sp.compute(self.getMerkleClaim(extension))
+                # Only verified by onlyWhitelisted if whitelist is enabled.
+                with sp.if_(self.data.whitelist_enabled):
+                    with sp.if_(claim.is_some()):
+                        self.claimed_bitmap.set(self.data.whitelist_claimed,
+                            self.data.whitelist_merkle_root.open_some(), claim.open_some().index)
+                    with sp.else_():
+                        voucher = sp.compute(self.getWhitelistVoucher(extension))
+                        with sp.if_(voucher.is_some()):
+                            self.ids_bitmap.clear(self.data.whitelist_ids,
+                                self.data.whitelist_epoch, voucher.open_some().id)
 
     @sp.entry_point
     def manage_whitelist(self, updates):
@@ -41,25 +142,68 @@ class Whitelist(admin_mixin.Administrable):
         sp.set_type(updates, sp.TList(sp.TVariant(
             whitelist_add=sp.TList(sp.TAddress),
             whitelist_remove=sp.TList(sp.TAddress),
-            whitelist_enabled=sp.TBool
-        ).layout(("whitelist_add", ("whitelist_remove", "whitelist_enabled")))))
+            whitelist_enabled=sp.TBool,
+            whitelist_merkle_root=sp.TOption(sp.TBytes),
+            whitelist_new_epoch=sp.TUnit,
+            whitelist_sweep=sp.TList(sp.TPair(sp.TNat, sp.TAddress)),
+            whitelist_ids_add=sp.TMap(sp.TNat, sp.TNat),
+            whitelist_ids_remove=sp.TList(sp.TNat),
+            whitelist_ids_signer=sp.TOption(sp.TKey)
+        ).layout(("whitelist_add", ("whitelist_remove", ("whitelist_enabled",
+            ("whitelist_merkle_root", ("whitelist_new_epoch", ("whitelist_sweep",
+            ("whitelist_ids_add", ("whitelist_ids_remove", "whitelist_ids_signer")))))))))))
         self.onlyAdministrator()
         with sp.for_("update", updates) as update:
             with update.match_cases() as arg:
                 with arg.match("whitelist_add") as upd:
                     with sp.for_("addr", upd) as addr:
-                        self.address_set.add(self.data.whitelist, addr)
+                        self.address_set.add(self.data.whitelist, self.data.whitelist_epoch, addr)
                 with arg.match("whitelist_remove") as upd:
                     with sp.for_("addr", upd) as addr:
-                        self.address_set.remove(self.data.whitelist, addr)
+                        self.address_set.remove(self.data.whitelist, self.data.whitelist_epoch, addr)
                 with arg.match("whitelist_enabled") as upd:
                     self.data.whitelist_enabled = upd
+                with arg.match("whitelist_merkle_root") as upd:
+                    self.data.whitelist_merkle_root = upd
+                with arg.match("whitelist_new_epoch"):
+                    # Invalidates all current entries.
+                    self.data.whitelist_epoch += 1
+                with arg.match("whitelist_sweep") as upd:
+                    # Reclaim storage of entries from earlier epochs.
+                    with sp.for_("entry", upd) as entry:
+                        sp.verify(sp.fst(entry) < self.data.whitelist_epoch, message="INVALID_EPOCH")
+                        self.address_set.remove(self.data.whitelist, sp.fst(entry), sp.snd(entry))
+                with arg.match("whitelist_ids_add") as upd:
+                    # Map of word index (id // 256) to bits to set.
+                    with sp.for_("word", upd.items()) as word:
+                        self.ids_bitmap.set_word(self.data.whitelist_ids, self.data.whitelist_epoch, word.key, word.value)
+                with arg.match("whitelist_ids_remove") as upd:
+                    with sp.for_("participant_id", upd) as participant_id:
+                        self.ids_bitmap.clear(self.data.whitelist_ids, self.data.whitelist_epoch, participant_id)
+                with arg.match("whitelist_ids_signer") as upd:
+                    self.data.whitelist_ids_signer = upd
 
     @sp.onchain_view(pure=True)
     def is_whitelisted(self, address):
         """Returns true if an address is whitelisted."""
         sp.set_type(address, sp.TAddress)
-        sp.result(self.address_set.contains(self.data.whitelist, address))
+        sp.result(self.address_set.contains(self.data.whitelist, self.data.whitelist_epoch, address))
+
+    @sp.onchain_view(pure=True)
+    def is_merkle_claimed(self, index):
+        """Returns true if a merkle claim for the current root was spent."""
+        sp.set_type(index, sp.TNat)
+        with sp.if_(self.data.whitelist_merkle_root.is_some()):
+            sp.result(self.claimed_bitmap.is_set(self.data.whitelist_claimed,
+                self.data.whitelist_merkle_root.open_some(), index))
+        with sp.else_():
+            sp.result(False)
+
+    @sp.onchain_view(pure=True)
+    def is_id_whitelisted(self, id):
+        """Returns true if a participant id is whitelisted."""
+        sp.set_type(id, sp.TNat)
+        sp.result(self.ids_bitmap.is_set(self.data.whitelist_ids, self.data.whitelist_epoch, id))
 
     @sp.onchain_view(pure=True)
     def is_whitelist_enabled(self):
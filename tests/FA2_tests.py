@@ -31,9 +31,9 @@ if "templates" not in __name__:
     ):
         """NFT contract with all optional features."""
 
-        def __init__(self, policy=None):
+        def __init__(self, policy=None, emit_events=False):
             FA2.Fa2Nft.__init__(
-                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy, emit_events=emit_events
             )
             admin_mixin.Administrable.__init__(self, admin.address)
 
@@ -50,9 +50,9 @@ if "templates" not in __name__:
     ):
         """Fungible contract with all optional features."""
 
-        def __init__(self, policy=None):
+        def __init__(self, policy=None, emit_events=False):
             FA2.Fa2Fungible.__init__(
-                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy, emit_events=emit_events
             )
             admin_mixin.Administrable.__init__(self, admin.address)
 
@@ -69,9 +69,9 @@ if "templates" not in __name__:
     ):
         """Single asset contract with all optional features."""
 
-        def __init__(self, policy=None):
+        def __init__(self, policy=None, emit_events=False):
             FA2.Fa2SingleAsset.__init__(
-                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy, emit_events=emit_events
             )
             admin_mixin.Administrable.__init__(self, admin.address)
 
@@ -91,6 +91,7 @@ if "templates" not in __name__:
     TESTS.test_no_transfer("nft", nft_test(policy=FA2.NoTransfer()))
     TESTS.test_owner_transfer("nft", nft_test(policy=FA2.OwnerTransfer()))
     TESTS.test_owner_or_operator_transfer("nft", nft_test())
+    TESTS.test_operators_for_all("nft", nft_test())
 
     # Fa2Fungible
 
@@ -112,6 +113,7 @@ if "templates" not in __name__:
     TESTS.test_no_transfer("fungible", fungible_test(policy=FA2.NoTransfer()))
     TESTS.test_owner_transfer("fungible", fungible_test(policy=FA2.OwnerTransfer()))
     TESTS.test_owner_or_operator_transfer("fungible", fungible_test())
+    TESTS.test_operators_for_all("fungible", fungible_test())
 
     # Fa2SingleAsset
 
@@ -131,6 +133,7 @@ if "templates" not in __name__:
     TESTS.test_no_transfer("single_asset", single_asset_test(policy=FA2.NoTransfer()))
     TESTS.test_owner_transfer("single_asset", single_asset_test(policy=FA2.OwnerTransfer()))
     TESTS.test_owner_or_operator_transfer("single_asset", single_asset_test())
+    TESTS.test_operators_for_all("single_asset", single_asset_test())
 
     # Optional Features
 
@@ -138,7 +141,118 @@ if "templates" not in __name__:
         nft_contract=NftTest(), fungible_contract=FungibleTest(), single_asset_contract=SingleAssetTest()
     )
     TESTS.test_pause(NftTest(FA2.PauseTransfer()), FungibleTest(FA2.PauseTransfer()), SingleAssetTest(FA2.PauseTransfer()))
-    TESTS.test_adhoc_operators(NftTest(FA2.OwnerOrOperatorAdhocTransfer()), FungibleTest(FA2.OwnerOrOperatorAdhocTransfer()), SingleAssetTest(FA2.OwnerOrOperatorAdhocTransfer()))
+    TESTS.test_events(
+        NftTest(emit_events=True), FungibleTest(emit_events=True), SingleAssetTest(emit_events=True),
+        NftTest(), FungibleTest(), SingleAssetTest())
+    TESTS.test_update_operators_batch(NftTest(), FungibleTest(), SingleAssetTest())
+    TESTS.test_permits(
+        NftTest(FA2.PauseTransfer(FA2.PermitTransfer())),
+        FungibleTest(FA2.PauseTransfer(FA2.PermitTransfer())),
+        SingleAssetTest(FA2.PauseTransfer(FA2.PermitTransfer())))
+    TESTS.test_permits_adhoc_operators(
+        NftTest(FA2.PauseTransfer(FA2.OwnerOrOperatorAdhocTransfer())),
+        FungibleTest(FA2.PauseTransfer(FA2.OwnerOrOperatorAdhocTransfer())),
+        NftTest(FA2.PauseTransfer(FA2.PermitTransfer(FA2.OwnerOrOperatorAdhocTransfer()))),
+        FungibleTest(FA2.PauseTransfer(FA2.PermitTransfer(FA2.OwnerOrOperatorAdhocTransfer()))))
+    for key_scheme in FA2.OwnerOrOperatorAdhocTransfer.KEY_SCHEMES:
+        TESTS.test_adhoc_operators(
+            NftTest(FA2.OwnerOrOperatorAdhocTransfer(key_scheme)),
+            FungibleTest(FA2.OwnerOrOperatorAdhocTransfer(key_scheme)),
+            SingleAssetTest(FA2.OwnerOrOperatorAdhocTransfer(key_scheme)),
+            key_scheme=key_scheme)
+
+    # Owner index
+
+    class NftOwnerIndexTest(
+        admin_mixin.Administrable,
+        FA2.MintNft,
+        FA2.BurnNft,
+        FA2.OnchainviewTokensOfOwner,
+        FA2.Fa2Nft,
+    ):
+        """NFT contract for testing the owner index."""
+
+        def __init__(self, policy=None):
+            FA2.Fa2Nft.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy, has_owner_index=True
+            )
+            FA2.OnchainviewTokensOfOwner.__init__(self)
+            admin_mixin.Administrable.__init__(self, admin.address)
+
+    class FungibleOwnerIndexTest(
+        admin_mixin.Administrable,
+        FA2.MintFungible,
+        FA2.BurnFungible,
+        FA2.OnchainviewTokensOfOwner,
+        FA2.Fa2Fungible,
+    ):
+        """Fungible contract for testing the owner index."""
+
+        def __init__(self, policy=None):
+            FA2.Fa2Fungible.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy, has_owner_index=True
+            )
+            FA2.OnchainviewTokensOfOwner.__init__(self)
+            admin_mixin.Administrable.__init__(self, admin.address)
+
+    TESTS.test_owner_index(NftOwnerIndexTest(), FungibleOwnerIndexTest(), NftTest(), FungibleTest())
+
+    # Distribute
+
+    class FungibleDistributeTest(
+        admin_mixin.Administrable,
+        FA2.MintFungible,
+        FA2.DistributeFungible,
+        FA2.Fa2Fungible,
+    ):
+        """Fungible contract for testing distribute."""
+
+        def __init__(self, policy=None, allow_mint_existing=True):
+            FA2.Fa2Fungible.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy,
+                allow_mint_existing=allow_mint_existing, has_owner_index=True
+            )
+            admin_mixin.Administrable.__init__(self, admin.address)
+
+    class SingleAssetDistributeTest(
+        admin_mixin.Administrable,
+        FA2.MintSingleAsset,
+        FA2.DistributeSingleAsset,
+        FA2.Fa2SingleAsset,
+    ):
+        """Single asset contract for testing distribute."""
+
+        def __init__(self, policy=None):
+            FA2.Fa2SingleAsset.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy
+            )
+            admin_mixin.Administrable.__init__(self, admin.address)
+
+    TESTS.test_distribute(
+        FungibleDistributeTest(), SingleAssetDistributeTest(), FungibleDistributeTest(allow_mint_existing=False)
+    )
+
+    # Checkpoints
+
+    class SingleAssetCheckpointsTest(
+        admin_mixin.Administrable,
+        FA2.MintSingleAsset,
+        FA2.BurnSingleAsset,
+        FA2.DistributeSingleAsset,
+        FA2.OnchainviewCheckpoints,
+        FA2.Fa2SingleAsset,
+    ):
+        """Single asset contract for testing checkpoints."""
+
+        def __init__(self, policy=None):
+            FA2.Fa2SingleAsset.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy,
+                token_metadata=[tok0_md], ledger={alice.address: 42}, has_checkpoints=True
+            )
+            FA2.OnchainviewCheckpoints.__init__(self)
+            admin_mixin.Administrable.__init__(self, admin.address)
+
+    TESTS.test_checkpoints(SingleAssetCheckpointsTest())
 
     # Royalties
 
@@ -173,3 +287,4 @@ if "templates" not in __name__:
             admin_mixin.Administrable.__init__(self, admin.address)
     
     TESTS.test_royalties(NftRoyaltiesTest(), FungibleRoyaltiesTest()) # no royalties on single asset
+    TESTS.test_mint_range(NftTest(), NftRoyaltiesTest())
@@ -1,11 +1,17 @@
 import smartpy as sp
 
 mod_mixin = sp.io.import_script_from_url("file:contracts/Moderation.py")
+moderation_contract = sp.io.import_script_from_url("file:contracts/TL_Moderation.py")
 
 class ModerationTest(mod_mixin.Moderation, sp.Contract):
     def __init__(self, administrator):
         mod_mixin.Moderation.__init__(self, administrator = administrator)
 
+    @sp.entry_point
+    def testOnlyUnflagged(self, params):
+        sp.set_type(params, sp.TPair(sp.TAddress, sp.TNat))
+        self.onlyUnflagged(sp.fst(params), sp.snd(params))
+
 
 @sp.add_test(name = "Moderation_tests", profile = True)
 def test():
@@ -29,7 +35,26 @@ def test():
 
     scenario.h3("set_moderation_contract")
 
-    moderation.set_moderation_contract(bob.address).run(sender = bob, valid = False)
-    scenario.verify(moderation.data.moderation_contract == admin.address)
-    moderation.set_moderation_contract(bob.address).run(sender = admin)
-    scenario.verify(moderation.data.moderation_contract == bob.address)
\ No newline at end of file
+    moderation.set_moderation_contract(sp.some(bob.address)).run(sender = bob, valid = False)
+    scenario.verify(moderation.data.moderation_contract == sp.none)
+    moderation.set_moderation_contract(sp.some(bob.address)).run(sender = admin)
+    scenario.verify(moderation.data.moderation_contract == sp.some(bob.address))
+    scenario.h3("onlyUnflagged")
+
+    # no get_flagged view: fails closed
+    moderation.testOnlyUnflagged((alice.address, 1)).run(sender = bob, valid = False, exception = "MODERATION_VIEW")
+
+    # no moderation contract: nothing is flagged
+    moderation.set_moderation_contract(sp.none).run(sender = admin)
+    moderation.testOnlyUnflagged((alice.address, 1)).run(sender = bob)
+
+    moderation_flags = moderation_contract.TL_Moderation(admin.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"))
+    scenario += moderation_flags
+
+    moderation.set_moderation_contract(sp.some(moderation_flags.address)).run(sender = admin)
+    moderation_flags.update_flags([sp.variant("flag", sp.record(fa2 = alice.address, token_ids = [1]))]).run(sender = admin)
+
+    moderation.testOnlyUnflagged((alice.address, 1)).run(sender = bob, valid = False, exception = "TOKEN_FLAGGED")
+    moderation.testOnlyUnflagged((alice.address, 2)).run(sender = bob)
+    moderation.testOnlyUnflagged((bob.address, 1)).run(sender = bob)
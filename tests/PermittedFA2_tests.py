@@ -2,6 +2,8 @@ import smartpy as sp
 
 tokens = sp.io.import_script_from_url("file:contracts/Tokens.py")
 permitted_fa2 = sp.io.import_script_from_url("file:contracts/PermittedFA2.py")
+utils = sp.io.import_script_from_url("file:contracts/Utils.py")
+FA2 = sp.io.import_script_from_url("file:contracts/FA2.py")
 
 class PermittedFA2Test(permitted_fa2.PermittedFA2, sp.Contract):
     def __init__(self, administrator):
@@ -16,6 +18,48 @@ class PermittedFA2Test(permitted_fa2.PermittedFA2, sp.Contract):
     def testGetPermittedFA2Props(self, fa2):
         self.getPermittedFA2Props(fa2)
 
+    @sp.entry_point
+    def testGetRoyaltiesForPermittedFA2(self, params):
+        sp.set_type(params, sp.TRecord(token_id = sp.TNat, fa2 = sp.TAddress, expected = FA2.t_royalties))
+        royalties = sp.compute(self.getRoyaltiesForPermittedFA2(params.token_id, params.fa2))
+        sp.verify(sp.pack(royalties) == sp.pack(params.expected), message = "UNEXPECTED_ROYALTIES")
+
+
+class VersumRoyaltiesMock(sp.Contract):
+    """Mock for versum style royalties, with 3 views."""
+    def __init__(self, creator, royalty, splits):
+        self.init_storage(creator = creator, royalty = royalty,
+            splits = sp.set_type_expr(splits, utils.t_royalty_shares))
+
+    @sp.entry_point
+    def set_royalties(self, params):
+        sp.set_type(params, sp.TRecord(royalty = sp.TNat, splits = utils.t_royalty_shares))
+        self.data.royalty = params.royalty
+        self.data.splits = params.splits
+
+    @sp.onchain_view(pure=True)
+    def get_token_creator(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(self.data.creator)
+
+    @sp.onchain_view(pure=True)
+    def get_token_royalty(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(self.data.royalty)
+
+    @sp.onchain_view(pure=True)
+    def get_token_splits(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(self.data.splits)
+
+
+class CombinedRoyaltiesMock(VersumRoyaltiesMock):
+    """Mock for versum style royalties, combined into one view."""
+    @sp.onchain_view(pure=True)
+    def get_token_royalties_combined(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(sp.record(creator = self.data.creator, royalty = self.data.royalty, splits = self.data.splits))
+
 
 @sp.add_test(name = "PermittedFA2_tests", profile = True)
 def test():
@@ -90,3 +134,73 @@ def test():
     permitted.testOnlyPermittedFA2(other_token.address).run(sender = admin)
     permitted.set_fa2_permitted(remove_permitted).run(sender = admin)
     permitted.testOnlyPermittedFA2(other_token.address).run(sender = admin, valid = False, exception = "TOKEN_NOT_PERMITTED")
+
+
+    #
+    # royalties kinds
+    #
+    scenario.h3("getRoyaltiesForPermittedFA2")
+
+    versum_token = VersumRoyaltiesMock(bob.address, sp.nat(100), [])
+    scenario += versum_token
+    combined_token = CombinedRoyaltiesMock(bob.address, sp.nat(100), [])
+    scenario += combined_token
+
+    for kind, fa2 in [("versum", versum_token), ("combined", combined_token)]:
+        permitted.set_fa2_permitted([sp.variant("add_permitted", sp.record(fa2 = fa2.address,
+            props = sp.record(swap_allowed = True, royalties_kind = sp.variant(kind, sp.unit))))]).run(sender = admin)
+
+    def expected(royalties, contributors):
+        return sp.record(royalties = royalties, contributors = [sp.record(address = a,
+            relative_royalties = r, role = sp.variant("creator", sp.unit)) for a, r in contributors])
+
+    for kind, fa2 in [("versum", versum_token), ("combined", combined_token)]:
+        scenario.h4("Gas: %s, no royalties" % kind)
+        fa2.set_royalties(royalty = 0, splits = []).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(0, [])).run(sender = admin)
+
+        scenario.h4("Gas: %s, creator only" % kind)
+        fa2.set_royalties(royalty = 100, splits = []).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(100, [(bob.address, 1000)])).run(sender = admin)
+
+        scenario.h4("Gas: %s, splits" % kind)
+        # Shares are normalised to permille, contributors come out in reverse.
+        fa2.set_royalties(royalty = 150, splits = [sp.record(address = alice.address, pct = 1), sp.record(address = carol.address, pct = 3)]).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(150, [(carol.address, 750), (alice.address, 250)])).run(sender = admin)
+
+        # The last split gets the rounding remainder.
+        fa2.set_royalties(royalty = 100, splits = [sp.record(address = alice.address, pct = 1), sp.record(address = bob.address, pct = 1), sp.record(address = carol.address, pct = 1)]).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(100, [(carol.address, 334), (bob.address, 333), (alice.address, 333)])).run(sender = admin)
+
+        # Too many splits fail.
+        fa2.set_royalties(royalty = 100, splits = [sp.record(address = alice.address, pct = 1) for _ in range(11)]).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(0, [])).run(sender = admin, valid = False, exception = "TOO_MANY_ROYALTY_SPLITS")
+
+        # Royalties are capped.
+        fa2.set_royalties(royalty = 500, splits = []).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(250, [(bob.address, 1000)])).run(sender = admin)
+
+        # Splits with no shares means no royalties.
+        fa2.set_royalties(royalty = 100, splits = [sp.record(address = alice.address, pct = 0)]).run(sender = admin)
+        permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = fa2.address, expected = expected(0, [])).run(sender = admin)
+
+    scenario.h4("Gas: tz1and")
+    permitted.set_fa2_permitted(add_permitted).run(sender = admin)
+    other_token.mint([sp.record(to_ = bob.address, amount = 1, token = sp.variant("new", sp.record(
+        metadata = {"": sp.utils.bytes_of_string("test_metadata")},
+        royalties = sp.record(royalties = 100, contributors = [sp.record(address = bob.address, relative_royalties = 1000, role = sp.variant("minter", sp.unit))]))))]).run(sender = admin)
+    permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = other_token.address,
+        expected = sp.record(royalties = 100, contributors = [sp.record(address = bob.address, relative_royalties = 1000, role = sp.variant("minter", sp.unit))])).run(sender = admin)
+
+    scenario.h4("Gas: none")
+    permitted.set_fa2_permitted([sp.variant("add_permitted", sp.record(fa2 = other_token.address,
+        props = sp.record(swap_allowed = True, royalties_kind = sp.variant("none", sp.unit))))]).run(sender = admin)
+    permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = other_token.address, expected = expected(0, [])).run(sender = admin)
+
+    # Unimplemented kinds and swap not allowed fail.
+    permitted.set_fa2_permitted([sp.variant("add_permitted", sp.record(fa2 = other_token.address,
+        props = sp.record(swap_allowed = True, royalties_kind = sp.variant("other1", sp.unit))))]).run(sender = admin)
+    permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = other_token.address, expected = expected(0, [])).run(sender = admin, valid = False, exception = "ROYALTIES_NOT_IMPLEMENTED")
+    permitted.set_fa2_permitted([sp.variant("add_permitted", sp.record(fa2 = other_token.address,
+        props = sp.record(swap_allowed = False, royalties_kind = sp.variant("none", sp.unit))))]).run(sender = admin)
+    permitted.testGetRoyaltiesForPermittedFA2(token_id = 0, fa2 = other_token.address, expected = expected(0, [])).run(sender = admin, valid = False, exception = "SWAP_NOT_ALLOWED")
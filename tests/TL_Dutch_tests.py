@@ -3,6 +3,24 @@ import smartpy as sp
 dutch_contract = sp.io.import_script_from_url("file:contracts/TL_Dutch.py")
 minter_contract = sp.io.import_script_from_url("file:contracts/TL_Minter.py")
 tokens = sp.io.import_script_from_url("file:contracts/Tokens.py")
+moderation_contract = sp.io.import_script_from_url("file:contracts/TL_Moderation.py")
+utils = sp.io.import_script_from_url("file:contracts/Utils.py")
+
+class CombinedRoyaltiesItems(tokens.tz1andItems):
+    """tz1and Items with versum style royalties, combined into one view.
+    Every token has the same royalties and splits."""
+    def __init__(self, metadata, admin, creator, royalty, splits):
+        self.combined_creator = creator
+        self.combined_royalty = royalty
+        self.combined_splits = splits
+        tokens.tz1andItems.__init__(self, metadata, admin)
+
+    @sp.onchain_view(pure=True)
+    def get_token_royalties_combined(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(sp.record(creator = self.combined_creator, royalty = self.combined_royalty,
+            splits = sp.set_type_expr(self.combined_splits, utils.t_royalty_shares)))
+
 
 @sp.add_test(name = "TL_Dutch_tests", profile = True)
 def test():
@@ -458,11 +476,11 @@ def test():
 
     # furthermore, bidding on a non-whitelist auction should not remove you from the whitelist.
     dutch.manage_whitelist([sp.variant("whitelist_add", [carol.address])]).run(sender=admin)
-    scenario.verify(dutch.data.whitelist.contains(carol.address))
+    scenario.verify(dutch.is_whitelisted(carol.address))
 
     dutch.bid(auction_id = current_auction_id, extension = sp.none).run(sender = bob, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80), valid = True)
 
-    scenario.verify(dutch.data.whitelist.contains(carol.address))
+    scenario.verify(dutch.is_whitelisted(carol.address))
 
     #
     # test whitelist
@@ -481,10 +499,10 @@ def test():
 
     # bidding on a whitelist auction will remove you from the whitelist.
     dutch.manage_whitelist([sp.variant("whitelist_add", [alice.address])]).run(sender=admin)
-    scenario.verify(dutch.data.whitelist.contains(alice.address))
+    scenario.verify(dutch.is_whitelisted(alice.address))
 
     dutch.bid(auction_id = current_auction_id, extension = sp.none).run(sender = alice, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80), valid = True)
-    scenario.verify(~dutch.data.whitelist.contains(alice.address))
+    scenario.verify(~dutch.is_whitelisted(alice.address))
 
     # disable whitelist.
     dutch.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
@@ -522,4 +540,383 @@ def test():
 
     dutch.bid(auction_id = current_auction_id, extension = sp.none).run(sender = alice, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80))
 
-    # TODO: check roaylaties paid, token transferred
\ No newline at end of file
+    # TODO: check roaylaties paid, token transferred
+
+    #
+    # mint_Item_and_list
+    #
+    scenario.h3("mint_Item_and_list")
+
+    def mint_and_list(amount, start_price = sp.tez(100), end_price = sp.tez(20)):
+        return minter.mint_Item_and_list(
+            amount = amount,
+            royalties = 250,
+            contributors = [ sp.record(address=bob.address, relative_royalties=sp.nat(1000), role=sp.variant("minter", sp.unit)) ],
+            metadata = sp.utils.bytes_of_string("test_metadata"),
+            start_price = start_price,
+            end_price = end_price,
+            start_time = sp.timestamp(0),
+            end_time = sp.timestamp(0).add_minutes(80))
+
+    # only the minter can call create_minted
+    dutch.create_minted(owner = bob.address,
+        token_id = item_bob,
+        amount = 1,
+        start_price = sp.tez(100),
+        end_price = sp.tez(20),
+        start_time = sp.timestamp(0),
+        end_time = sp.timestamp(0).add_minutes(80),
+        fa2 = items_tokens.address).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "ONLY_MINTER")
+
+    # the minter only lists on the auction contract set by the admin
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "NO_AUCTION_CONTRACT")
+
+    minter.set_auction_contract(sp.some(dutch.address)).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    minter.set_auction_contract(sp.some(dutch.address)).run(sender = admin)
+    scenario.verify(minter.data.auction_contract == sp.some(dutch.address))
+
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "ONLY_MINTER")
+
+    dutch.set_minter_contract(sp.some(minter.address)).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    dutch.set_minter_contract(sp.some(minter.address)).run(sender = admin)
+    scenario.verify(dutch.data.minter_contract == sp.some(minter.address))
+
+    # auction params are validated
+    mint_and_list(3, start_price = sp.tez(20), end_price = sp.tez(100)).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "INVALID_PARAM")
+
+    # secondary: anyone can mint and list
+    scenario.h4("Gas: mint_Item_and_list")
+    minted_item = scenario.compute(items_tokens.data.last_token_id)
+    minted_auction = scenario.compute(dutch.data.auction_id)
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0))
+
+    scenario.verify(dutch.data.auction_id == minted_auction + 1)
+    scenario.verify(dutch.data.auctions[minted_auction].owner == bob.address)
+    scenario.verify(dutch.data.auctions[minted_auction].token_id == minted_item)
+    scenario.verify(dutch.data.auctions[minted_auction].fa2 == items_tokens.address)
+    scenario.verify(items_tokens.data.ledger[(dutch.address, minted_item)] == 1)
+    scenario.verify(items_tokens.data.ledger[(bob.address, minted_item)] == 2)
+
+    dutch.bid(auction_id = minted_auction, extension = sp.none).run(sender = alice, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80))
+    scenario.verify(~dutch.data.auctions.contains(minted_auction))
+    scenario.verify(items_tokens.data.ledger[(alice.address, minted_item)] == 1)
+
+    # minting a single token keeps it all in escrow
+    minted_item = scenario.compute(items_tokens.data.last_token_id)
+    minted_auction = scenario.compute(dutch.data.auction_id)
+    mint_and_list(1).run(sender = bob, now = sp.timestamp(0))
+    scenario.verify(items_tokens.data.ledger[(dutch.address, minted_item)] == 1)
+    scenario.verify(~items_tokens.data.ledger.contains((bob.address, minted_item)))
+
+    dutch.cancel(auction_id = minted_auction, extension = sp.none).run(sender = bob)
+    scenario.verify(items_tokens.data.ledger[(bob.address, minted_item)] == 1)
+
+    # primary: only admin can mint and list
+    dutch.set_secondary_enabled(False).run(sender=admin)
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "ONLY_ADMIN")
+
+    minted_auction = scenario.compute(dutch.data.auction_id)
+    mint_and_list(3).run(sender = admin, now = sp.timestamp(0))
+    scenario.verify(dutch.data.auctions[minted_auction].owner == admin.address)
+
+    # no mint and list while paused
+    dutch.set_paused(True).run(sender = admin)
+    mint_and_list(3).run(sender = admin, now = sp.timestamp(0), valid = False, exception = "ONLY_UNPAUSED")
+    dutch.set_paused(False).run(sender = admin)
+
+    dutch.set_secondary_enabled(True).run(sender=admin)
+
+    # removing the minter disables create_minted
+    dutch.set_minter_contract(sp.none).run(sender = admin)
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "ONLY_MINTER")
+
+    # For comparison: mint, set operator, create.
+    scenario.h4("Gas: mint_Item, update_operators, create")
+    compare_item = scenario.compute(items_tokens.data.last_token_id)
+    minter.mint_Item(to_ = bob.address,
+        amount = 3,
+        royalties = 250,
+        contributors = [ sp.record(address=bob.address, relative_royalties=sp.nat(1000), role=sp.variant("minter", sp.unit)) ],
+        metadata = sp.utils.bytes_of_string("test_metadata")).run(sender = bob)
+
+    items_tokens.update_operators([
+        sp.variant("add_operator", sp.record(
+            owner = bob.address,
+            operator = dutch.address,
+            token_id = compare_item
+        ))
+    ]).run(sender = bob)
+
+    dutch.create(token_id = compare_item,
+        start_price = sp.tez(100),
+        end_price = sp.tez(20),
+        start_time = sp.timestamp(0),
+        end_time = sp.timestamp(0).add_minutes(80),
+        fa2 = items_tokens.address,
+        extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+
+    #
+    # royalties cache
+    #
+    scenario.h3("royalties cache")
+
+    dutch.manage_royalties_cache([sp.variant("cache_enable", items_tokens.address)]).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    dutch.manage_royalties_cache([sp.variant("cache_enable", items_tokens.address)]).run(sender = admin)
+    scenario.verify(dutch.data.royalties_cache_fa2.contains(items_tokens.address))
+
+    # compare_item is owned by bob and has an auction from the comparison above.
+    cached_auction = abs(dutch.data.auction_id - 1)
+    scenario.verify(~dutch.data.royalties_cache.contains((items_tokens.address, compare_item)))
+
+    scenario.h4("Gas: bid, royalties not cached")
+    dutch.bid(auction_id = cached_auction, extension = sp.none).run(sender = alice, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80))
+    scenario.verify(dutch.data.royalties_cache[(items_tokens.address, compare_item)].royalties == 250)
+
+    dutch.create(token_id = compare_item,
+        start_price = sp.tez(100),
+        end_price = sp.tez(20),
+        start_time = sp.timestamp(0),
+        end_time = sp.timestamp(0).add_minutes(80),
+        fa2 = items_tokens.address,
+        extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+
+    scenario.h4("Gas: bid, royalties cached")
+    dutch.bid(auction_id = abs(dutch.data.auction_id - 1), extension = sp.none).run(sender = alice, amount = sp.tez(20), now=sp.timestamp(0).add_minutes(80))
+
+    # cached royalties can be removed, disabling stops caching
+    dutch.manage_royalties_cache([sp.variant("cache_remove", [(items_tokens.address, compare_item)])]).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    dutch.manage_royalties_cache([sp.variant("cache_remove", [(items_tokens.address, compare_item)]),
+        sp.variant("cache_disable", items_tokens.address)]).run(sender = admin)
+    scenario.verify(~dutch.data.royalties_cache.contains((items_tokens.address, compare_item)))
+    scenario.verify(~dutch.data.royalties_cache_fa2.contains(items_tokens.address))
+
+
+    #
+    # lib vs inline
+    #
+    scenario.h3("lib vs inline")
+
+    # update_lib
+    dutch.update_lib(sp.variant("fa2_transfer", sp.build_lambda(dutch_contract.fa2_transfer, with_operations = True))).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    dutch.update_lib(sp.variant("fa2_transfer", sp.build_lambda(dutch_contract.fa2_transfer, with_operations = True))).run(sender = admin)
+
+    # mint some places to compare
+    minter.mint_Place([sp.record(to_ = bob.address, metadata = {'': sp.utils.bytes_of_string("test_metadata")}) for _ in range(2)]).run(sender = admin)
+    place_lib = abs(places_tokens.data.last_token_id - 2)
+    place_inline = abs(places_tokens.data.last_token_id - 1)
+
+    dutch_inline = dutch_contract.TL_Dutch(admin.address, items_tokens.address, places_tokens.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"), use_lib = False)
+    scenario += dutch_inline
+    dutch_inline.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
+    dutch_inline.set_secondary_enabled(True).run(sender=admin)
+
+    for name, contract, place in [("lib", dutch, place_lib), ("inline", dutch_inline, place_inline)]:
+        places_tokens.update_operators([
+            sp.variant("add_operator", sp.record(
+                owner = bob.address,
+                operator = contract.address,
+                token_id = place
+            ))
+        ]).run(sender = bob)
+
+        def create():
+            contract.create(token_id = place,
+                start_price = sp.tez(100),
+                end_price = sp.tez(20),
+                start_time = sp.timestamp(0),
+                end_time = sp.timestamp(0).add_minutes(80),
+                fa2 = places_tokens.address,
+                extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+
+        scenario.h4("Gas: create, %s" % name)
+        create()
+        scenario.h4("Gas: cancel, %s" % name)
+        contract.cancel(auction_id = abs(contract.data.auction_id - 1), extension = sp.none).run(sender = bob)
+        create()
+        scenario.h4("Gas: bid, %s" % name)
+        contract.bid(auction_id = abs(contract.data.auction_id - 1), extension = sp.none).run(sender = alice, amount = sp.tez(20), now = sp.timestamp(0).add_minutes(80))
+        scenario.verify(places_tokens.data.ledger[place] == alice.address)
+
+
+    #
+    # moderation
+    #
+    scenario.h3("moderation")
+
+    moderation = moderation_contract.TL_Moderation(admin.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"))
+    scenario += moderation
+
+    dutch.set_moderation_contract(sp.some(moderation.address)).run(sender = admin)
+
+    minter.mint_Place([sp.record(to_ = bob.address, metadata = {'': sp.utils.bytes_of_string("test_metadata")})]).run(sender = admin)
+    place_flagged = abs(places_tokens.data.last_token_id - 1)
+
+    places_tokens.update_operators([
+        sp.variant("add_operator", sp.record(
+            owner = bob.address,
+            operator = dutch.address,
+            token_id = place_flagged
+        ))
+    ]).run(sender = bob)
+
+    def create_flagged():
+        return dutch.create(token_id = place_flagged,
+            start_price = sp.tez(100),
+            end_price = sp.tez(20),
+            start_time = sp.timestamp(0),
+            end_time = sp.timestamp(0).add_minutes(80),
+            fa2 = places_tokens.address,
+            extension = sp.none)
+
+    # flagged tokens can't be auctioned
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = places_tokens.address, token_ids = [place_flagged]))]).run(sender = admin)
+    create_flagged().run(sender = bob, now = sp.timestamp(0), valid = False, exception = "TOKEN_FLAGGED")
+
+    moderation.update_flags([sp.variant("unflag", sp.record(fa2 = places_tokens.address, token_ids = [place_flagged]))]).run(sender = admin)
+    scenario.h4("Gas: create, with moderation")
+    create_flagged().run(sender = bob, now = sp.timestamp(0))
+    flagged_auction = abs(dutch.data.auction_id - 1)
+
+    # flagged tokens can't be bid on, but can be cancelled
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = places_tokens.address, token_ids = [place_flagged]))]).run(sender = admin)
+    dutch.bid(auction_id = flagged_auction, extension = sp.none).run(sender = alice, amount = sp.tez(20), now = sp.timestamp(0).add_minutes(80), valid = False, exception = "TOKEN_FLAGGED")
+    dutch.cancel(auction_id = flagged_auction, extension = sp.none).run(sender = bob)
+    scenario.verify(places_tokens.data.ledger[place_flagged] == bob.address)
+
+    # tokens flagged before they are minted can't be listed by the minter
+    dutch.set_minter_contract(sp.some(minter.address)).run(sender = admin)
+    next_item = scenario.compute(items_tokens.data.last_token_id)
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = items_tokens.address, token_ids = [next_item]))]).run(sender = admin)
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0), valid = False, exception = "TOKEN_FLAGGED")
+
+    moderation.update_flags([sp.variant("unflag", sp.record(fa2 = items_tokens.address, token_ids = [next_item]))]).run(sender = admin)
+    scenario.h4("Gas: mint_Item_and_list, with moderation")
+    mint_and_list(3).run(sender = bob, now = sp.timestamp(0))
+    scenario.verify(items_tokens.data.ledger[(dutch.address, next_item)] == 1)
+    dutch.set_minter_contract(sp.none).run(sender = admin)
+
+
+    #
+    # market stats
+    #
+    scenario.h3("market stats")
+
+    minter.mint_Place([sp.record(to_ = bob.address, metadata = {'': sp.utils.bytes_of_string("test_metadata")}) for _ in range(4)]).run(sender = admin)
+    place_stats = abs(places_tokens.data.last_token_id - 4)
+
+    dutch_stats = dutch_contract.TL_Dutch(admin.address, items_tokens.address, places_tokens.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"), market_stats = True)
+    scenario += dutch_stats
+    dutch_stats.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
+    dutch_stats.set_secondary_enabled(True).run(sender=admin)
+
+    # Compare against a contract without stats. Uses a fresh one, so
+    # moderation doesn't skew the numbers.
+    dutch_no_stats = dutch_contract.TL_Dutch(admin.address, items_tokens.address, places_tokens.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"))
+    scenario += dutch_no_stats
+    dutch_no_stats.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
+    dutch_no_stats.set_secondary_enabled(True).run(sender=admin)
+
+    scenario.verify(dutch_stats.get_market_stats(places_tokens.address) == sp.record(
+        listings = 0, sales = 0, volume = sp.tez(0), last_price = sp.tez(0), ema_price = sp.tez(0)))
+
+    for name, contract, place in [("stats", dutch_stats, place_stats), ("no stats", dutch_no_stats, place_stats + 1)]:
+        places_tokens.update_operators([
+            sp.variant("add_operator", sp.record(
+                owner = bob.address,
+                operator = contract.address,
+                token_id = place
+            ))
+        ]).run(sender = bob)
+
+        def create():
+            contract.create(token_id = place,
+                start_price = sp.tez(100),
+                end_price = sp.tez(20),
+                start_time = sp.timestamp(0),
+                end_time = sp.timestamp(0).add_minutes(80),
+                fa2 = places_tokens.address,
+                extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+
+        scenario.h4("Gas: create, %s" % name)
+        create()
+        scenario.h4("Gas: cancel, %s" % name)
+        contract.cancel(auction_id = abs(contract.data.auction_id - 1), extension = sp.none).run(sender = bob)
+        create()
+        scenario.h4("Gas: bid, %s" % name)
+        contract.bid(auction_id = abs(contract.data.auction_id - 1), extension = sp.none).run(sender = alice, amount = sp.tez(20), now = sp.timestamp(0).add_minutes(80))
+        scenario.verify(places_tokens.data.ledger[place] == alice.address)
+
+    scenario.verify(dutch_stats.get_market_stats(places_tokens.address) == sp.record(
+        listings = 0, sales = 1, volume = sp.tez(20), last_price = sp.tez(20), ema_price = sp.tez(20)))
+
+    # A second sale moves the average towards the new price.
+    places_tokens.update_operators([
+        sp.variant("add_operator", sp.record(
+            owner = bob.address,
+            operator = dutch_stats.address,
+            token_id = place_stats + 2
+        ))
+    ]).run(sender = bob)
+    dutch_stats.create(token_id = place_stats + 2,
+        start_price = sp.tez(100),
+        end_price = sp.tez(20),
+        start_time = sp.timestamp(0),
+        end_time = sp.timestamp(0).add_minutes(80),
+        fa2 = places_tokens.address,
+        extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+    scenario.verify(dutch_stats.get_market_stats(places_tokens.address).listings == 1)
+
+    dutch_stats.bid(auction_id = abs(dutch_stats.data.auction_id - 1), extension = sp.none).run(sender = alice, amount = sp.tez(100), now = sp.timestamp(0))
+    scenario.verify(dutch_stats.get_market_stats(places_tokens.address) == sp.record(
+        listings = 0, sales = 2, volume = sp.tez(120), last_price = sp.tez(100), ema_price = sp.tez(28)))
+
+    # Other FA2s have separate stats.
+    scenario.verify(dutch_stats.get_market_stats(items_tokens.address).sales == 0)
+
+
+    #
+    # royalty splits
+    #
+    scenario.h3("royalty splits")
+
+    # Three equal splits can't be represented in permille exactly,
+    # make sure nothing is left in the contract after a bid.
+    combined_items = CombinedRoyaltiesItems(sp.utils.metadata_of_url("https://example.com"), admin.address,
+        creator = alice.address, royalty = sp.nat(100), splits = [sp.record(address = a, pct = sp.nat(1)) for a in [alice.address, bob.address, carol.address]])
+    scenario += combined_items
+
+    dutch_splits = dutch_contract.TL_Dutch(admin.address, items_tokens.address, places_tokens.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"))
+    scenario += dutch_splits
+    dutch_splits.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
+    dutch_splits.set_secondary_enabled(True).run(sender=admin)
+    dutch_splits.set_fa2_permitted([sp.variant("add_permitted", sp.record(fa2 = combined_items.address,
+        props = sp.record(swap_allowed = True, royalties_kind = sp.variant("combined", sp.unit))))]).run(sender = admin)
+
+    combined_items.mint([sp.record(to_ = bob.address, amount = 1, token = sp.variant("new", sp.record(
+        metadata = {"": sp.utils.bytes_of_string("test_metadata")},
+        royalties = sp.record(royalties = 0, contributors = []))))]).run(sender = admin)
+    combined_items.update_operators([
+        sp.variant("add_operator", sp.record(
+            owner = bob.address,
+            operator = dutch_splits.address,
+            token_id = 0
+        ))
+    ]).run(sender = bob)
+
+    dutch_splits.create(token_id = 0,
+        start_price = sp.tez(100),
+        end_price = sp.tez(20),
+        start_time = sp.timestamp(0),
+        end_time = sp.timestamp(0).add_minutes(80),
+        fa2 = combined_items.address,
+        extension = sp.none).run(sender = bob, now = sp.timestamp(0))
+
+    scenario.h4("Gas: bid, 3 royalty splits")
+    dutch_splits.bid(auction_id = 0, extension = sp.none).run(sender = alice, amount = sp.tez(20), now = sp.timestamp(0).add_minutes(80))
+    scenario.verify(combined_items.data.ledger[(alice.address, 0)] == 1)
+    scenario.verify(dutch_splits.balance == sp.tez(0))
@@ -40,6 +40,62 @@ def test():
     places_tokens.transfer_administrator(minter.address).run(sender = admin)
     minter.accept_fa2_administrator([items_tokens.address, places_tokens.address]).run(sender = admin)
 
+    # test multicall
+    scenario.h2("multicall")
+
+    multicall_metadata = sp.utils.metadata_of_url("https://multicall.com")
+    minter.multicall([
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = True))
+    ]).run(sender = alice, valid = False, exception = "ONLY_ADMIN")
+
+    # A single operation with one action per kind.
+    scenario.h3("Gas: multicall")
+    last_item_id = scenario.compute(items_tokens.data.last_token_id)
+    last_place_id = scenario.compute(places_tokens.data.last_token_id)
+    minter.multicall([
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = True)),
+        sp.variant("set_paused", sp.record(fa2 = places_tokens.address, paused = True)),
+        sp.variant("clear_adhoc_operators", items_tokens.address),
+        sp.variant("set_metadata", sp.record(fa2 = places_tokens.address, metadata = multicall_metadata)),
+        sp.variant("mint_Place", [sp.record(to_ = alice.address, metadata = {'': sp.utils.bytes_of_string("multicall_place")})]),
+        sp.variant("mint_Item", [sp.record(to_ = bob.address, amount = 3, token = sp.variant("new", sp.record(
+            metadata = {"": sp.utils.bytes_of_string("multicall_item")},
+            royalties = sp.record(royalties = 250, contributors = [sp.record(address = bob.address, relative_royalties = 1000, role = sp.variant("minter", sp.unit))]))))]),
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = False)),
+        sp.variant("set_paused", sp.record(fa2 = places_tokens.address, paused = False)),
+    ]).run(sender = admin)
+
+    scenario.verify(items_tokens.data.paused == False)
+    scenario.verify(places_tokens.data.paused == False)
+    scenario.verify(places_tokens.data.metadata[""] == sp.utils.bytes_of_string("https://multicall.com"))
+    scenario.verify(places_tokens.data.last_token_id == last_place_id + 1)
+    scenario.verify(places_tokens.data.ledger[last_place_id] == alice.address)
+    scenario.verify(items_tokens.data.last_token_id == last_item_id + 1)
+    scenario.verify(items_tokens.data.ledger[(bob.address, last_item_id)] == 3)
+
+    # Actions are executed in order.
+    minter.multicall([
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = False)),
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = True)),
+    ]).run(sender = admin)
+    scenario.verify(items_tokens.data.paused == True)
+    minter.multicall([
+        sp.variant("set_paused", sp.record(fa2 = items_tokens.address, paused = False)),
+    ]).run(sender = admin)
+    scenario.verify(items_tokens.data.paused == False)
+
+    # Hand the places contract to alice and back again.
+    minter.multicall([
+        sp.variant("transfer_administrator", sp.record(fa2 = places_tokens.address, proposed_fa2_administrator = alice.address))
+    ]).run(sender = admin)
+    places_tokens.accept_administrator().run(sender = alice)
+    scenario.verify(places_tokens.data.administrator == alice.address)
+    places_tokens.transfer_administrator(minter.address).run(sender = alice)
+    minter.multicall([
+        sp.variant("accept_administrator", places_tokens.address)
+    ]).run(sender = admin)
+    scenario.verify(places_tokens.data.administrator == minter.address)
+
     # test admin stuff
     scenario.h2("transfer_administrator")
     scenario.verify(minter.data.administrator == admin.address)
@@ -82,6 +138,51 @@ def test():
 
     minter.set_paused(False).run(sender = admin)
 
+    # test batched Item minting
+    scenario.h2("mint_Items")
+
+    def item_params(to_, amount=10, royalties=250):
+        return sp.record(to_ = to_,
+            amount = amount,
+            royalties = royalties,
+            contributors = [ sp.record(address=to_, relative_royalties=sp.nat(1000), role=sp.variant("minter", sp.unit)) ],
+            metadata = sp.utils.bytes_of_string("test_metadata"))
+
+    # param limits apply to every entry
+    minter.mint_Items([item_params(alice.address), item_params(bob.address, amount=0)]).run(sender = alice, valid = False, exception = "PARAM_ERROR")
+    minter.mint_Items([item_params(alice.address), item_params(bob.address, amount=10001)]).run(sender = alice, valid = False, exception = "PARAM_ERROR")
+    minter.mint_Items([item_params(alice.address), item_params(bob.address, royalties=251)]).run(sender = alice, valid = False, exception = "PARAM_ERROR")
+
+    # batch size is capped
+    minter.mint_Items([item_params(alice.address) for _ in range(minter_contract.MAX_MINT_ITEMS_BATCH + 1)]).run(sender = alice, valid = False, exception = "PARAM_ERROR")
+
+    # no minting while paused
+    minter.set_paused(True).run(sender = admin)
+    minter.mint_Items([item_params(alice.address)]).run(sender = alice, valid = False, exception = "ONLY_UNPAUSED")
+    minter.set_paused(False).run(sender = admin)
+
+    # empty batch is a no-op
+    first_item_id = scenario.compute(items_tokens.data.last_token_id)
+    minter.mint_Items([]).run(sender = alice)
+    scenario.verify(items_tokens.data.last_token_id == first_item_id)
+
+    # mint multiple, ids are assigned in order
+    minter.mint_Items([item_params(alice.address, amount=1), item_params(bob.address, amount=2), item_params(alice.address, amount=3)]).run(sender = alice)
+    scenario.verify(items_tokens.data.last_token_id == first_item_id + 3)
+    scenario.verify(items_tokens.data.ledger[(alice.address, first_item_id)] == 1)
+    scenario.verify(items_tokens.data.ledger[(bob.address, first_item_id + 1)] == 2)
+    scenario.verify(items_tokens.data.ledger[(alice.address, first_item_id + 2)] == 3)
+
+    scenario.h3("Gas: mint_Item 10")
+    for _ in range(10):
+        minter.mint_Item(item_params(alice.address)).run(sender = alice)
+
+    scenario.h3("Gas: mint_Items 10")
+    minter.mint_Items([item_params(alice.address) for _ in range(10)]).run(sender = alice)
+
+    scenario.h3("Gas: mint_Items max batch")
+    minter.mint_Items([item_params(alice.address) for _ in range(minter_contract.MAX_MINT_ITEMS_BATCH)]).run(sender = alice)
+
     # test Place minting
     scenario.h2("mint_Place")
 
@@ -127,6 +228,86 @@ def test():
         )
     ]).run(sender = admin)
 
+    # test Place range minting
+    scenario.h2("mint_Place_range")
+
+    metadata_prefix = sp.utils.bytes_of_string("ipfs://QmPlaceDistrictMetadata/")
+
+    # only admin can mint
+    minter.mint_Place_range(
+        to_ = bob.address,
+        count = 1,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = []
+    ).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+
+    # no minting while paused
+    minter.set_paused(True).run(sender = admin)
+
+    minter.mint_Place_range(
+        to_ = admin.address,
+        count = 1,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = []
+    ).run(sender = admin, valid = False, exception = "ONLY_UNPAUSED")
+
+    minter.set_paused(False).run(sender = admin)
+
+    # suffixes must match count
+    minter.mint_Place_range(
+        to_ = admin.address,
+        count = 3,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = [sp.utils.bytes_of_string("0"), sp.utils.bytes_of_string("1")]
+    ).run(sender = admin, valid = False, exception = "FA2_MINT_RANGE_INVALID")
+
+    # ids are sequential from last_token_id
+    first_token_id = scenario.compute(places_tokens.data.last_token_id)
+    minter.mint_Place_range(
+        to_ = alice.address,
+        count = 3,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = [sp.utils.bytes_of_string(str(i)) for i in range(3)]
+    ).run(sender = admin)
+
+    scenario.verify(places_tokens.data.last_token_id == first_token_id + 3)
+    for i in range(3):
+        scenario.verify(places_tokens.data.ledger[first_token_id + i] == alice.address)
+        scenario.verify(places_tokens.data.token_metadata[first_token_id + i].token_info[''] ==
+            metadata_prefix + sp.utils.bytes_of_string(str(i)))
+
+    # no suffixes mints count tokens with the prefix as metadata
+    minter.mint_Place_range(
+        to_ = alice.address,
+        count = 2,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = []
+    ).run(sender = admin)
+
+    scenario.verify(places_tokens.data.last_token_id == first_token_id + 5)
+    scenario.verify(places_tokens.data.token_metadata[first_token_id + 4].token_info[''] == metadata_prefix)
+
+    # compare with mint_Place
+    scenario.h3("Gas: mint_Place 100")
+    mint_place_params = [sp.record(
+        to_ = alice.address,
+        metadata = {'': metadata_prefix + sp.utils.bytes_of_string(str(i))}
+    ) for i in range(100)]
+    scenario.p("Packed parameter size in bytes:")
+    scenario.show(sp.len(sp.pack(sp.set_type_expr(mint_place_params, minter_contract.FA2.t_mint_nft_batch))))
+    minter.mint_Place(mint_place_params).run(sender = admin)
+
+    scenario.h3("Gas: mint_Place_range 100")
+    mint_place_range_params = sp.record(
+        to_ = alice.address,
+        count = 100,
+        metadata_prefix = metadata_prefix,
+        metadata_suffixes = [sp.utils.bytes_of_string(str(i)) for i in range(100)]
+    )
+    scenario.p("Packed parameter size in bytes:")
+    scenario.show(sp.len(sp.pack(sp.set_type_expr(mint_place_range_params, minter_contract.FA2.t_mint_nft_range))))
+    minter.mint_Place_range(mint_place_range_params).run(sender = admin)
+
     # test get_item_royalties view
     #scenario.h2("get_item_royalties")
     #scenario.p("It's a view")
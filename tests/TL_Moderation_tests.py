@@ -0,0 +1,67 @@
+import smartpy as sp
+
+moderation_contract = sp.io.import_script_from_url("file:contracts/TL_Moderation.py")
+
+@sp.add_test(name = "TL_Moderation_tests", profile = True)
+def test():
+    admin = sp.test_account("Administrator")
+    alice = sp.test_account("Alice")
+    bob   = sp.test_account("Robert")
+    fa2   = sp.test_account("FA2").address
+    scenario = sp.test_scenario()
+
+    scenario.h1("Moderation contract")
+    scenario.table_of_contents()
+
+    # Let's display the accounts:
+    scenario.h2("Accounts")
+    scenario.show([admin, alice, bob])
+
+    scenario.h2("Test Moderation")
+
+    scenario.h3("Contract origination")
+    moderation = moderation_contract.TL_Moderation(admin.address,
+        metadata = sp.utils.metadata_of_url("https://example.com"))
+    scenario += moderation
+
+    #
+    # manage_moderators
+    #
+    scenario.h3("manage_moderators")
+
+    moderation.manage_moderators([sp.variant("add_moderators", [alice.address])]).run(sender = bob, valid = False, exception = "ONLY_ADMIN")
+    moderation.manage_moderators([sp.variant("add_moderators", [alice.address])]).run(sender = alice, valid = False, exception = "ONLY_ADMIN")
+    moderation.manage_moderators([sp.variant("add_moderators", [alice.address])]).run(sender = admin)
+    scenario.verify(moderation.is_moderator(alice.address) == True)
+    scenario.verify(moderation.is_moderator(admin.address) == True)
+    scenario.verify(moderation.is_moderator(bob.address) == False)
+
+    #
+    # update_flags
+    #
+    scenario.h3("update_flags")
+
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = fa2, token_ids = [1]))]).run(sender = bob, valid = False, exception = "ONLY_MODERATOR")
+
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = fa2, token_ids = [1, 2, 300]))]).run(sender = alice)
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = bob.address, token_ids = [5]))]).run(sender = admin)
+
+    scenario.verify(moderation.data.flags[(fa2, 0)] == 6)
+    scenario.verify(moderation.data.flags[(fa2, 1)] == (1 << (300 - 256)))
+
+    scenario.verify_equal(moderation.get_flagged([(fa2, 0), (fa2, 1), (fa2, 2), (fa2, 300), (fa2, 5), (bob.address, 5)]),
+        sp.set([(fa2, 1), (fa2, 2), (fa2, 300), (bob.address, 5)]))
+
+    moderation.update_flags([sp.variant("unflag", sp.record(fa2 = fa2, token_ids = [2, 300]))]).run(sender = alice)
+    scenario.verify_equal(moderation.get_flagged([(fa2, 1), (fa2, 2), (fa2, 300)]), sp.set([(fa2, 1)]))
+    # empty words are removed
+    scenario.verify(~moderation.data.flags.contains((fa2, 1)))
+
+    # removed moderators can't flag
+    moderation.manage_moderators([sp.variant("remove_moderators", [alice.address])]).run(sender = admin)
+    scenario.verify(moderation.is_moderator(alice.address) == False)
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = fa2, token_ids = [2]))]).run(sender = alice, valid = False, exception = "ONLY_MODERATOR")
+
+    scenario.h4("Gas: flag 256 token ids")
+    moderation.update_flags([sp.variant("flag", sp.record(fa2 = fa2, token_ids = list(range(1024, 1280))))]).run(sender = admin)
+    scenario.verify(moderation.data.flags[(fa2, 4)] == (1 << 256) - 1)
@@ -0,0 +1,58 @@
+import smartpy as sp
+
+tokens = sp.io.import_script_from_url("file:contracts/Tokens.py")
+
+@sp.add_test(name = "Tokens_tests", profile = True)
+def test():
+    admin = sp.test_account("Administrator")
+    alice = sp.test_account("Alice")
+    bob   = sp.test_account("Robert")
+    scenario = sp.test_scenario()
+
+    scenario.h1("tz1and token contracts")
+    scenario.table_of_contents()
+
+    # Let's display the accounts:
+    scenario.h2("Accounts")
+    scenario.show([admin, alice, bob])
+
+    metadata = sp.utils.metadata_of_url("https://example.com")
+    token_metadata = {"": sp.utils.bytes_of_string("test_metadata")}
+
+    #
+    # events
+    #
+    scenario.h2("emit_events")
+
+    for events in [False, True]:
+        with_events = "with" if events else "without"
+        scenario.h3("Contracts %s events" % with_events)
+        places_tokens = tokens.tz1andPlaces(metadata = metadata, admin = admin.address, emit_events = events)
+        scenario += places_tokens
+        items_tokens = tokens.tz1andItems(metadata = metadata, admin = admin.address, emit_events = events)
+        scenario += items_tokens
+        dao_tokens = tokens.tz1andDAO(metadata = metadata, admin = admin.address, emit_events = events)
+        scenario += dao_tokens
+
+        scenario.h4("Gas: Places mint %s events" % with_events)
+        places_tokens.mint([sp.record(to_ = alice.address, metadata = token_metadata)]).run(sender = admin)
+        scenario.h4("Gas: Places transfer %s events" % with_events)
+        places_tokens.transfer([sp.record(from_ = alice.address, txs = [sp.record(to_ = bob.address, amount = 1, token_id = 0)])]).run(sender = alice)
+        scenario.verify(places_tokens.data.ledger[0] == bob.address)
+
+        scenario.h4("Gas: Items mint %s events" % with_events)
+        items_tokens.mint([sp.record(to_ = alice.address, amount = 10, token = sp.variant("new", sp.record(
+            metadata = token_metadata,
+            royalties = sp.record(royalties = 250, contributors = [sp.record(address = alice.address, relative_royalties = 1000, role = sp.variant("minter", sp.unit))]))))]).run(sender = admin)
+        scenario.h4("Gas: Items transfer %s events" % with_events)
+        items_tokens.transfer([sp.record(from_ = alice.address, txs = [sp.record(to_ = bob.address, amount = 4, token_id = 0)])]).run(sender = alice)
+        scenario.verify(items_tokens.data.ledger[(bob.address, 0)] == 4)
+        scenario.h4("Gas: Items burn %s events" % with_events)
+        items_tokens.burn([sp.record(from_ = bob.address, amount = 1, token_id = 0)]).run(sender = bob)
+        scenario.verify(items_tokens.data.ledger[(bob.address, 0)] == 3)
+
+        scenario.h4("Gas: DAO mint %s events" % with_events)
+        dao_tokens.mint([sp.record(to_ = alice.address, amount = 100, token = sp.variant("new", sp.record(metadata = token_metadata)))]).run(sender = admin)
+        scenario.h4("Gas: DAO transfer %s events" % with_events)
+        dao_tokens.transfer([sp.record(from_ = alice.address, txs = [sp.record(to_ = bob.address, amount = 40, token_id = 0)])]).run(sender = alice)
+        scenario.verify(dao_tokens.data.ledger[bob.address] == 40)
@@ -21,6 +21,29 @@ class UpgradeableTest(upgradeable_mixin.Upgradeable, sp.Contract):
         self.data.counter *= params.val
 
 
+def lib_add(val):
+    sp.set_type(val, sp.TInt)
+    sp.result(val + 1)
+
+def lib_add_update(val):
+    sp.set_type(val, sp.TInt)
+    sp.result(val + 2)
+
+class UpgradeableLibTest(upgradeable_mixin.Upgradeable, sp.Contract):
+    def __init__(self, administrator):
+        self.init_storage(
+            counter = sp.int(0)
+        )
+        upgradeable_mixin.Upgradeable.__init__(self, administrator = administrator,
+            entrypoints = ['test_entry'],
+            libs = {'add': (sp.build_lambda(lib_add), sp.TLambda(sp.TInt, sp.TInt))})
+
+    @sp.entry_point(lazify = True)
+    def test_entry(self, params):
+        sp.set_type(params.val, sp.TInt)
+        self.data.counter = self.callLib('add', params.val)
+
+
 def test_entry_uodate(self, params):
     sp.set_type(params.val, sp.TInt)
     self.data.counter -= params.val
@@ -29,6 +52,14 @@ def another_entry_update(self, params):
     sp.set_type(params.val, sp.TInt)
     self.data.counter = params.val
 
+def test_entry_update_eps(self, params):
+    sp.set_type(params.val, sp.TInt)
+    self.data.counter = (self.data.counter + params.val) * 2
+
+def another_entry_update_eps(self, params):
+    sp.set_type(params.val, sp.TInt)
+    self.data.counter -= params.val
+
 @sp.add_test(name = "UpgradeableTest_tests", profile = True)
 def test():
     admin = sp.test_account("Administrator")
@@ -62,4 +93,40 @@ def test():
     scenario.verify(upgrade.data.counter == sp.int(-1))
 
     upgrade.another_entry(val = sp.int(1337)).run(sender = alice)
-    scenario.verify(upgrade.data.counter == sp.int(1337))
\ No newline at end of file
+    scenario.verify(upgrade.data.counter == sp.int(1337))
+    # update several at once
+    upgrade_test_entry = sp.record(ep_name = sp.variant('test_entry', sp.unit), new_code = sp.utils.wrap_entry_point("test_entry", test_entry_update_eps))
+    upgrade_another_entry = sp.record(ep_name = sp.variant('another_entry', sp.unit), new_code = sp.utils.wrap_entry_point("another_entry", another_entry_update_eps))
+
+    upgrade.update_eps([upgrade_test_entry, upgrade_another_entry]).run(sender = alice, valid = False, exception = "ONLY_ADMIN")
+    upgrade.update_eps([upgrade_test_entry, upgrade_another_entry]).run(sender = admin)
+
+    upgrade.test_entry(val = sp.int(3)).run(sender = alice)
+    scenario.verify(upgrade.data.counter == sp.int(1340 * 2))
+
+    upgrade.another_entry(val = sp.int(2)).run(sender = alice)
+    scenario.verify(upgrade.data.counter == sp.int(1340 * 2 - 2))
+
+    # empty list is a no-op
+    upgrade.update_eps([]).run(sender = admin)
+
+
+@sp.add_test(name = "UpgradeableLibTest_tests", profile = True)
+def test():
+    admin = sp.test_account("Administrator")
+    alice = sp.test_account("Alice")
+    scenario = sp.test_scenario()
+
+    # create upgrade contract with a lib
+    upgrade = UpgradeableLibTest(admin.address)
+    scenario += upgrade
+
+    upgrade.test_entry(val = sp.int(2)).run(sender = alice)
+    scenario.verify(upgrade.data.counter == sp.int(3))
+
+    # update lib
+    upgrade.update_lib(sp.variant('add', sp.build_lambda(lib_add_update))).run(sender = alice, valid = False, exception = "ONLY_ADMIN")
+    upgrade.update_lib(sp.variant('add', sp.build_lambda(lib_add_update))).run(sender = admin)
+
+    upgrade.test_entry(val = sp.int(2)).run(sender = alice)
+    scenario.verify(upgrade.data.counter == sp.int(4))
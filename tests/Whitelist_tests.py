@@ -1,6 +1,7 @@
 import smartpy as sp
 
 whitelist_mixin = sp.io.import_script_from_url("file:contracts/Whitelist.py")
+merkle = sp.io.import_script_from_url("file:tests/lib/Merkle_lib.py")
 
 class WhitelistTests(whitelist_mixin.Whitelist, sp.Contract):
     def __init__(self, administrator):
@@ -26,6 +27,31 @@ class WhitelistTests(whitelist_mixin.Whitelist, sp.Contract):
         sp.set_type(address, sp.TAddress)
         self.removeFromWhitelist(address)
 
+    @sp.entry_point
+    def testUseWhitelist(self, extension):
+        """Check and spend, like bid does."""
+        sp.set_type(extension, sp.TOption(sp.TMap(sp.TString, sp.TBytes)))
+        self.onlyWhitelisted(extension)
+        self.removeFromWhitelist(sp.sender, extension)
+
+
+def merkle_extension(tree, index):
+    """Build a bid extension map with a merkle claim."""
+    proof = sp.list([sp.bytes("0x" + h.hex()) for h in tree.proof(index)])
+    claim = sp.set_type_expr(sp.record(index = sp.nat(index), proof = proof), whitelist_mixin.t_merkle_claim)
+    return sp.some(sp.map({"merkle_proof": sp.pack(claim)}))
+
+def merkle_root(tree):
+    return sp.some(sp.bytes("0x" + tree.root.hex()))
+
+def id_voucher(contract, signer, id, address):
+    """Build a bid extension map with a signed id voucher."""
+    signed_bytes = sp.pack(sp.pair(contract.address, sp.pair(sp.nat(id), address)))
+    voucher = sp.set_type_expr(sp.record(id = sp.nat(id),
+        signature = sp.make_signature(signer.secret_key, signed_bytes, message_format = "Raw")),
+        whitelist_mixin.t_whitelist_voucher)
+    return sp.some(sp.map({"whitelist_voucher": sp.pack(voucher)}))
+
 
 @sp.add_test(name = "Whitelist_tests", profile = True)
 def test():
@@ -112,30 +138,30 @@ def test():
     scenario.h3("removeFromWhitelist")
 
     whitelist.manage_whitelist([sp.variant("whitelist_add", [bob.address, admin.address])]).run(sender=admin)
-    scenario.verify(whitelist.data.whitelist.contains(bob.address))
-    scenario.verify(~whitelist.data.whitelist.contains(alice.address))
-    scenario.verify(whitelist.data.whitelist.contains(admin.address))
+    scenario.verify(whitelist.is_whitelisted(bob.address))
+    scenario.verify(~whitelist.is_whitelisted(alice.address))
+    scenario.verify(whitelist.is_whitelisted(admin.address))
 
     whitelist.testRemoveFromWhitelist(bob.address).run(sender=admin, valid=True)
-    scenario.verify(~whitelist.data.whitelist.contains(bob.address))
+    scenario.verify(~whitelist.is_whitelisted(bob.address))
     whitelist.testRemoveFromWhitelist(alice.address).run(sender=admin, valid=True)
-    scenario.verify(~whitelist.data.whitelist.contains(alice.address))
+    scenario.verify(~whitelist.is_whitelisted(alice.address))
     whitelist.testRemoveFromWhitelist(admin.address).run(sender=admin, valid=True)
-    scenario.verify(~whitelist.data.whitelist.contains(admin.address))
+    scenario.verify(~whitelist.is_whitelisted(admin.address))
 
     #
     #
     scenario.h3("manage_whitelist")
 
     whitelist.manage_whitelist([sp.variant("whitelist_add", [bob.address, admin.address])]).run(sender=admin)
-    scenario.verify(whitelist.data.whitelist.contains(bob.address))
-    scenario.verify(~whitelist.data.whitelist.contains(alice.address))
-    scenario.verify(whitelist.data.whitelist.contains(admin.address))
+    scenario.verify(whitelist.is_whitelisted(bob.address))
+    scenario.verify(~whitelist.is_whitelisted(alice.address))
+    scenario.verify(whitelist.is_whitelisted(admin.address))
 
     whitelist.manage_whitelist([sp.variant("whitelist_remove", [bob.address, admin.address])]).run(sender=admin)
-    scenario.verify(~whitelist.data.whitelist.contains(bob.address))
-    scenario.verify(~whitelist.data.whitelist.contains(alice.address))
-    scenario.verify(~whitelist.data.whitelist.contains(admin.address))
+    scenario.verify(~whitelist.is_whitelisted(bob.address))
+    scenario.verify(~whitelist.is_whitelisted(alice.address))
+    scenario.verify(~whitelist.is_whitelisted(admin.address))
 
     whitelist.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender=admin)
     scenario.verify(whitelist.data.whitelist_enabled == False)
@@ -164,3 +190,158 @@ def test():
     scenario.verify(whitelist.is_whitelisted(bob.address) == True)
     scenario.verify(whitelist.is_whitelisted(alice.address) == False)
     scenario.verify(whitelist.is_whitelisted(admin.address) == True)
+
+
+    #
+    # epochs
+    scenario.h3("whitelist epochs")
+
+    scenario.verify(whitelist.data.whitelist_epoch == 0)
+    whitelist.manage_whitelist([sp.variant("whitelist_new_epoch", sp.unit)]).run(sender = bob, valid = False)
+
+    # new epoch clears the whitelist
+    scenario.h4("Gas: whitelist_new_epoch")
+    whitelist.manage_whitelist([sp.variant("whitelist_new_epoch", sp.unit)]).run(sender = admin)
+    scenario.verify(whitelist.data.whitelist_epoch == 1)
+    scenario.verify(whitelist.is_whitelisted(bob.address) == False)
+    scenario.verify(whitelist.is_whitelisted(admin.address) == False)
+    whitelist.testOnlyWhitelisted().run(sender = bob, valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testIsWhitelisted(False).run(sender = bob)
+
+    # add and remove in the new epoch
+    whitelist.manage_whitelist([sp.variant("whitelist_add", [alice.address])]).run(sender = admin)
+    scenario.verify(whitelist.is_whitelisted(alice.address) == True)
+    whitelist.testOnlyWhitelisted().run(sender = alice)
+    whitelist.testRemoveFromWhitelist(alice.address).run(sender = admin)
+    scenario.verify(whitelist.is_whitelisted(alice.address) == False)
+    whitelist.manage_whitelist([sp.variant("whitelist_add", [alice.address])]).run(sender = admin)
+
+    # sweep old epochs
+    scenario.verify(whitelist.data.whitelist.contains(sp.pair(sp.nat(0), bob.address)))
+    whitelist.manage_whitelist([sp.variant("whitelist_sweep", [sp.pair(sp.nat(0), bob.address)])]).run(sender = bob, valid = False)
+    whitelist.manage_whitelist([sp.variant("whitelist_sweep", [sp.pair(sp.nat(1), alice.address)])]).run(sender = admin, valid = False, exception = "INVALID_EPOCH")
+    whitelist.manage_whitelist([sp.variant("whitelist_sweep", [sp.pair(sp.nat(0), bob.address), sp.pair(sp.nat(0), admin.address)])]).run(sender = admin)
+    scenario.verify(~whitelist.data.whitelist.contains(sp.pair(sp.nat(0), bob.address)))
+    scenario.verify(~whitelist.data.whitelist.contains(sp.pair(sp.nat(0), admin.address)))
+    scenario.verify(whitelist.is_whitelisted(alice.address) == True)
+
+    # restore state for the following tests
+    whitelist.manage_whitelist([sp.variant("whitelist_remove", [alice.address]), sp.variant("whitelist_add", [bob.address, admin.address])]).run(sender = admin)
+
+    #
+    # merkle whitelist
+    scenario.h3("merkle whitelist")
+
+    addresses = [merkle.make_address(i) for i in range(10)]
+    tree = merkle.MerkleTree(addresses)
+    other_tree = merkle.MerkleTree(addresses[5:])
+
+    # no root set
+    whitelist.testUseWhitelist(merkle_extension(tree, 3)).run(sender = sp.address(addresses[3]), valid = False, exception = "ONLY_WHITELISTED")
+
+    whitelist.manage_whitelist([sp.variant("whitelist_merkle_root", merkle_root(tree))]).run(sender = bob, valid = False)
+    whitelist.manage_whitelist([sp.variant("whitelist_merkle_root", merkle_root(tree))]).run(sender = admin)
+    scenario.verify(whitelist.data.whitelist_merkle_root == merkle_root(tree))
+
+    # no or invalid claim
+    whitelist.testUseWhitelist(sp.none).run(sender = sp.address(addresses[3]), valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(sp.some(sp.map({"merkle_proof": sp.bytes("0x00")}))).run(sender = sp.address(addresses[3]), valid = False, exception = "ONLY_WHITELISTED")
+    # wrong sender, wrong index, proof for other tree
+    whitelist.testUseWhitelist(merkle_extension(tree, 3)).run(sender = sp.address(addresses[4]), valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(merkle_extension(tree, 4)).run(sender = sp.address(addresses[3]), valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(merkle_extension(other_tree, 0)).run(sender = sp.address(addresses[5]), valid = False, exception = "ONLY_WHITELISTED")
+
+    # valid claims are spent
+    for i in [0, 3, 9]:
+        scenario.verify(whitelist.is_merkle_claimed(i) == False)
+        whitelist.testUseWhitelist(merkle_extension(tree, i)).run(sender = sp.address(addresses[i]))
+        scenario.verify(whitelist.is_merkle_claimed(i) == True)
+        whitelist.testUseWhitelist(merkle_extension(tree, i)).run(sender = sp.address(addresses[i]), valid = False, exception = "ONLY_WHITELISTED")
+    scenario.verify(whitelist.is_merkle_claimed(4) == False)
+
+    # addresses in the whitelist don't need a claim and don't spend one
+    whitelist.manage_whitelist([sp.variant("whitelist_add", [sp.address(addresses[4])])]).run(sender = admin)
+    whitelist.testUseWhitelist(merkle_extension(tree, 4)).run(sender = sp.address(addresses[4]))
+    scenario.verify(~whitelist.is_whitelisted(sp.address(addresses[4])))
+    scenario.verify(whitelist.is_merkle_claimed(4) == False)
+
+    # claims are tracked per root
+    whitelist.manage_whitelist([sp.variant("whitelist_merkle_root", merkle_root(other_tree))]).run(sender = admin)
+    scenario.verify(whitelist.is_merkle_claimed(0) == False)
+    whitelist.testUseWhitelist(merkle_extension(other_tree, 0)).run(sender = sp.address(addresses[5]))
+
+    # claims aren't spent if whitelist is disabled
+    whitelist.manage_whitelist([sp.variant("whitelist_enabled", False)]).run(sender = admin)
+    whitelist.testUseWhitelist(merkle_extension(other_tree, 1)).run(sender = sp.address(addresses[6]))
+    scenario.verify(whitelist.is_merkle_claimed(1) == False)
+    whitelist.manage_whitelist([sp.variant("whitelist_enabled", True)]).run(sender = admin)
+
+    whitelist.manage_whitelist([sp.variant("whitelist_merkle_root", sp.none)]).run(sender = admin)
+    whitelist.testUseWhitelist(merkle_extension(other_tree, 1)).run(sender = sp.address(addresses[6]), valid = False, exception = "ONLY_WHITELISTED")
+
+    #
+    # id bitmap whitelist
+    scenario.h3("id whitelist")
+
+    participants = [sp.address(merkle.make_address("participant%d" % i)) for i in range(301)]
+
+    # no signer set
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_add", {0: 1})]).run(sender = admin)
+    whitelist.testUseWhitelist(id_voucher(whitelist, alice, 0, participants[0])).run(sender = participants[0], valid = False, exception = "ONLY_WHITELISTED")
+
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_signer", sp.some(alice.public_key))]).run(sender = bob, valid = False)
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_signer", sp.some(alice.public_key))]).run(sender = admin)
+
+    # add ids 0, 5 and 300, whole words at a time
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_add", {0: (1 << 5), 1: (1 << (300 - 256))})]).run(sender = bob, valid = False)
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_add", {0: (1 << 5), 1: (1 << (300 - 256))})]).run(sender = admin)
+    scenario.verify(whitelist.data.whitelist_ids[(whitelist.data.whitelist_epoch, 0)] == 33)
+    for i in [0, 5, 300]:
+        scenario.verify(whitelist.is_id_whitelisted(i) == True)
+    scenario.verify(whitelist.is_id_whitelisted(1) == False)
+
+    # no voucher, wrong signer, wrong sender, id not whitelisted
+    whitelist.testUseWhitelist(sp.none).run(sender = participants[0], valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(id_voucher(whitelist, bob, 0, participants[0])).run(sender = participants[0], valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(id_voucher(whitelist, alice, 0, participants[0])).run(sender = participants[1], valid = False, exception = "ONLY_WHITELISTED")
+    whitelist.testUseWhitelist(id_voucher(whitelist, alice, 1, participants[1])).run(sender = participants[1], valid = False, exception = "ONLY_WHITELISTED")
+
+    # valid vouchers are spent once
+    for i in [0, 5, 300]:
+        whitelist.testUseWhitelist(id_voucher(whitelist, alice, i, participants[i])).run(sender = participants[i])
+        scenario.verify(whitelist.is_id_whitelisted(i) == False)
+        whitelist.testUseWhitelist(id_voucher(whitelist, alice, i, participants[i])).run(sender = participants[i], valid = False, exception = "ONLY_WHITELISTED")
+    # empty words are removed
+    scenario.verify(~whitelist.data.whitelist_ids.contains((whitelist.data.whitelist_epoch, 0)))
+    scenario.verify(~whitelist.data.whitelist_ids.contains((whitelist.data.whitelist_epoch, 1)))
+
+    # remove ids
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_add", {0: 3})]).run(sender = admin)
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_remove", [1])]).run(sender = admin)
+    scenario.verify(whitelist.is_id_whitelisted(0) == True)
+    scenario.verify(whitelist.is_id_whitelisted(1) == False)
+
+    # new epoch clears ids
+    whitelist.manage_whitelist([sp.variant("whitelist_new_epoch", sp.unit), sp.variant("whitelist_add", [bob.address, admin.address])]).run(sender = admin)
+    scenario.verify(whitelist.is_id_whitelisted(0) == False)
+
+    # For comparison: id voucher.
+    scenario.h4("Gas: id voucher")
+    whitelist.manage_whitelist([sp.variant("whitelist_ids_add", {1: (1 << (300 - 256))})]).run(sender = admin)
+    whitelist.testUseWhitelist(id_voucher(whitelist, alice, 300, participants[300])).run(sender = participants[300])
+
+    #
+    # gas across proof depths
+    scenario.h3("merkle whitelist gas")
+
+    for depth in [1, 4, 8, 12, 16]:
+        addresses = [merkle.make_address("depth%d_%d" % (depth, i)) for i in range(2 ** depth)]
+        tree = merkle.MerkleTree(addresses)
+        whitelist.manage_whitelist([sp.variant("whitelist_merkle_root", merkle_root(tree))]).run(sender = admin)
+        scenario.h4("Gas: merkle claim, depth %d" % depth)
+        whitelist.testUseWhitelist(merkle_extension(tree, 1)).run(sender = sp.address(addresses[1]))
+
+    # For comparison: address set.
+    scenario.h4("Gas: address set")
+    whitelist.manage_whitelist([sp.variant("whitelist_add", [bob.address])]).run(sender = admin)
+    whitelist.testUseWhitelist(sp.none).run(sender = bob)
@@ -1,5 +1,7 @@
 import smartpy as sp
 
+FA2 = sp.io.import_script_from_url("file:contracts/FA2.py")
+
 admin = sp.test_account("Administrator")
 admin2 = sp.test_account("Administrator2")
 alice = sp.test_account("Alice")
@@ -487,10 +489,11 @@ def test_balance_of(test_name, fa2_contract):
 
     - `balance_of` calls back with valid results.
     - `balance_of` fails with `FA2_TOKEN_UNDEFINED` when token is undefined.
+    - `balance_of` with many owners for the same token (profiled for gas).
     """
     test_name = "test_balance_of_" + test_name
 
-    @sp.add_test(name=test_name)
+    @sp.add_test(name=test_name, profile=True)
     def test():
         sc = sp.test_scenario()
         sc.h1(test_name)
@@ -576,6 +579,34 @@ def test_balance_of(test_name, fa2_contract):
             ],
         ).run(sender=alice, valid=False, exception="FA2_TOKEN_UNDEFINED")
 
+        sc.h2("Many owners for the same token")
+        owners = [alice, bob] + [sp.test_account("Owner%d" % i) for i in range(28)]
+        sc.h3("Gas: balance_of with %d requests for the same token" % len(owners))
+        c1.balance_of(
+            callback=sp.contract(
+                sp.TList(t_balance_of_response),
+                c2.address,
+                entry_point="receive_balances",
+            ).open_some(),
+            requests=[sp.record(owner=owner.address, token_id=0) for owner in owners],
+        ).run(sender=alice)
+        sc.verify(c2.data.last_known_balances[c1.address][(alice.address, 0)] == ICO)
+        sc.verify(c2.data.last_known_balances[c1.address][(bob.address, 0)] == 0)
+
+        # The defined check is per token, not per call.
+        c1.balance_of(
+            callback=sp.contract(
+                sp.TList(t_balance_of_response),
+                c2.address,
+                entry_point="receive_balances",
+            ).open_some(),
+            requests=[
+                sp.record(owner=alice.address, token_id=0),
+                sp.record(owner=bob.address, token_id=0),
+                sp.record(owner=bob.address, token_id=5),
+            ],
+        ).run(sender=alice, valid=False, exception="FA2_TOKEN_UNDEFINED")
+
 
 def test_no_transfer(test_name, fa2_contract):
     """Test that the `no-transfer` policy works as expected.
@@ -898,6 +929,165 @@ def test_owner_or_operator_transfer(test_name, fa2_contract):
         sc.verify(c1.data.operators.contains(operator_bob))
 
 
+def test_operators_for_all(test_name, fa2_contract):
+    """Test operators for all of the `owner-or-operator-transfer` policies.
+
+    Args:
+        test_name (string): Name of the test
+        fa2_contract (function): Return an instance of the FA2 contract
+            on which the tests occur.
+
+    The contract must contains the tokens 0: tok0_md, 1: tok1_md, 2: tok2_md.
+
+    For NFT contracts, `alice` must own the three tokens.
+
+    For Fungible contracts, `alice` must own 42 of each token types.
+
+    Tests:
+
+    - only the owner can add operators for all.
+    - operator for all can transfer any token in a single batch.
+    - `is_operator` returns True for any token.
+    - owner can remove operator for all and add another in a batch.
+    - removed operator for all cannot transfer anymore.
+    - add then remove the same operator for all doesn't change the storage.
+    - `revoke_all_operators` invalidates operators and operators for all.
+    - operators added after revoking are valid.
+    """
+    test_name = "test_operators_for_all_" + test_name
+
+    @sp.add_test(name=test_name, is_default=False)
+    def test():
+        operator_bob = sp.record(owner=alice.address, operator=bob.address)
+        operator_charlie = sp.record(owner=alice.address, operator=charlie.address)
+
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob])
+
+        c1 = fa2_contract
+        sc += c1
+
+        if c1.ledger_type == "SingleAsset":
+            token_ids = [0]
+        else:
+            token_ids = [0, 1, 2]
+
+        sc.h2("Bob cannot add himself as operator for all")
+        c1.update_operators_for_all([sp.variant("add_operator_for_all", operator_bob)]).run(
+            sender=bob, valid=False, exception="FA2_NOT_OWNER"
+        )
+
+        sc.h2("Bob cannot transfer Alice's tokens")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=alice.address, amount=1, token_id=0)],
+                )
+            ]
+        ).run(sender=bob, valid=False, exception="FA2_NOT_OPERATOR")
+
+        sc.h2("Alice adds Bob as operator for all")
+        c1.update_operators_for_all([sp.variant("add_operator_for_all", operator_bob)]).run(
+            sender=alice
+        )
+        sc.verify(c1.data.operators_for_all.contains(operator_bob))
+
+        for token_id in token_ids:
+            sc.verify(c1.is_operator(sp.record(owner=alice.address, operator=bob.address, token_id=token_id)))
+        sc.verify(~c1.is_operator(sp.record(owner=alice.address, operator=charlie.address, token_id=0)))
+
+        sc.h2("Bob can transfer all of Alice's tokens with a single entry")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=alice.address, amount=1, token_id=token_id) for token_id in token_ids],
+                )
+            ]
+        ).run(sender=bob)
+
+        sc.h2("Alice can remove Bob and add Charlie in a batch")
+        c1.update_operators_for_all(
+            [
+                sp.variant("remove_operator_for_all", operator_bob),
+                sp.variant("add_operator_for_all", operator_charlie),
+            ]
+        ).run(sender=alice)
+        sc.verify(~c1.data.operators_for_all.contains(operator_bob))
+        sc.verify(c1.data.operators_for_all.contains(operator_charlie))
+
+        sc.h2("Bob cannot transfer Alice's tokens anymore")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=alice.address, amount=1, token_id=0)],
+                )
+            ]
+        ).run(sender=bob, valid=False, exception="FA2_NOT_OPERATOR")
+
+        sc.h2("Charlie can transfer Alice's token")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=charlie.address, amount=1, token_id=0)],
+                )
+            ]
+        ).run(sender=charlie)
+        sc.verify(c1.get_balance(sp.record(owner=charlie.address, token_id=0)) == 1)
+
+        sc.h2("Add then Remove in the same batch is transparent")
+        c1.update_operators_for_all(
+            [
+                sp.variant("add_operator_for_all", operator_bob),
+                sp.variant("remove_operator_for_all", operator_bob),
+            ]
+        ).run(sender=alice)
+        sc.verify(~c1.data.operators_for_all.contains(operator_bob))
+
+        sc.h2("Alice revokes all her operators")
+        operator_bob_token = sp.record(owner=alice.address, operator=bob.address, token_id=0)
+        c1.update_operators([sp.variant("add_operator", operator_bob_token)]).run(sender=alice)
+        sc.verify(c1.is_operator(operator_bob_token))
+        sc.verify(c1.is_operator(sp.record(owner=alice.address, operator=charlie.address, token_id=0)))
+
+        c1.revoke_all_operators().run(sender=alice)
+        sc.verify(c1.data.operator_epochs[alice.address] == 1)
+        sc.verify(~c1.is_operator(operator_bob_token))
+        sc.verify(~c1.is_operator(sp.record(owner=alice.address, operator=charlie.address, token_id=0)))
+
+        for sender in [bob, charlie]:
+            c1.transfer(
+                [
+                    sp.record(
+                        from_=alice.address,
+                        txs=[sp.record(to_=alice.address, amount=1, token_id=0)],
+                    )
+                ]
+            ).run(sender=sender, valid=False, exception="FA2_NOT_OPERATOR")
+
+        sc.h2("Operators added after revoking are valid")
+        c1.update_operators([sp.variant("add_operator", operator_bob_token)]).run(sender=alice)
+        c1.update_operators_for_all([sp.variant("add_operator_for_all", operator_charlie)]).run(sender=alice)
+        sc.verify(c1.is_operator(operator_bob_token))
+        sc.verify(c1.is_operator(sp.record(owner=alice.address, operator=charlie.address, token_id=0)))
+        for sender in [bob, charlie]:
+            c1.transfer(
+                [
+                    sp.record(
+                        from_=alice.address,
+                        txs=[sp.record(to_=alice.address, amount=1, token_id=0)],
+                    )
+                ]
+            ).run(sender=sender)
+
+
 ################################################################################
 
 # Optional features tests
@@ -1424,6 +1614,33 @@ def test_optional_features(nft_contract, fungible_contract, single_asset_contrac
             single_asset.count_tokens(), sp.nat(1)
         )
 
+    def test_all_tokens_paginated(sc, nft, fungible, single_asset):
+        """Test the `all_tokens_paginated` view.
+
+        Tests:
+
+        - pages only contain existing tokens, burned nfts are skipped.
+        - pages are capped at the number of tokens.
+        - single_asset only ever returns token 0.
+        """
+        sc.h2("all_tokens_paginated")
+
+        # nft tokens 0 and 1 were burned
+        sc.verify_equal(nft.all_tokens_paginated(sp.record(offset=0, limit=10)), [2])
+        sc.verify_equal(nft.all_tokens_paginated(sp.record(offset=0, limit=2)), [])
+        sc.verify_equal(nft.all_tokens_paginated(sp.record(offset=2, limit=1)), [2])
+        sc.verify_equal(nft.all_tokens_paginated(sp.record(offset=3, limit=10)), [])
+
+        # fungible tokens aren't deleted when burned
+        sc.verify_equal(fungible.all_tokens_paginated(sp.record(offset=0, limit=10)), [0, 1])
+        sc.verify_equal(fungible.all_tokens_paginated(sp.record(offset=0, limit=1)), [0])
+        sc.verify_equal(fungible.all_tokens_paginated(sp.record(offset=1, limit=1)), [1])
+        sc.verify_equal(fungible.all_tokens_paginated(sp.record(offset=0, limit=0)), [])
+
+        sc.verify_equal(single_asset.all_tokens_paginated(sp.record(offset=0, limit=10)), [0])
+        sc.verify_equal(single_asset.all_tokens_paginated(sp.record(offset=1, limit=10)), [])
+        sc.verify_equal(single_asset.all_tokens_paginated(sp.record(offset=0, limit=0)), [])
+
     @sp.add_test(name=test_name)
     def test_scenario():
         sc = sp.test_scenario()
@@ -1453,6 +1670,7 @@ def test_optional_features(nft_contract, fungible_contract, single_asset_contrac
         test_balance_of(sc, nft, fungible, single_asset)
         test_offchain_token_metadata(sc, nft, fungible, single_asset)
         test_onchain_count_tokens(sc, nft, fungible, single_asset)
+        test_all_tokens_paginated(sc, nft, fungible, single_asset)
 
 
 def test_pause(nft_contract, fungible_contract, single_asset_contract):
@@ -1572,12 +1790,23 @@ def test_pause(nft_contract, fungible_contract, single_asset_contract):
                 exception=("FA2_OPERATORS_UNSUPPORTED", "FA2_PAUSED"),
             )
 
-def test_adhoc_operators(nft_contract, fungible_contract, single_asset_contract):
-    """Test the `Royalties` mixin.
+def test_adhoc_operators(nft_contract, fungible_contract, single_asset_contract, key_scheme=None):
+    """Test the `OwnerOrOperatorAdhocTransfer` policy and `update_adhoc_operators`.
+
+    - adhoc operators are only valid in the current level
+    - only admin can clear adhoc operators
+    - owner, adhoc operator and operator transfers (profiled for gas)
+    - adhoc operators are bucketed by level, buckets are capped at 100
+    - adding and checking 1, 10 and 100 adhoc operators (profiled for gas)
+    - bucket size in bytes for 1, 10 and 100 adhoc operators
+
+    `key_scheme` is only used to name the test.
     """
     test_name = "FA2_adhoc_operators"
+    if key_scheme is not None:
+        test_name += "_" + key_scheme
 
-    @sp.add_test(name=test_name)
+    @sp.add_test(name=test_name, profile=True)
     def test():
         sc = sp.test_scenario()
         sc.h1(test_name)
@@ -1701,6 +1930,89 @@ def test_adhoc_operators(nft_contract, fungible_contract, single_asset_contract)
 
             sc.verify(sp.len(contract.data.adhoc_operators) == 0)
 
+            # Compare gas of the three permission paths.
+            transfer_to_self = [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=alice.address, amount=1, token_id=0)],
+                )
+            ]
+
+            sc.h3("Gas: owner transfer")
+            contract.transfer(transfer_to_self).run(sender=alice, level=3)
+
+            sc.h3("Gas: adhoc operator transfer")
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=0)])
+            ).run(sender=alice, level=3)
+            contract.transfer(transfer_to_self).run(sender=bob, level=3)
+
+            sc.h3("Gas: operator transfer")
+            contract.update_operators([
+                sp.variant("add_operator", sp.record(owner=alice.address, operator=charlie.address, token_id=0))
+            ]).run(sender=alice, level=3)
+            contract.transfer(transfer_to_self).run(sender=charlie, level=3)
+
+            sc.h3("Gas: adhoc operator transfer, repeated token in batch")
+            contract.transfer([
+                sp.record(
+                    from_=alice.address,
+                    txs=[
+                        sp.record(to_=alice.address, amount=1, token_id=0),
+                        sp.record(to_=alice.address, amount=1, token_id=0),
+                        sp.record(to_=alice.address, amount=1, token_id=0),
+                    ],
+                )
+            ]).run(sender=bob, level=3)
+
+            # Adhoc operators expire with the level, operators don't.
+            contract.transfer(transfer_to_self).run(sender=bob, level=4, valid=False, exception="FA2_NOT_OPERATOR")
+            contract.transfer(transfer_to_self).run(sender=charlie, level=4)
+
+            # Updates in the same level add to the bucket.
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=0)])
+            ).run(sender=alice, level=5)
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=admin.address, token_id=0)])
+            ).run(sender=alice, level=5)
+            sc.verify(sp.len(contract.data.adhoc_operators) == 2)
+            sc.verify(contract.data.adhoc_operators_level == 5)
+
+            # The first update in a new level replaces the bucket.
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=0)])
+            ).run(sender=alice, level=6)
+            sc.verify(sp.len(contract.data.adhoc_operators) == 1)
+            sc.verify(contract.data.adhoc_operators_level == 6)
+
+            # More than 100 adhoc operators per call is not allowed.
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=i) for i in range(101)])
+            ).run(sender=alice, level=6, valid=False, exception="ADHOC_OPERATOR_LIMIT")
+
+            # The bucket is capped at 100, across updates in the same level.
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=i) for i in range(1, 100)])
+            ).run(sender=alice, level=6)
+            sc.verify(sp.len(contract.data.adhoc_operators) == 100)
+            contract.update_adhoc_operators(
+                sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=100)])
+            ).run(sender=alice, level=6, valid=False, exception="ADHOC_OPERATOR_LIMIT")
+
+            # Gas of adding and checking adhoc operators by bucket size.
+            for level, num_operators in enumerate([1, 10, 100], start=7):
+                sc.h3("Gas: add %d adhoc operators" % num_operators)
+                contract.update_adhoc_operators(
+                    sp.variant("add_adhoc_operators", [sp.record(operator=bob.address, token_id=i) for i in range(num_operators)])
+                ).run(sender=alice, level=level)
+                sc.verify(sp.len(contract.data.adhoc_operators) == num_operators)
+                sc.p("Packed bucket size in bytes:")
+                sc.show(sp.len(sp.pack(contract.data.adhoc_operators)))
+
+                sc.h3("Gas: check with %d adhoc operators" % num_operators)
+                contract.transfer(transfer_to_self).run(sender=bob, level=level)
+
 def test_royalties(nft_contract, fungible_contract):
     """Test the `AdhocOwnerOrOperatorTransfer` policy decorator and `update_adhoc_operators`.
     """
@@ -1820,3 +2132,777 @@ def test_royalties(nft_contract, fungible_contract):
                     to_=alice.address, amount=1000
                 )
             ]).run(sender=admin, valid=False, exception="FA2_ROYALTIES_INVALID")
+
+
+def test_owner_index(nft_contract, fungible_contract, nft_baseline, fungible_baseline):
+    """Test the owner index and the `tokens_of_owner` view.
+
+    - mint, transfer and burn keep the index in sync
+    - fungible tokens are only indexed while the balance is nonzero
+    - pagination of `tokens_of_owner`
+    - transfers with and without the index (profiled for gas)
+
+    `nft_baseline` and `fungible_baseline` must be the same contracts
+    without the owner index.
+    """
+    test_name = "FA2_owner_index"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob, charlie])
+
+        sc.h2("FA2 Contracts")
+        c1 = nft_contract
+        sc += c1
+        c2 = fungible_contract
+        sc += c2
+        b1 = nft_baseline
+        sc += b1
+        b2 = fungible_baseline
+        sc += b2
+
+        def tokens_of_owner(contract, owner, offset=0, limit=10):
+            return contract.tokens_of_owner(sp.record(owner=owner, offset=offset, limit=limit))
+
+        sc.h2("Nft")
+
+        sc.h3("Mint")
+        for contract in [c1, b1]:
+            contract.mint([sp.record(metadata=tok0_md, to_=alice.address) for _ in range(3)]).run(sender=admin)
+        sc.verify_equal(tokens_of_owner(c1, alice.address), [0, 1, 2])
+        sc.verify_equal(tokens_of_owner(c1, bob.address), [])
+
+        sc.h3("Pagination")
+        sc.verify_equal(tokens_of_owner(c1, alice.address, 0, 2), [0, 1])
+        sc.verify_equal(tokens_of_owner(c1, alice.address, 1, 1), [1])
+        sc.verify_equal(tokens_of_owner(c1, alice.address, 2, 10), [2])
+        sc.verify_equal(tokens_of_owner(c1, alice.address, 3, 10), [])
+        sc.verify_equal(tokens_of_owner(c1, alice.address, 0, 0), [])
+
+        sc.h3("Transfer")
+        transfer_one = [sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=1, token_id=1)])]
+        sc.h4("Gas: transfer without index")
+        b1.transfer(transfer_one).run(sender=alice)
+        sc.h4("Gas: transfer with index")
+        c1.transfer(transfer_one).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c1, alice.address), [0, 2])
+        sc.verify_equal(tokens_of_owner(c1, bob.address), [1])
+
+        # Zero amount transfers don't change the index.
+        c1.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=charlie.address, amount=0, token_id=0)])]).run(sender=alice)
+        sc.verify(~c1.data.owner_tokens.contains(charlie.address))
+
+        # Transfers to self keep the token indexed.
+        c1.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=alice.address, amount=1, token_id=0)])]).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c1, alice.address), [0, 2])
+
+        sc.h3("Burn")
+        c1.burn([sp.record(from_=alice.address, amount=1, token_id=0)]).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c1, alice.address), [2])
+
+        # Owners without tokens are removed from the index.
+        c1.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=1, token_id=2)])]).run(sender=alice)
+        sc.verify(~c1.data.owner_tokens.contains(alice.address))
+        sc.verify_equal(tokens_of_owner(c1, alice.address), [])
+        sc.verify_equal(tokens_of_owner(c1, bob.address), [1, 2])
+
+        sc.h2("Fungible")
+
+        sc.h3("Mint")
+        for contract in [c2, b2]:
+            contract.mint([
+                sp.record(token=sp.variant("new", sp.record(metadata=tok0_md)), to_=alice.address, amount=100),
+                sp.record(token=sp.variant("new", sp.record(metadata=tok1_md)), to_=alice.address, amount=10),
+                sp.record(token=sp.variant("new", sp.record(metadata=tok2_md)), to_=alice.address, amount=0),
+            ]).run(sender=admin)
+        sc.verify_equal(tokens_of_owner(c2, alice.address), [0, 1])
+
+        sc.h3("Transfer")
+        transfer_some = [sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=50, token_id=0)])]
+        sc.h4("Gas: transfer without index")
+        b2.transfer(transfer_some).run(sender=alice)
+        sc.h4("Gas: transfer with index")
+        c2.transfer(transfer_some).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c2, alice.address), [0, 1])
+        sc.verify_equal(tokens_of_owner(c2, bob.address), [0])
+
+        sc.h4("Gas: transfer to an existing holder with index")
+        c2.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=1, token_id=0)])]).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c2, bob.address), [0])
+
+        sc.h4("Gas: transfer of the whole balance with index")
+        c2.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=10, token_id=1)])]).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c2, alice.address), [0])
+        sc.verify_equal(tokens_of_owner(c2, bob.address), [0, 1])
+
+        # Zero amount transfers don't add to the index.
+        c2.transfer([sp.record(from_=alice.address, txs=[sp.record(to_=charlie.address, amount=0, token_id=0)])]).run(sender=alice)
+        sc.verify(~c2.data.owner_tokens.contains(charlie.address))
+
+        sc.h3("Mint existing")
+        c2.mint([sp.record(token=sp.variant("existing", 1), to_=alice.address, amount=5)]).run(sender=admin)
+        sc.verify_equal(tokens_of_owner(c2, alice.address), [0, 1])
+
+        sc.h3("Burn")
+        c2.burn([sp.record(from_=alice.address, amount=49, token_id=0)]).run(sender=alice)
+        sc.verify_equal(tokens_of_owner(c2, alice.address), [1])
+        c2.burn([sp.record(from_=alice.address, amount=5, token_id=1)]).run(sender=alice)
+        sc.verify(~c2.data.owner_tokens.contains(alice.address))
+
+
+def test_distribute(fungible_contract, single_asset_contract, fungible_no_mint_existing):
+    """Test the `distribute` entrypoint.
+
+    - transfer source uses the transfer policy and debits the source once
+    - mint source is admin only and increases the supply
+    - mint source fails if minting existing tokens is not allowed
+    - the owner index is kept in sync, `fungible_contract` must have one
+    - op size and gas of `transfer`, `mint` and `distribute` for 100 and
+      500 recipients (profiled for gas)
+    """
+    test_name = "FA2_distribute"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob, charlie])
+
+        sc.h2("FA2 Contracts")
+        c1 = fungible_contract
+        sc += c1
+        c2 = single_asset_contract
+        sc += c2
+        c3 = fungible_no_mint_existing
+        sc += c3
+
+        sc.h3("Mint")
+        for contract in [c1, c2, c3]:
+            contract.mint([
+                sp.record(token=sp.variant("new", sp.record(metadata=tok0_md)), to_=alice.address, amount=10000)
+            ]).run(sender=admin)
+
+        def distribute(token_id, source, recipients):
+            return sp.record(token_id=token_id, source=source,
+                recipients=[sp.record(to_=to_, amount=amount) for to_, amount in recipients])
+
+        def balance(contract, owner):
+            if contract is c2:
+                return contract.data.ledger.get(owner, 0)
+            return contract.data.ledger.get((owner, 0), 0)
+
+        def supply(contract):
+            if contract is c2:
+                return contract.data.supply
+            return contract.data.token_extra[0].supply
+
+        for contract in [c1, c2]:
+            sc.h3("Distribute - transfer")
+            contract.distribute(distribute(0, sp.variant("transfer", alice.address),
+                [(bob.address, 10), (charlie.address, 20)])).run(sender=alice)
+            sc.verify(balance(contract, alice.address) == 9970)
+            sc.verify(balance(contract, bob.address) == 10)
+            sc.verify(balance(contract, charlie.address) == 20)
+            sc.verify(supply(contract) == 10000)
+
+            # Operators can distribute, others can't.
+            contract.distribute(distribute(0, sp.variant("transfer", alice.address),
+                [(bob.address, 10)])).run(sender=bob, valid=False, exception="FA2_NOT_OPERATOR")
+            contract.update_operators([
+                sp.variant("add_operator", sp.record(owner=alice.address, operator=bob.address, token_id=0))
+            ]).run(sender=alice)
+            contract.distribute(distribute(0, sp.variant("transfer", alice.address),
+                [(bob.address, 10)])).run(sender=bob)
+            sc.verify(balance(contract, bob.address) == 20)
+
+            # The source is debited the total.
+            contract.distribute(distribute(0, sp.variant("transfer", bob.address),
+                [(alice.address, 15), (charlie.address, 15)])).run(sender=bob, valid=False, exception="FA2_INSUFFICIENT_BALANCE")
+            contract.distribute(distribute(0, sp.variant("transfer", bob.address),
+                [(alice.address, 10), (charlie.address, 10)])).run(sender=bob)
+            sc.verify(balance(contract, bob.address) == 0)
+
+            contract.distribute(distribute(1, sp.variant("transfer", alice.address),
+                [(bob.address, 10)])).run(sender=alice, valid=False, exception="FA2_TOKEN_UNDEFINED")
+
+            sc.h3("Distribute - mint")
+            contract.distribute(distribute(0, sp.variant("mint", sp.unit),
+                [(bob.address, 100), (charlie.address, 200)])).run(sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+            contract.distribute(distribute(0, sp.variant("mint", sp.unit),
+                [(bob.address, 100), (charlie.address, 200)])).run(sender=admin)
+            sc.verify(balance(contract, bob.address) == 100)
+            sc.verify(balance(contract, charlie.address) == 230)
+            sc.verify(supply(contract) == 10300)
+
+        sc.h3("Distribute - owner index")
+        sc.verify(~c1.data.owner_tokens.contains(admin.address))
+        c1.distribute(distribute(0, sp.variant("transfer", charlie.address),
+            [(admin.address, 230)])).run(sender=charlie)
+        sc.verify(c1.data.owner_tokens[admin.address].contains(0))
+        sc.verify(~c1.data.owner_tokens.contains(charlie.address))
+
+        sc.h3("Distribute - mint existing not allowed")
+        c3.distribute(distribute(0, sp.variant("mint", sp.unit),
+            [(bob.address, 100)])).run(sender=admin, valid=False, exception="FA2_TX_DENIED")
+        c3.distribute(distribute(0, sp.variant("transfer", alice.address),
+            [(bob.address, 100)])).run(sender=alice)
+
+        # Compare the current paths with distribute.
+        for num_recipients in [100, 500]:
+            recipients = [sp.test_account("Recipient%d" % i).address for i in range(num_recipients)]
+
+            transfer_params = [sp.record(from_=alice.address,
+                txs=[sp.record(to_=to_, amount=1, token_id=0) for to_ in recipients])]
+            mint_params = [sp.record(token=sp.variant("existing", 0), to_=to_, amount=1) for to_ in recipients]
+            distribute_transfer_params = distribute(0, sp.variant("transfer", alice.address),
+                [(to_, 1) for to_ in recipients])
+            distribute_mint_params = distribute(0, sp.variant("mint", sp.unit),
+                [(to_, 1) for to_ in recipients])
+
+            for contract in [c1, c2]:
+                sc.h3("Gas: transfer to %d recipients" % num_recipients)
+                sc.p("Packed parameter size in bytes:")
+                sc.show(sp.len(sp.pack(sp.set_type_expr(transfer_params, FA2.t_transfer_params))))
+                contract.transfer(transfer_params).run(sender=alice)
+
+                sc.h3("Gas: mint to %d recipients" % num_recipients)
+                sc.p("Packed parameter size in bytes:")
+                sc.show(sp.len(sp.pack(sp.set_type_expr(mint_params, FA2.t_mint_fungible_batch))))
+                contract.mint(mint_params).run(sender=admin)
+
+                sc.h3("Gas: distribute transfer to %d recipients" % num_recipients)
+                sc.p("Packed parameter size in bytes:")
+                sc.show(sp.len(sp.pack(sp.set_type_expr(distribute_transfer_params, FA2.t_distribute_params))))
+                contract.distribute(distribute_transfer_params).run(sender=alice)
+
+                sc.h3("Gas: distribute mint to %d recipients" % num_recipients)
+                sc.p("Packed parameter size in bytes:")
+                sc.show(sp.len(sp.pack(sp.set_type_expr(distribute_mint_params, FA2.t_distribute_params))))
+                contract.distribute(distribute_mint_params).run(sender=admin)
+
+
+def test_checkpoints(single_asset_contract):
+    """Test balance and supply checkpoints and their onchain views.
+
+    `single_asset_contract` must be originated with 42 tokens for alice.
+
+    - the initial mint is checkpointed at level 0
+    - transfer, mint, burn and distribute write checkpoints
+    - checkpoints within a level are collapsed
+    - `get_balance_at` and `total_supply_at` (profiled for gas)
+    """
+    test_name = "FA2_checkpoints"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob, charlie])
+
+        sc.h2("FA2 Contract")
+        c1 = single_asset_contract
+        sc += c1
+
+        def balance_at(owner, level):
+            return c1.get_balance_at(sp.record(owner=owner, level=level))
+
+        def transfer(from_, to_, amount):
+            return [sp.record(from_=from_, txs=[sp.record(to_=to_, amount=amount, token_id=0)])]
+
+        sc.h3("Initial mint")
+        sc.verify(c1.data.num_checkpoints[alice.address] == 1)
+        sc.verify(balance_at(alice.address, 0) == 42)
+        sc.verify(c1.total_supply_at(0) == 42)
+
+        sc.h3("Transfer")
+        sc.h4("Gas: transfer with checkpoints")
+        c1.transfer(transfer(alice.address, bob.address, 2)).run(sender=alice, level=10)
+        sc.h4("Gas: transfer with checkpoints in the same level")
+        c1.transfer(transfer(alice.address, bob.address, 2)).run(sender=alice, level=10)
+        sc.verify(c1.data.num_checkpoints[alice.address] == 2)
+        sc.verify(c1.data.num_checkpoints[bob.address] == 1)
+
+        # Zero amount transfers don't write checkpoints.
+        c1.transfer(transfer(alice.address, charlie.address, 0)).run(sender=alice, level=15)
+        sc.verify(c1.data.num_checkpoints[alice.address] == 2)
+        sc.verify(~c1.data.num_checkpoints.contains(charlie.address))
+
+        sc.h3("Mint")
+        c1.mint([sp.record(token=sp.variant("existing", 0), to_=bob.address, amount=10)]).run(sender=admin, level=20)
+
+        sc.h3("Burn")
+        c1.burn([sp.record(from_=alice.address, amount=8, token_id=0)]).run(sender=alice, level=30)
+
+        sc.h3("Distribute")
+        c1.distribute(sp.record(token_id=0, source=sp.variant("transfer", alice.address), recipients=[
+            sp.record(to_=bob.address, amount=10), sp.record(to_=charlie.address, amount=10)
+        ])).run(sender=alice, level=40)
+
+        sc.h3("Historical balances")
+        for level, alice_balance, bob_balance, charlie_balance, supply in [
+            (0, 42, 0, 0, 42),
+            (9, 42, 0, 0, 42),
+            (10, 38, 4, 0, 42),
+            (19, 38, 4, 0, 42),
+            (20, 38, 14, 0, 52),
+            (30, 30, 14, 0, 44),
+            (39, 30, 14, 0, 44),
+            (40, 10, 24, 10, 44),
+            (1000, 10, 24, 10, 44),
+        ]:
+            sc.verify(balance_at(alice.address, level) == alice_balance)
+            sc.verify(balance_at(bob.address, level) == bob_balance)
+            sc.verify(balance_at(charlie.address, level) == charlie_balance)
+            sc.verify(c1.total_supply_at(level) == supply)
+
+        sc.h3("Binary search")
+        for level in range(100, 124):
+            c1.transfer(transfer(bob.address, charlie.address, 1)).run(sender=bob, level=level)
+        sc.verify(c1.data.num_checkpoints[bob.address] == 27)
+        for level, bob_balance in [(99, 24), (100, 23), (111, 12), (112, 11), (123, 0), (200, 0)]:
+            sc.verify(balance_at(bob.address, level) == bob_balance)
+            sc.verify(balance_at(charlie.address, level) == 10 + 24 - bob_balance)
+
+
+def test_permits(nft_contract, fungible_contract, single_asset_contract):
+    """Test the `PermitTransfer` policy decorator.
+
+    Contracts must use `PauseTransfer(PermitTransfer(...))` with the
+    default expiry.
+
+    - permits are signed by the owner and consumed when used
+    - missigned, replayed and duplicate permits fail
+    - expired permits aren't valid and can be cleared by anyone
+    - operator update permits are per action
+    - pause still applies to permitted transfers
+    - operator transfers don't consume permits
+    - permit batches of 1 and 10 (profiled for gas)
+    """
+    test_name = "FA2_permits"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob, charlie])
+
+        sc.h2("FA2 Contracts")
+        c1 = nft_contract
+        sc += c1
+        c2 = fungible_contract
+        sc += c2
+        c3 = single_asset_contract
+        sc += c3
+
+        chain_id = sp.chain_id_cst("0x9caecab9")
+        expiry = 3600
+
+        sc.h3("Mint")
+        c1.mint([sp.record(metadata=tok0_md, to_=alice.address) for _ in range(4)]).run(sender=admin)
+        for contract in [c2, c3]:
+            contract.mint([
+                sp.record(token=sp.variant("new", sp.record(metadata=tok0_md)), to_=alice.address, amount=1000)
+            ]).run(sender=admin)
+
+        for contract in [c1, c2, c3]:
+            # Alice's next permit counter.
+            counter = [0]
+
+            def make_permit(param_hash, signer=alice, counter_value=None):
+                if counter_value is None:
+                    counter_value = counter[0]
+                signed_bytes = sp.pack(sp.pair(sp.pair(chain_id, contract.address), sp.pair(counter_value, param_hash)))
+                return sp.record(
+                    key=alice.public_key,
+                    signature=sp.make_signature(signer.secret_key, signed_bytes, message_format="Raw"),
+                    param_hash=param_hash)
+
+            def transfer_hash(transfer):
+                return sp.blake2b(sp.pack(sp.set_type_expr(transfer, FA2.t_transfer_batch)))
+
+            def transfer_item(token_id, amount=1):
+                return sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=amount, token_id=token_id)])
+
+            sc.h3("Transfer with permit")
+            item = transfer_item(0)
+            sc.h4("Gas: permit")
+            contract.permit([make_permit(transfer_hash(item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(0))
+            counter[0] = 1
+            sc.verify(contract.data.permit_counters[alice.address] == 1)
+            sc.verify(contract.data.permits.contains(sp.record(owner=alice.address, param_hash=transfer_hash(item))))
+
+            # The permit is only valid for the signed batch item.
+            contract.transfer([transfer_item(0, 0)]).run(sender=bob, now=sp.timestamp(10),
+                valid=False, exception="FA2_NOT_OPERATOR")
+
+            sc.h4("Gas: transfer with permit")
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(10))
+            sc.verify(~contract.data.permits.contains(sp.record(owner=alice.address, param_hash=transfer_hash(item))))
+
+            # Permits are consumed.
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(10),
+                valid=False, exception="FA2_NOT_OPERATOR")
+
+            sc.h3("Invalid permits")
+            item = transfer_item(1 if contract is c1 else 0)
+            # Signed by someone else.
+            contract.permit([make_permit(transfer_hash(item), signer=bob)]).run(
+                sender=charlie, chain_id=chain_id, now=sp.timestamp(20), valid=False)
+            # Signed with a used counter.
+            contract.permit([make_permit(transfer_hash(item), counter_value=0)]).run(
+                sender=charlie, chain_id=chain_id, now=sp.timestamp(20), valid=False)
+            # Signed for another chain.
+            contract.permit([make_permit(transfer_hash(item))]).run(
+                sender=charlie, chain_id=sp.chain_id_cst("0x00000000"), now=sp.timestamp(20), valid=False)
+
+            # Duplicate permits fail while the first is valid.
+            contract.permit([make_permit(transfer_hash(item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(20))
+            counter[0] = 2
+            contract.permit([make_permit(transfer_hash(item))]).run(
+                sender=charlie, chain_id=chain_id, now=sp.timestamp(20), valid=False, exception="DUP_PERMIT")
+
+            sc.h3("Expired permits")
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(20 + expiry + 1),
+                valid=False, exception="FA2_NOT_OPERATOR")
+            # Anyone can clear expired permits, valid ones are skipped.
+            other_item = transfer_item(2 if contract is c1 else 0, 2)
+            contract.permit([make_permit(transfer_hash(other_item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(expiry))
+            counter[0] = 3
+            contract.clear_expired_permits([
+                sp.record(owner=alice.address, param_hash=transfer_hash(item)),
+                sp.record(owner=alice.address, param_hash=transfer_hash(other_item)),
+            ]).run(sender=bob, now=sp.timestamp(20 + expiry + 1))
+            sc.verify(~contract.data.permits.contains(sp.record(owner=alice.address, param_hash=transfer_hash(item))))
+            sc.verify(contract.data.permits.contains(sp.record(owner=alice.address, param_hash=transfer_hash(other_item))))
+
+            # Expired permits can be replaced.
+            contract.permit([make_permit(transfer_hash(item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(20 + expiry + 1))
+            counter[0] = 4
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(20 + expiry + 1))
+
+            sc.h3("Operator updates with permit")
+            operator = sp.record(owner=alice.address, operator=charlie.address, token_id=0)
+            add_operator = sp.set_type_expr(sp.variant("add_operator", operator), sp.TVariant(
+                add_operator=FA2.t_operator_permission, remove_operator=FA2.t_operator_permission))
+            contract.permit([make_permit(sp.blake2b(sp.pack(add_operator)))]).run(
+                sender=bob, chain_id=chain_id, now=sp.timestamp(30 + expiry))
+            counter[0] = 5
+            # The permit is only valid for the signed action.
+            contract.update_operators([sp.variant("remove_operator", operator)]).run(
+                sender=bob, now=sp.timestamp(30 + expiry), valid=False, exception="FA2_NOT_OWNER")
+            contract.update_operators([add_operator]).run(sender=bob, now=sp.timestamp(30 + expiry))
+            sc.verify(contract.is_operator(operator))
+            contract.update_operators([add_operator]).run(
+                sender=bob, now=sp.timestamp(30 + expiry), valid=False, exception="FA2_NOT_OWNER")
+
+            sc.h3("Pause")
+            item = transfer_item(3 if contract is c1 else 0)
+            contract.permit([make_permit(transfer_hash(item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(40 + expiry))
+            counter[0] = 6
+            contract.set_pause(True).run(sender=admin)
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(40 + expiry), valid=False)
+            contract.set_pause(False).run(sender=admin)
+            contract.transfer([item]).run(sender=bob, now=sp.timestamp(40 + expiry))
+
+            sc.h3("Operators don't use permits")
+            if contract is c1:
+                c1.mint([sp.record(metadata=tok0_md, to_=alice.address)]).run(sender=admin)
+            token_id = 4 if contract is c1 else 0
+            contract.update_operators([sp.variant("add_operator", sp.record(
+                owner=alice.address, operator=charlie.address, token_id=token_id))]).run(sender=alice)
+            item = sp.record(from_=alice.address, txs=[sp.record(to_=charlie.address, amount=1, token_id=token_id)])
+            contract.permit([make_permit(transfer_hash(item))]).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(45 + expiry))
+            counter[0] = 7
+            sc.h4("Gas: operator transfer, with unused permit")
+            contract.transfer([item]).run(sender=charlie, now=sp.timestamp(45 + expiry))
+            sc.verify(contract.data.permits.contains(sp.record(owner=alice.address, param_hash=transfer_hash(item))))
+
+            sc.h3("Gas: permit batch of 10")
+            items = [transfer_item(i, 1) if contract is c1 else transfer_item(0, i) for i in range(4, 14)]
+            permits = [make_permit(transfer_hash(item), counter_value=counter[0] + i) for i, item in enumerate(items)]
+            contract.permit(permits).run(sender=charlie, chain_id=chain_id, now=sp.timestamp(50 + expiry))
+            sc.verify(contract.data.permit_counters[alice.address] == 17)
+
+
+def test_permits_adhoc_operators(nft_baseline, fungible_baseline, nft_contract, fungible_contract):
+    """Compare adhoc operator transfers with and without `PermitTransfer`.
+
+    Contracts must use `PauseTransfer(PermitTransfer(OwnerOrOperatorAdhocTransfer()))`,
+    the baselines `PauseTransfer(OwnerOrOperatorAdhocTransfer())`. Same
+    policies as Places and Items.
+
+    - adhoc operator transfers, single and batched (profiled for gas)
+    """
+    test_name = "FA2_permits_adhoc_operators"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob])
+
+        sc.h2("FA2 Contracts")
+        contracts = [
+            ("nft, baseline", nft_baseline, True),
+            ("nft, permits", nft_contract, True),
+            ("fungible, baseline", fungible_baseline, False),
+            ("fungible, permits", fungible_contract, False),
+        ]
+        for _, contract, _ in contracts:
+            sc += contract
+
+        for name, contract, is_nft in contracts:
+            sc.h3(name)
+            if is_nft:
+                contract.mint([sp.record(metadata=tok0_md, to_=alice.address) for _ in range(11)]).run(sender=admin)
+                token_ids = list(range(11))
+            else:
+                contract.mint([
+                    sp.record(token=sp.variant("new", sp.record(metadata=tok0_md)), to_=alice.address, amount=1000)
+                ]).run(sender=admin)
+                token_ids = [0] * 11
+
+            contract.update_adhoc_operators(sp.variant("add_adhoc_operators",
+                [sp.record(operator=bob.address, token_id=token_id) for token_id in set(token_ids)])).run(sender=alice)
+
+            sc.h4("Gas: adhoc operator transfer, %s" % name)
+            contract.transfer([sp.record(from_=alice.address, txs=[
+                sp.record(to_=bob.address, amount=1, token_id=token_ids[0])])]).run(sender=bob)
+
+            sc.h4("Gas: adhoc operator transfer 10, %s" % name)
+            contract.transfer([sp.record(from_=alice.address, txs=[
+                sp.record(to_=bob.address, amount=1, token_id=token_id)]) for token_id in token_ids[1:]]).run(sender=bob)
+
+            if is_nft:
+                for token_id in token_ids:
+                    sc.verify(contract.data.ledger[token_id] == bob.address)
+            else:
+                sc.verify(contract.data.ledger[(bob.address, 0)] == 11)
+
+
+def test_update_operators_batch(nft_contract, fungible_contract, single_asset_contract):
+    """Test batched `update_operators`.
+
+    - the last action per operator wins
+    - owners other than the sender are always checked
+    - batches of distinct, repeated and cancelling actions (profiled for gas)
+    """
+    test_name = "FA2_update_operators_batch"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob, charlie])
+
+        sc.h2("FA2 Contracts")
+        c1 = nft_contract
+        sc += c1
+        c2 = fungible_contract
+        sc += c2
+        c3 = single_asset_contract
+        sc += c3
+
+        def operator(operator=bob, token_id=0):
+            return sp.record(owner=alice.address, operator=operator.address, token_id=token_id)
+
+        def add(operator):
+            return sp.variant("add_operator", operator)
+
+        def remove(operator):
+            return sp.variant("remove_operator", operator)
+
+        for contract in [c1, c2, c3]:
+            sc.h3("Last action wins")
+            contract.update_operators([
+                add(operator(bob)), remove(operator(bob)),
+                remove(operator(charlie)), add(operator(charlie)),
+                add(operator(admin)), add(operator(admin)),
+            ]).run(sender=alice)
+            sc.verify(~contract.data.operators.contains(operator(bob)))
+            sc.verify(contract.data.operators.contains(operator(charlie)))
+            sc.verify(contract.data.operators.contains(operator(admin)))
+
+            sc.h3("Other owners are always checked")
+            contract.update_operators([
+                add(operator(bob)),
+                add(sp.record(owner=bob.address, operator=charlie.address, token_id=0)),
+            ]).run(sender=alice, valid=False, exception="FA2_NOT_OWNER")
+            contract.update_operators([
+                add(sp.record(owner=bob.address, operator=charlie.address, token_id=0)),
+                add(operator(bob)),
+            ]).run(sender=alice, valid=False, exception="FA2_NOT_OWNER")
+
+            # Only token 0 exists on single asset, but operators for any
+            # token id can be added.
+            sc.h3("Gas: 1 add")
+            contract.update_operators([add(operator(bob, 100))]).run(sender=alice)
+            sc.h3("Gas: 20 distinct adds")
+            contract.update_operators([add(operator(bob, i)) for i in range(20)]).run(sender=alice)
+            sc.h3("Gas: 20 distinct removes")
+            contract.update_operators([remove(operator(bob, i)) for i in range(20)]).run(sender=alice)
+            sc.h3("Gas: 20 repeated adds")
+            contract.update_operators([add(operator(bob, 0)) for i in range(20)]).run(sender=alice)
+            sc.h3("Gas: 10 cancelling add and remove pairs")
+            contract.update_operators([action for i in range(10) for action in [add(operator(charlie, i)), remove(operator(charlie, i))]]).run(sender=alice)
+            for i in range(20):
+                sc.verify(contract.data.operators.contains(operator(bob, i)) == (i == 0))
+                sc.verify(contract.data.operators.contains(operator(charlie, i)) == False)
+
+
+def test_events(nft_contract, fungible_contract, single_asset_contract,
+    nft_baseline, fungible_baseline, single_asset_baseline):
+    """Test that all entrypoints work with `emit_events`.
+
+    The baselines must be the same contracts without `emit_events`.
+
+    - mint, transfer, operator updates and burn with and without events
+      (profiled for gas)
+    """
+    test_name = "FA2_events"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob])
+
+        sc.h2("FA2 Contracts")
+        contracts = [
+            (nft_contract, nft_baseline),
+            (fungible_contract, fungible_baseline),
+            (single_asset_contract, single_asset_baseline),
+        ]
+        for contract, baseline in contracts:
+            sc += contract
+            sc += baseline
+
+        for contract, baseline in contracts:
+            sc.h2(contract.ledger_type)
+            amount = 1 if contract.ledger_type == "NFT" else 10
+            operator = sp.record(owner=alice.address, operator=bob.address, token_id=0)
+            for c, events in [(baseline, "without"), (contract, "with")]:
+                sc.h3("Gas: mint %s events" % events)
+                if contract.ledger_type == "NFT":
+                    c.mint([sp.record(metadata=tok0_md, to_=alice.address)]).run(sender=admin)
+                else:
+                    c.mint([
+                        sp.record(token=sp.variant("new", sp.record(metadata=tok0_md)), to_=alice.address, amount=100)
+                    ]).run(sender=admin)
+
+                sc.h3("Gas: transfer %s events" % events)
+                c.transfer([
+                    sp.record(from_=alice.address, txs=[sp.record(to_=bob.address, amount=amount, token_id=0)])
+                ]).run(sender=alice)
+
+                sc.h3("Gas: update_operators %s events" % events)
+                c.update_operators([
+                    sp.variant("add_operator", operator),
+                    sp.variant("remove_operator", sp.record(owner=alice.address, operator=admin.address, token_id=0)),
+                ]).run(sender=alice)
+
+                sc.h3("Gas: update_operators_for_all %s events" % events)
+                c.update_operators_for_all([
+                    sp.variant("add_operator_for_all", sp.record(owner=alice.address, operator=bob.address))
+                ]).run(sender=alice)
+
+                sc.h3("Gas: revoke_all_operators %s events" % events)
+                c.revoke_all_operators().run(sender=alice)
+
+                sc.h3("Gas: burn %s events" % events)
+                c.burn([sp.record(from_=bob.address, amount=amount, token_id=0)]).run(sender=bob)
+
+            sc.verify(contract.data.operators.contains(operator))
+            sc.verify(contract.data.operators_for_all.contains(sp.record(owner=alice.address, operator=bob.address)))
+
+
+def test_mint_range(nft_contract, nft_royalties_contract):
+    """Test the `mint_range` entrypoint of `MintNft`.
+
+    - only admin can mint
+    - suffixes must be empty or match count
+    - ids are sequential, metadata is prefix + suffix
+    - royalties are validated and set on every token
+    """
+    test_name = "FA2_mint_range"
+
+    @sp.add_test(name=test_name, profile=True)
+    def test():
+        sc = sp.test_scenario()
+        sc.h1(test_name)
+        sc.table_of_contents()
+
+        sc.h2("Accounts")
+        sc.show([admin, alice, bob])
+
+        sc.h2("FA2 Contracts")
+        c1 = nft_contract
+        sc += c1
+        c2 = nft_royalties_contract
+        sc += c2
+
+        prefix = sp.utils.bytes_of_string("ipfs://prefix/")
+        suffixes = [sp.utils.bytes_of_string("%d.json" % i) for i in range(3)]
+        royalties = sp.record(
+            royalties=sp.nat(100),
+            contributors=[
+                sp.record(address=alice.address, role=sp.variant("minter", sp.unit), relative_royalties=sp.nat(1000))
+            ]
+        )
+
+        for contract in [c1, c2]:
+            def mint_range(count, metadata_suffixes, royalties=royalties):
+                params = sp.record(to_=alice.address, count=count, metadata_prefix=prefix, metadata_suffixes=metadata_suffixes)
+                if contract is c2:
+                    params = sp.record(to_=alice.address, count=count, metadata_prefix=prefix,
+                        metadata_suffixes=metadata_suffixes, royalties=royalties)
+                return contract.mint_range(params)
+
+            sc.h3("Errors")
+            mint_range(3, suffixes).run(sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+            mint_range(2, suffixes).run(sender=admin, valid=False, exception="FA2_MINT_RANGE_INVALID")
+            mint_range(4, suffixes).run(sender=admin, valid=False, exception="FA2_MINT_RANGE_INVALID")
+            if contract is c2:
+                mint_range(3, suffixes, sp.record(royalties=sp.nat(251), contributors=[])).run(
+                    sender=admin, valid=False, exception="FA2_ROYALTIES_INVALID")
+
+            sc.h3("Gas: mint_range with suffixes")
+            mint_range(3, suffixes).run(sender=admin)
+            sc.verify(contract.data.last_token_id == 3)
+            for i in range(3):
+                sc.verify(contract.data.ledger[i] == alice.address)
+                sc.verify(contract.data.token_metadata[i].token_info[""] == prefix + suffixes[i])
+                if contract is c2:
+                    sc.verify_equal(contract.data.token_extra[i].royalty_info, royalties)
+
+            sc.h3("Gas: mint_range without suffixes")
+            mint_range(2, []).run(sender=admin)
+            sc.verify(contract.data.last_token_id == 5)
+            sc.verify(contract.data.token_metadata[4].token_info[""] == prefix)
+
+            # Zero count mints nothing.
+            mint_range(0, []).run(sender=admin)
+            sc.verify(contract.data.last_token_id == 5)
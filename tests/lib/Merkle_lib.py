@@ -0,0 +1,127 @@
+"""Pure python helpers to build merkle whitelists for `Whitelist`.
+
+Leaves are blake2b(pack(pair(index, address))), nodes are blake2b of
+the concatenated, sorted child hashes. An odd node at the end of a
+level is promoted to the next level unchanged.
+"""
+
+import hashlib
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# base58 prefixes and binary tags of address kinds.
+ADDRESS_PREFIXES = {
+    "tz1": (bytes([6, 161, 159]), b'\x00\x00'),
+    "tz2": (bytes([6, 161, 161]), b'\x00\x01'),
+    "tz3": (bytes([6, 161, 164]), b'\x00\x02'),
+    "KT1": (bytes([2, 90, 121]), b'\x01'),
+}
+
+
+def blake2b(data):
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def b58encode_check(data):
+    data = data + hashlib.sha256(hashlib.sha256(data).digest()).digest()[:4]
+    num = int.from_bytes(data, "big")
+    res = ""
+    while num > 0:
+        num, rem = divmod(num, 58)
+        res = B58_ALPHABET[rem] + res
+    pad = len(data) - len(data.lstrip(b'\x00'))
+    return B58_ALPHABET[0] * pad + res
+
+
+def b58decode_check(string):
+    num = 0
+    for c in string:
+        num = num * 58 + B58_ALPHABET.index(c)
+    pad = len(string) - len(string.lstrip(B58_ALPHABET[0]))
+    data = b'\x00' * pad + num.to_bytes((num.bit_length() + 7) // 8, "big")
+    payload, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Invalid checksum: " + string)
+    return payload
+
+
+def address_to_bytes(address):
+    """Binary (forged) representation of an address."""
+    b58_prefix, tag = ADDRESS_PREFIXES[address[:3]]
+    payload = b58decode_check(address)
+    if not payload.startswith(b58_prefix):
+        raise ValueError("Invalid address: " + address)
+    hash = payload[len(b58_prefix):]
+    if address.startswith("KT1"):
+        return tag + hash + b'\x00'
+    return tag + hash
+
+
+def make_address(seed, kind="tz1"):
+    """A deterministic address, for tests."""
+    b58_prefix, _ = ADDRESS_PREFIXES[kind]
+    return b58encode_check(b58_prefix + blake2b(str(seed).encode())[:20])
+
+
+def encode_nat(value):
+    """Micheline (zarith) encoding of a natural number."""
+    res = bytearray([value & 0x3f])
+    value >>= 6
+    while value > 0:
+        res[-1] |= 0x80
+        res.append(value & 0x7f)
+        value >>= 7
+    return bytes(res)
+
+
+def pack_leaf(index, address):
+    """Equivalent to sp.pack(sp.pair(index, address))."""
+    addr = address_to_bytes(address)
+    return (b'\x05' + b'\x07\x07'
+        + b'\x00' + encode_nat(index)
+        + b'\x0a' + len(addr).to_bytes(4, "big") + addr)
+
+
+def leaf_hash(index, address):
+    return blake2b(pack_leaf(index, address))
+
+
+def node_hash(a, b):
+    return blake2b(a + b) if a < b else blake2b(b + a)
+
+
+class MerkleTree:
+    """Merkle tree over a list of addresses. An address' index in the list
+    is its claim index."""
+
+    def __init__(self, addresses):
+        if len(addresses) == 0:
+            raise ValueError("Empty tree")
+        self.addresses = list(addresses)
+        self.levels = [[leaf_hash(i, a) for i, a in enumerate(self.addresses)]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            next_level = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2 == 1:
+                next_level.append(level[-1])
+            self.levels.append(next_level)
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        """The sibling hashes from the leaf at index up to the root."""
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            index //= 2
+        return proof
+
+    def verify(self, index, address, proof):
+        node = leaf_hash(index, address)
+        for sibling in proof:
+            node = node_hash(node, sibling)
+        return node == self.root